@@ -0,0 +1,197 @@
+# backend/admission.py
+import functools
+import threading
+import time
+from collections import deque
+from flask import g, jsonify, request
+from metrics import registry
+
+class PriorityClass:
+    """One lane of traffic: its rank, reserved slots and how much of it may wait"""
+
+    __slots__ = ('name', 'priority', 'reserved', 'queue_depth', 'sheddable')
+
+    def __init__(self, name, priority, reserved=0, queue_depth=0, sheddable=True):
+        self.name = name
+        self.priority = priority
+        self.reserved = reserved
+        self.queue_depth = queue_depth
+        self.sheddable = sheddable
+
+# Lower priority numbers are served first
+DEFAULT_CLASSES = (
+    PriorityClass('emergency', 0, reserved=4, sheddable=False),
+    PriorityClass('chat', 1, queue_depth=64),
+    PriorityClass('scan', 2, queue_depth=16)
+)
+
+# Path prefix -> class; anything unlisted (static content, metrics, admin) is not limited
+DEFAULT_ROUTES = (
+    ('/api/emergency', 'emergency'),
+    ('/api/chat', 'chat'),
+    ('/api/emotion', 'scan')
+)
+
+class _Waiter:
+    __slots__ = ('event', 'slot')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.slot = None
+
+class AdmissionController:
+    """Priority-lane admission control in front of the request handlers.
+
+    At most `capacity` sheddable requests run at once. Emergency traffic has
+    its own reserved slots and may also use free shared ones. It never
+    queues and is never refused; past capacity it runs anyway and is
+    counted as overflow. Other classes wait in a bounded FIFO queue per class
+    for up to `queue_timeout` seconds. A freed slot goes to the highest
+    priority waiter. A full queue or a timeout is answered with a fast 503.
+    """
+
+    def __init__(self, app=None, capacity=32, classes=DEFAULT_CLASSES, routes=DEFAULT_ROUTES,
+                 queue_timeout=2.0, enabled=True):
+        self.capacity = capacity
+        self.classes = {cls.name: cls for cls in classes}
+        self.routes = tuple(routes)
+        self.queue_timeout = queue_timeout
+        self.enabled = enabled
+        self.fallbacks = {}
+        self._lock = threading.Lock()
+        self._free_shared = capacity
+        self._free_reserved = {cls.name: cls.reserved for cls in classes}
+        self._waiters = {cls.name: deque() for cls in classes}
+        self._by_priority = sorted(self.classes, key=lambda name: self.classes[name].priority)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ADMISSION_CONTROL', self.enabled)
+        self.queue_timeout = app.config.get('ADMISSION_QUEUE_TIMEOUT', self.queue_timeout)
+        capacity = app.config.get('ADMISSION_CAPACITY', self.capacity)
+        self._free_shared += capacity - self.capacity
+        self.capacity = capacity
+        app.before_request(self._admit_request)
+        app.teardown_request(self._release_request)
+
+    def classify(self, path):
+        for prefix, name in self.routes:
+            if path.startswith(prefix):
+                return name
+        return None
+
+    def acquire(self, name):
+        """Take a slot for class `name`; returns the slot kind, or None when shed"""
+        cls = self.classes[name]
+        with self._lock:
+            if self._free_reserved[name]:
+                self._free_reserved[name] -= 1
+                return self._admitted(name, 'reserved')
+            if self._free_shared:
+                self._free_shared -= 1
+                return self._admitted(name, 'shared')
+            if not cls.sheddable:
+                return self._admitted(name, 'overflow')
+            waiters = self._waiters[name]
+            if len(waiters) >= cls.queue_depth:
+                self._outcome(name, 'shed_queue_full')
+                return None
+            waiter = _Waiter()
+            waiters.append(waiter)
+            self._queue_gauge(name).set(len(waiters))
+
+        start = time.perf_counter()
+        waiter.event.wait(self.queue_timeout)
+        with self._lock:
+            if waiter.slot is None:
+                waiters.remove(waiter)
+                self._queue_gauge(name).set(len(waiters))
+                self._outcome(name, 'shed_timeout')
+                return None
+        registry.histogram('admission_queue_wait_seconds', 'Time spent waiting for an admission slot',
+                           priority_class=name).observe(time.perf_counter() - start)
+        return waiter.slot
+
+    def release(self, name, slot):
+        registry.gauge('admission_in_flight', 'Requests running per priority class',
+                       priority_class=name).dec()
+        with self._lock:
+            if slot == 'reserved':
+                self._free_reserved[name] += 1
+            elif slot == 'shared':
+                # Hand the slot straight to the most urgent waiter so nobody can jump the queue
+                for waiting_class in self._by_priority:
+                    waiters = self._waiters[waiting_class]
+                    if waiters:
+                        waiter = waiters.popleft()
+                        self._queue_gauge(waiting_class).set(len(waiters))
+                        waiter.slot = self._admitted(waiting_class, 'shared', queued=True)
+                        waiter.event.set()
+                        return
+                self._free_shared += 1
+
+    def limit(self, name, on_shed):
+        """Decorator admitting a non-HTTP handler (e.g. a Socket.IO event) through class `name`"""
+        def decorator(handler):
+            @functools.wraps(handler)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return handler(*args, **kwargs)
+                slot = self.acquire(name)
+                if slot is None:
+                    return on_shed(*args, **kwargs)
+                try:
+                    return handler(*args, **kwargs)
+                finally:
+                    self.release(name, slot)
+            return wrapper
+        return decorator
+
+    def fallback(self, name, payload):
+        """Extra fields for the 503 body of class `name`, e.g. a canned reply"""
+        self.fallbacks[name] = payload
+
+    def _admit_request(self):
+        if not self.enabled or request.method == 'OPTIONS':
+            return None
+        name = self.classify(request.path)
+        if name is None:
+            return None
+        slot = self.acquire(name)
+        if slot is None:
+            body = dict({'success': False, 'error': 'Server is busy, please retry shortly'}, **self.fallbacks.get(name, {}))
+            response = jsonify(body)
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+        g.admission = (name, slot)
+        return None
+
+    def _release_request(self, exc):
+        admitted = g.pop('admission', None)
+        if admitted is not None:
+            self.release(*admitted)
+
+    def _admitted(self, name, slot, queued=False):
+        registry.gauge('admission_in_flight', 'Requests running per priority class',
+                       priority_class=name).inc()
+        self._outcome(name, 'queued' if queued else 'overflow' if slot == 'overflow' else 'admitted')
+        return slot
+
+    def _outcome(self, name, outcome):
+        registry.counter('admission_requests_total', 'Admission decisions per priority class',
+                         priority_class=name, outcome=outcome).inc()
+
+    def _queue_gauge(self, name):
+        return registry.gauge('admission_queue_depth', 'Requests waiting per priority class',
+                              priority_class=name)
+
+    def status(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'free_shared': self._free_shared,
+                'free_reserved': dict(self._free_reserved),
+                'queued': {name: len(waiters) for name, waiters in self._waiters.items()}
+            }
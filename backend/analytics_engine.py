@@ -0,0 +1,233 @@
+# backend/analytics_engine.py
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from database import db
+from metrics import registry
+from wellness import EMOTION_VALENCE
+
+# Readings at or below this weighted valence count as distressed
+DISTRESS_THRESHOLD = -0.5
+
+# Every writer here stores '%Y-%m-%d %H:%M:%S' (CURRENT_TIMESTAMP, EmotionIngestor's slots);
+# parsing as ISO 8601 accepts that and also tolerates fractional seconds or a 'T' separator
+# from timestamps a caller hands track_emotions directly
+TIMESTAMP_FORMAT = 'ISO8601'
+
+class UserEvents:
+    """One user's events for a window, one typed DataFrame per kind, oldest first"""
+
+    __slots__ = ('emotions', 'sessions', 'exercises', 'emergencies', 'user_id', 'days', 'version')
+
+    def __init__(self, frames, user_id, days, version):
+        for kind, frame in frames.items():
+            setattr(self, kind, frame)
+        self.user_id = user_id
+        self.days = days
+        self.version = version
+
+    @classmethod
+    def from_rows(cls, events, user_id, days, version):
+        frames = {kind: pd.DataFrame(rows, columns=columns) for kind, (columns, rows) in events.items()}
+
+        emotions = frames['emotions']
+        emotions['timestamp'] = pd.to_datetime(emotions['timestamp'], format=TIMESTAMP_FORMAT)
+        emotions['intensity'] = emotions['intensity'].astype(float)
+        emotions['emotion_type'] = emotions['emotion_type'].astype('category')
+        emotions['mood'] = emotions['emotion_type'].map(EMOTION_VALENCE).astype(float).fillna(0.0) \
+            * emotions['intensity']
+
+        sessions = frames['sessions']
+        sessions['start_time'] = pd.to_datetime(sessions['start_time'], format=TIMESTAMP_FORMAT)
+        sessions['duration'] = sessions['duration'].astype(float)
+
+        exercises = frames['exercises']
+        exercises['timestamp'] = pd.to_datetime(exercises['timestamp'], format=TIMESTAMP_FORMAT)
+        exercises['duration'] = exercises['duration'].astype(float)
+        exercises['effectiveness'] = exercises['effectiveness'].astype(float)
+
+        emergencies = frames['emergencies']
+        emergencies['triggered_at'] = pd.to_datetime(emergencies['triggered_at'], format=TIMESTAMP_FORMAT)
+
+        return cls(frames, user_id, days, version)
+
+class AnalyticsEngine:
+    """Dashboard analytics computed from a single load of the user's events.
+
+    Each request reads sessions, emotions, exercises and emergencies once,
+    in one snapshot, and the other metrics are vectorized passes over those
+    frames; mood trends come from the emotion rollups. Results are kept per (user, timeframe, data version, day), so a
+    dashboard reloaded with no new writes returns the stored dict. The day
+    is part of the key because the window slides even when nothing is written.
+    """
+
+    def __init__(self, database=db, max_entries=1024):
+        self.db = database
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def user_analytics(self, user_id, days):
+        version = self.db.get_data_version(user_id)
+        key = (user_id, days, version, datetime.utcnow().date())
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+        if result is not None:
+            self._count('hit')
+            return result
+
+        self._count('miss')
+        version, events = self.db.get_user_events(user_id, days)
+        result = self.compute(UserEvents.from_rows(events, user_id, days, version))
+
+        key = (user_id, days, version, key[3])
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result
+
+    def compute(self, events):
+        daily_mood = events.emotions.groupby(events.emotions['timestamp'].dt.floor('D'))['mood'].mean()
+        analytics = {
+            'mood_trends': self.mood_trends(events),
+            'session_effectiveness': self.session_effectiveness(events, daily_mood),
+            'crisis_patterns': self.crisis_patterns(events),
+            'progress_metrics': self.progress_metrics(events, daily_mood)
+        }
+        analytics['personalized_insights'] = self.insights(analytics)
+        return analytics
+
+    def mood_trends(self, events):
+        """Per-day and per-hour emotion distributions, served from the rollup tables
+
+        The rollups keep totals for months already moved to the archive and
+        make the cost independent of the window length, so these come from
+        get_emotion_trends rather than the raw emotion frame.
+        """
+        trends = {}
+        for key, granularity in (('daily', 'day'), ('hourly', 'hour')):
+            distribution = {}
+            for row in self.db.get_emotion_trends(events.user_id, days=events.days, granularity=granularity):
+                # Sources are combined per emotion; the rollups keep them apart
+                emotions = distribution.setdefault(row['bucket'], {})
+                emotion = emotions.setdefault(row['emotion_type'], {
+                    'count': 0, 'mean_intensity': 0.0, 'max_intensity': 0.0
+                })
+                total = emotion['mean_intensity'] * emotion['count'] + row['mean_intensity'] * row['count']
+                emotion['count'] += row['count']
+                emotion['mean_intensity'] = total / emotion['count']
+                emotion['max_intensity'] = max(emotion['max_intensity'], row['max_intensity'])
+
+            trends[key] = [
+                {'bucket': bucket, 'emotions': emotions}
+                for bucket, emotions in distribution.items()
+            ]
+        return trends
+
+    def session_effectiveness(self, events, daily_mood):
+        """Completion, length and mood on days with a session against days without"""
+        sessions = events.sessions
+        completed = sessions['duration'].notna()
+        total = len(sessions)
+
+        session_days = daily_mood.index.isin(sessions['start_time'].dt.floor('D'))
+        with_sessions = daily_mood[session_days]
+        without_sessions = daily_mood[~session_days]
+        mood_lift = None
+        if len(with_sessions) and len(without_sessions):
+            mood_lift = round(float(with_sessions.mean() - without_sessions.mean()), 3)
+
+        return {
+            'total_sessions': total,
+            'completed_sessions': int(completed.sum()),
+            'completion_rate': round(float(completed.mean()), 3) if total else 0.0,
+            'average_duration_minutes': round(float(sessions['duration'].mean()) / 60, 1) if completed.any() else 0.0,
+            'sessions_per_week': round(total / events.days * 7, 2),
+            'by_type': sessions['session_type'].value_counts().to_dict(),
+            'mood_lift_on_session_days': mood_lift
+        }
+
+    def crisis_patterns(self, events):
+        """When emergencies happen and how often readings are distressed"""
+        emergencies = events.emergencies
+        triggered = emergencies['triggered_at']
+        by_hour = np.bincount(triggered.dt.hour.to_numpy(), minlength=24)
+        by_weekday = np.bincount(triggered.dt.dayofweek.to_numpy(), minlength=7)
+        distressed = events.emotions['mood'].to_numpy() <= DISTRESS_THRESHOLD
+
+        return {
+            'emergency_events': len(emergencies),
+            'unresolved_events': int(emergencies['resolved_at'].isna().sum()),
+            'by_level': emergencies['crisis_level'].value_counts().to_dict(),
+            'session_crisis_levels': events.sessions['crisis_level'].dropna().value_counts().to_dict(),
+            'by_hour': by_hour.tolist(),
+            'by_weekday': by_weekday.tolist(),
+            'peak_hour': int(by_hour.argmax()) if len(emergencies) else None,
+            'peak_weekday': int(by_weekday.argmax()) if len(emergencies) else None,
+            'distressed_share': round(float(distressed.mean()), 3) if len(distressed) else 0.0
+        }
+
+    def progress_metrics(self, events, daily_mood):
+        """Mood direction over the window and exercise practice"""
+        moods = daily_mood.to_numpy()
+        mood_slope = first_half = second_half = None
+        if len(moods) >= 2:
+            day_offsets = ((daily_mood.index - daily_mood.index[0]).days).to_numpy()
+            mood_slope = round(float(np.polyfit(day_offsets, moods, 1)[0]), 4)
+            middle = len(moods) // 2
+            first_half = round(float(moods[:middle].mean()), 3)
+            second_half = round(float(moods[middle:].mean()), 3)
+
+        exercises = events.exercises
+        effectiveness = exercises.groupby('exercise_type')['effectiveness'].mean().dropna()
+
+        return {
+            'days_tracked': len(moods),
+            'average_mood': round(float(moods.mean()), 3) if len(moods) else None,
+            'mood_slope_per_day': mood_slope,
+            'first_half_mood': first_half,
+            'second_half_mood': second_half,
+            'positive_share': round(float((events.emotions['mood'] > 0).mean()), 3) if len(events.emotions) else 0.0,
+            'exercises_completed': len(exercises),
+            'exercise_minutes': round(float(exercises['duration'].sum()) / 60, 1),
+            'exercise_effectiveness': {name: round(value, 2) for name, value in effectiveness.items()}
+        }
+
+    def insights(self, analytics):
+        """Plain-language observations drawn from the computed metrics"""
+        progress = analytics['progress_metrics']
+        sessions = analytics['session_effectiveness']
+        crisis = analytics['crisis_patterns']
+        insights = []
+
+        if progress['days_tracked'] < 3:
+            insights.append('Keep checking in - a few more days of data will make these insights more useful.')
+        elif progress['mood_slope_per_day'] > 0.01:
+            insights.append('Your mood has been trending upward over this period.')
+        elif progress['mood_slope_per_day'] < -0.01:
+            insights.append('Your mood has dipped recently. It may help to talk to someone you trust or a counselor.')
+
+        if sessions['mood_lift_on_session_days'] is not None and sessions['mood_lift_on_session_days'] > 0.05:
+            insights.append('You tend to feel better on days you have a session.')
+
+        if progress['exercise_effectiveness']:
+            best = max(progress['exercise_effectiveness'], key=progress['exercise_effectiveness'].get)
+            insights.append(f'{best.replace("_", " ").capitalize()} exercises have worked best for you.')
+
+        if crisis['peak_hour'] is not None and crisis['emergency_events'] >= 2:
+            insights.append(f"Difficult moments have clustered around {crisis['peak_hour']:02d}:00. "
+                            'Planning a check-in before then may help.')
+
+        return insights
+
+    def _count(self, outcome):
+        registry.counter('analytics_cache_requests_total', 'Analytics result cache lookups by outcome',
+                         outcome=outcome).inc()
+
+analytics_engine = AnalyticsEngine()
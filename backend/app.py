@@ -1,23 +1,84 @@
-from flask import Flask, request, jsonify
-from flask_socketio import SocketIO
-from flask_cors import CORS
+from flask import Flask, request, jsonify, Response, stream_with_context
+from flask_socketio import SocketIO, join_room
+import csv
+import hmac
+import io
 import json
+import os
 from datetime import datetime
 import random
+from database import db, HISTORY_TABLES
+from session_store import create_session_store
+from socket_queue import socketio_options
+from content_catalog import catalog
+from cors import PreflightCORS
+from emotion_ingest import EmotionIngestor
+import metrics
+from metrics import track_socket_event
+from profiler import profiler
+from admission import AdmissionController, PriorityClass
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 
-# Configure CORS properly for all origins and methods
-CORS(app, origins=["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "http://127.0.0.1:3001"], 
-     supports_credentials=True, methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+# Session store: 'memory' for a single process, 'sqlite' to share between workers
+app.config['SESSION_STORE'] = os.environ.get('SESSION_STORE', 'memory')
+app.config['SESSION_STORE_PATH'] = os.environ.get('SESSION_STORE_PATH', 'sessions.db')
+app.config['SESSION_TTL_SECONDS'] = int(os.environ.get('SESSION_TTL_SECONDS', 3600))
+app.config['SESSION_MAX_ENTRIES_PER_USER'] = int(os.environ.get('SESSION_MAX_ENTRIES_PER_USER', 50))
+app.config['SESSION_MAX_TOTAL_ENTRIES'] = int(os.environ.get('SESSION_MAX_TOTAL_ENTRIES', 100000))
+
+# Socket.IO worker model and the queue shared by all workers (see serve.py)
+app.config['SOCKETIO_ASYNC_MODE'] = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+app.config['SOCKETIO_MESSAGE_QUEUE'] = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+
+ALLOWED_ORIGINS = ["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "http://127.0.0.1:3001"]
+
+# How long browsers may cache a preflight answer (Chromium caps this at 2 hours)
+app.config['CORS_MAX_AGE'] = int(os.environ.get('CORS_MAX_AGE', 7200))
+
+# Latency histograms and counters for every route, served at /metrics; first, so preflights count too
+metrics.init_app(app)
+
+# All CORS handling, including every preflight, lives in one middleware
+PreflightCORS(app, origins=ALLOWED_ORIGINS, supports_credentials=True,
+              methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+
+# On-demand sampling profiler; the admin endpoints are disabled without a token
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
+profiler.init_app(app)
+
+# Priority lanes: emergency traffic has reserved slots, chat and scans queue and shed.
+# Queued requests hold a worker, so capacity + reserved + queues should fit the worker pool.
+app.config['ADMISSION_CONTROL'] = os.environ.get('ADMISSION_CONTROL', 'on') != 'off'
+app.config['ADMISSION_CAPACITY'] = int(os.environ.get('ADMISSION_CAPACITY', 16))
+app.config['ADMISSION_QUEUE_TIMEOUT'] = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 2.0))
+app.config['ADMISSION_EMERGENCY_RESERVED'] = int(os.environ.get('ADMISSION_EMERGENCY_RESERVED', 4))
+app.config['ADMISSION_CHAT_QUEUE'] = int(os.environ.get('ADMISSION_CHAT_QUEUE', 16))
+app.config['ADMISSION_SCAN_QUEUE'] = int(os.environ.get('ADMISSION_SCAN_QUEUE', 8))
+admission = AdmissionController(app, classes=(
+    PriorityClass('emergency', 0, reserved=app.config['ADMISSION_EMERGENCY_RESERVED'], sheddable=False),
+    PriorityClass('chat', 1, queue_depth=app.config['ADMISSION_CHAT_QUEUE']),
+    PriorityClass('scan', 2, queue_depth=app.config['ADMISSION_SCAN_QUEUE'])
+))
+admission.fallback('chat', {
+    'response': "I'm having trouble keeping up right now. Please try again in a moment. "
+                "If you need help urgently, use the emergency help button.",
+    'emergency_help': '/api/emergency/help'
+})
 
 socketio = SocketIO(app, 
-                   cors_allowed_origins=["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "http://127.0.0.1:3001"],
-                   async_mode='threading')
+                   cors_allowed_origins=ALLOWED_ORIGINS,
+                   **socketio_options(app.config))
 
-# Store user sessions (in production, use a database)
-user_sessions = {}
+# Recent emotions per user, bounded and expiring
+user_sessions = create_session_store(app.config)
+
+# Streamed emotion readings are kept at most once per source per resolution seconds
+app.config['EMOTION_INGEST_RESOLUTION'] = float(os.environ.get('EMOTION_INGEST_RESOLUTION', 3.0))
+app.config['EMOTION_INGEST_MAX_BATCH'] = int(os.environ.get('EMOTION_INGEST_MAX_BATCH', 500))
+emotion_ingestor = EmotionIngestor(db, resolution=app.config['EMOTION_INGEST_RESOLUTION'],
+                                   max_batch=app.config['EMOTION_INGEST_MAX_BATCH'])
 
 class SimpleEmotionDetector:
     def detect_from_text(self, text):
@@ -61,15 +122,6 @@ def home():
         "version": "1.0"
     })
 
-# Handle CORS preflight requests
-@app.route('/api/chat', methods=['OPTIONS'])
-def handle_chat_options():
-    response = jsonify({'status': 'success'})
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-    return response
-
 @app.route('/api/chat', methods=['POST'])
 def chat_with_ai():
     try:
@@ -83,6 +135,7 @@ def chat_with_ai():
         # Analyze emotion first
         emotion_result = emotion_detector.detect_from_text(message)
         emotion = emotion_result['emotion']
+        record_emotion(user_id, emotion_result)
         
         # Generate appropriate response based on emotion
         responses = {
@@ -123,6 +176,9 @@ def chat_with_ai():
         # Determine if we should suggest an exercise
         suggest_exercise = emotion in ['sad', 'angry', 'anxious']
         
+        # Persisted so history, exports and crisis safety checks see the conversation
+        db.add_chat_turn(user_id, data.get('session_id'), message, ai_response, emotion_result)
+        
         response_data = {
             'success': True,
             'response': ai_response,
@@ -132,190 +188,305 @@ def chat_with_ai():
         }
         
         response = jsonify(response_data)
-        response.headers.add('Access-Control-Allow-Origin', '*')
         return response
         
     except Exception as e:
         error_response = jsonify({'success': False, 'error': str(e)})
-        error_response.headers.add('Access-Control-Allow-Origin', '*')
         return error_response, 500
 
-@app.route('/api/exercises/breathing', methods=['GET', 'OPTIONS'])
+@app.route('/api/exercises/breathing', methods=['GET'])
 def get_breathing_exercise():
-    if request.method == 'OPTIONS':
-        response = jsonify({'status': 'success'})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-        return response
-        
     try:
         exercise_type = request.args.get('type', '478')
         
-        exercises = {
-            '478': {
-                'name': '4-7-8 Breathing',
-                'description': 'Calming technique for stress and anxiety relief',
-                'instructions': [
-                    'Sit comfortably with your back straight',
-                    'Place the tip of your tongue against the roof of your mouth',
-                    'Exhale completely through your mouth',
-                    'Close your mouth and inhale quietly through your nose for 4 seconds',
-                    'Hold your breath for 7 seconds',
-                    'Exhale completely through your mouth for 8 seconds',
-                    'Repeat this cycle 4-5 times'
-                ],
-                'duration': 5,
-                'benefits': ['Reduces anxiety', 'Helps with sleep', 'Calms the nervous system']
-            },
-            'box': {
-                'name': 'Box Breathing',
-                'description': 'Military technique for focus and calm',
-                'instructions': [
-                    'Sit upright in a comfortable position',
-                    'Slowly exhale all your air',
-                    'Inhale through your nose for 4 seconds',
-                    'Hold your breath for 4 seconds',
-                    'Exhale through your mouth for 4 seconds',
-                    'Hold at the bottom for 4 seconds',
-                    'Repeat 5-10 times'
-                ],
-                'duration': 7,
-                'benefits': ['Improves focus', 'Reduces stress', 'Increases alertness']
-            }
-        }
-        
-        exercise = exercises.get(exercise_type, exercises['478'])
+        # Served straight from the pre-serialized catalog; 304 if the client is current
+        exercise = catalog.get('breathing', exercise_type, default_key='478')
         
-        response = jsonify({
-            'success': True,
-            'exercise': exercise
-        })
-        response.headers.add('Access-Control-Allow-Origin', '*')
+        response = catalog.respond(request, exercise, 'exercise')
         return response
         
     except Exception as e:
         error_response = jsonify({'success': False, 'error': str(e)})
-        error_response.headers.add('Access-Control-Allow-Origin', '*')
         return error_response, 500
 
-@app.route('/api/emergency/help', methods=['POST', 'OPTIONS'])
+@app.route('/api/emergency/help', methods=['POST'])
 def emergency_help():
-    if request.method == 'OPTIONS':
-        response = jsonify({'status': 'success'})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-        return response
-        
     try:
         data = request.get_json()
         user_id = data.get('user_id', 'anonymous')
         crisis_level = data.get('crisis_level', 'moderate')
         
-        emergency_resources = {
-            'immediate': {
-                'message': '🚨 IMMEDIATE HELP IS AVAILABLE',
-                'actions': [
-                    'Call Emergency Services: 911',
-                    'National Suicide Prevention Lifeline: 1-800-273-8255',
-                    'Crisis Text Line: Text HOME to 741741'
-                ],
-                'instructions': 'Please stay on the line. Help is coming.'
-            },
-            'high': {
-                'message': 'You are not alone. Professional help is available.',
-                'actions': [
-                    'National Suicide Prevention Lifeline: 1-800-273-8255',
-                    'Crisis Text Line: Text HOME to 741741',
-                    'Emergency Services: 911'
-                ],
-                'instructions': 'Reach out to one of these resources immediately.'
-            },
-            'moderate': {
-                'message': 'Support is available when you need it.',
-                'actions': [
-                    'Talk to a trusted friend or family member',
-                    'Contact a mental health professional',
-                    'Use calming exercises in the app'
-                ],
-                'instructions': 'You are not alone in this.'
-            }
-        }
-        
-        resource = emergency_resources.get(crisis_level, emergency_resources['moderate'])
+        resource = catalog.get('emergency', crisis_level, default_key='moderate')
         
         # Log emergency request
         print(f"EMERGENCY: User {user_id} requested help at level {crisis_level}")
+        metrics.registry.counter('emergency_help_requests_total', 'Emergency help requests by crisis level',
+                                 crisis_level=crisis_level).inc()
         
-        response = jsonify({
-            'success': True,
-            'emergency_response': resource,
-            'timestamp': datetime.now().isoformat()
-        })
-        response.headers.add('Access-Control-Allow-Origin', '*')
+        # Splice the pre-serialized resource in rather than re-encoding it per request
+        response = Response(
+            b'{"success": true, "emergency_response": %s, "timestamp": "%s"}'
+            % (resource.payload, datetime.now().isoformat().encode()),
+            mimetype='application/json'
+        )
         return response
         
     except Exception as e:
         error_response = jsonify({'success': False, 'error': str(e)})
-        error_response.headers.add('Access-Control-Allow-Origin', '*')
         return error_response, 500
 
-@app.route('/api/user/session/<user_id>', methods=['GET', 'OPTIONS'])
+@app.route('/api/emotion/ingest', methods=['POST'])
+def ingest_emotions():
+    """Store a batch of timestamped emotion readings from a client stream"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = emotion_ingestor.ingest(
+            data.get('user_id'),
+            data.get('readings'),
+            source=data.get('source', 'facial'),
+            session_id=data.get('session_id')
+        )
+        response = jsonify(dict(result, success=True))
+        return response
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        error_response = jsonify({'success': False, 'error': str(e)})
+        return error_response, 500
+
+@app.route('/api/user/session/<user_id>', methods=['GET'])
 def get_user_session(user_id):
     """Get user's emotion history"""
-    if request.method == 'OPTIONS':
-        response = jsonify({'status': 'success'})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    try:
+        response = jsonify({
+            'success': True,
+            'user_id': user_id,
+            'session_count': user_sessions.count(user_id),
+            'recent_emotions': user_sessions.recent(user_id, 10)  # Last 10 entries
+        })
         return response
-        
+    except Exception as e:
+        error_response = jsonify({'success': False, 'error': str(e)})
+        return error_response, 500
+
+@app.route('/api/user/history/<user_id>', methods=['GET'])
+def get_user_history(user_id):
+    """Get one newest-first page of a user's chat, emotion or session history"""
     try:
-        session_data = user_sessions.get(user_id, [])
+        kind = request.args.get('kind', 'chat')
+        if kind not in HISTORY_TABLES:
+            return jsonify({'success': False, 'error': f'Unknown history kind: {kind}'}), 400
+        
+        try:
+            limit = int(request.args.get('limit', 50))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+        try:
+            page = db.get_history_page(kind, user_id, cursor=request.args.get('cursor'),
+                                       limit=min(max(limit, 1), 500))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
         response = jsonify({
             'success': True,
             'user_id': user_id,
-            'session_count': len(session_data),
-            'recent_emotions': session_data[-10:]  # Last 10 entries
+            'kind': kind,
+            'items': [dict(item) for item in page['items']],
+            'next_cursor': page['next_cursor']
         })
-        response.headers.add('Access-Control-Allow-Origin', '*')
         return response
     except Exception as e:
         error_response = jsonify({'success': False, 'error': str(e)})
-        error_response.headers.add('Access-Control-Allow-Origin', '*')
         return error_response, 500
 
+@app.route('/api/user/export/<user_id>', methods=['GET'])
+def export_user_history(user_id):
+    """Stream a user's full history as NDJSON or CSV"""
+    try:
+        kind = request.args.get('kind', 'chat')
+        export_format = request.args.get('format', 'ndjson')
+        if kind not in HISTORY_TABLES or export_format not in ('ndjson', 'csv'):
+            return jsonify({'success': False, 'error': 'Unsupported export kind or format'}), 400
+        
+        # Rows are pulled from SQLite in batches while the response is being sent
+        include_archived = request.args.get('include_archived') in ('1', 'true')
+        records = db.iter_history(kind, user_id, include_archived=include_archived)
+        if export_format == 'csv':
+            body = stream_csv(records, HISTORY_TABLES[kind]['columns'])
+            mimetype = 'text/csv'
+        else:
+            body = (record.to_json() + '\n' for record in records)
+            mimetype = 'application/x-ndjson'
+        
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{user_id}-{kind}.{export_format}"'
+        return response
+    except Exception as e:
+        error_response = jsonify({'success': False, 'error': str(e)})
+        return error_response, 500
+
+def require_admin():
+    """Return an error response unless the request carries the admin token"""
+    token = app.config.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({'success': False, 'error': 'Admin endpoints are disabled'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    return None
+
+@app.route('/api/admin/profile', methods=['GET', 'POST', 'DELETE'])
+def admin_profile():
+    """Start (POST), inspect (GET) or stop (DELETE) a sampling profile capture"""
+    denied = require_admin()
+    if denied:
+        return denied
+    
+    if request.method == 'GET':
+        return jsonify({'success': True, 'profile': profiler.status()})
+    if request.method == 'DELETE':
+        return jsonify({'success': True, 'profile': profiler.stop()})
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = min(float(data.get('seconds', 30)), 600)
+        percent = max(0.0, min(float(data.get('percent', 100)), 100.0))
+        interval = max(float(data.get('interval_ms', 5)), 1) / 1000
+        capture = profiler.start(seconds, percent, interval, data.get('format', 'collapsed'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    return jsonify({'success': True, 'profile': capture}), 202
+
+@app.route('/api/admin/cohort-report', methods=['GET'])
+def admin_cohort_report():
+    """Get the newest stored cohort report (written by cohort_report.py)"""
+    denied = require_admin()
+    if denied:
+        return denied
+
+    sections = request.args.get('sections')
+    report = db.get_cohort_report(sections.split(',') if sections else None)
+    if report is None:
+        return jsonify({'success': False, 'error': 'No cohort report has been generated yet'}), 404
+    return jsonify({'success': True, 'report': report})
+
+def stream_csv(records, columns, batch_size=500):
+    """Yield CSV text in chunks; JSON columns are written exactly as stored"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    
+    for count, record in enumerate(records, 1):
+        writer.writerow([record.raw(column) for column in columns])
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+def record_emotion(user_id, emotion_result):
+    """Add a detected emotion to the user's live session"""
+    user_sessions.append(user_id, {
+        'emotion': emotion_result['emotion'],
+        'confidence': emotion_result['confidence'],
+        'timestamp': datetime.now().isoformat()
+    })
+
 # WebSocket events for real-time features
+def user_room(user_id):
+    """Room holding every connection that belongs to a user"""
+    return f'user:{user_id}'
+
+def join_user_room(user_id):
+    """Put the current connection in its user's room and return where to send replies"""
+    if not user_id:
+        # Unidentified clients only ever hear back on their own connection
+        return request.sid
+    join_room(user_room(user_id))
+    return user_room(user_id)
+
 @socketio.on('connect')
-def handle_connect():
+@track_socket_event('connect')
+@profiler.tag_socket_event('connect')
+def handle_connect(auth=None):
+    # Clients identify themselves with io(url, {auth: {user_id}}) or ?user_id=
+    user_id = (auth or {}).get('user_id') or request.args.get('user_id')
+    join_user_room(user_id)
     print('Client connected')
-    socketio.emit('connected', {'message': 'Connected to Mental Health Companion', 'status': 'active'})
+    socketio.emit('connected', {'message': 'Connected to Mental Health Companion', 'status': 'active'}, to=request.sid)
 
 @socketio.on('disconnect')
+@track_socket_event('disconnect')
+@profiler.tag_socket_event('disconnect')
 def handle_disconnect():
     print('Client disconnected')
 
+@socketio.on('join')
+@track_socket_event('join')
+@profiler.tag_socket_event('join')
+def handle_join(data):
+    user_id = data.get('user_id')
+    join_user_room(user_id)
+    socketio.emit('joined', {'user_id': user_id}, to=request.sid)
+
 @socketio.on('start_emotion_tracking')
+@track_socket_event('start_emotion_tracking')
+@profiler.tag_socket_event('start_emotion_tracking')
 def handle_start_tracking(data):
     user_id = data.get('user_id')
+    room = join_user_room(user_id)
     print(f'Starting emotion tracking for user: {user_id}')
-    socketio.emit('tracking_started', {'user_id': user_id, 'status': 'active'})
+    socketio.emit('tracking_started', {'user_id': user_id, 'status': 'active'}, to=room)
+
+def reply_busy(data, priority_class='chat'):
+    """Fallback for socket messages shed by admission control"""
+    socketio.emit('server_busy', {
+        'user_id': (data or {}).get('user_id'),
+        'retry_after': 1,
+        **admission.fallbacks.get(priority_class, {})
+    }, to=request.sid)
 
 @socketio.on('user_message')
+@track_socket_event('user_message')
+@profiler.tag_socket_event('user_message')
+@admission.limit('chat', on_shed=reply_busy)
 def handle_user_message(data):
     user_id = data.get('user_id')
     message = data.get('message')
+    room = join_user_room(user_id)
     
     # Process message and send AI response via WebSocket
     emotion_result = emotion_detector.detect_from_text(message)
+    record_emotion(user_id, emotion_result)
+    if user_id:
+        db.add_chat_message(user_id, data.get('session_id'), message, 'user', emotion_result)
     
     socketio.emit('ai_response', {
         'user_id': user_id,
         'message': message,
         'emotion': emotion_result,
         'timestamp': datetime.now().isoformat()
-    })
+    }, to=room)
+
+@socketio.on('emotion_batch')
+@track_socket_event('emotion_batch')
+@profiler.tag_socket_event('emotion_batch')
+@admission.limit('scan', on_shed=lambda data: reply_busy(data, 'scan'))
+def handle_emotion_batch(data):
+    data = data or {}
+    try:
+        result = emotion_ingestor.ingest(
+            data.get('user_id'),
+            data.get('readings'),
+            source=data.get('source', 'facial'),
+            session_id=data.get('session_id')
+        )
+        reply = dict(result, success=True)
+    except ValueError as e:
+        reply = {'success': False, 'error': str(e)}
+    socketio.emit('emotion_batch_stored', dict(reply, user_id=data.get('user_id')), to=request.sid)
 
 if __name__ == '__main__':
     print("🚀 Starting AI Mental Health Companion Server...")
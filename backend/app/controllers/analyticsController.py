@@ -1,28 +1,54 @@
 # backend/app/controllers/analyticsController.py
 from flask import request, jsonify
+import os
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 from datetime import datetime, timedelta
+from database import db
+from model_cache import ModelCache
+from forecasting import fit_holt
+from analytics_engine import analytics_engine
+from wellness import EMOTION_VALENCE
+
+TIMEFRAME_DAYS = {'7d': 7, '30d': 30, '90d': 90}
+
+# Components scoring below this get a recommendation
+WELLNESS_RECOMMEND_BELOW = 50
+WELLNESS_RECOMMENDATIONS = {
+    'emotional': 'Try a short check-in each day to notice how you are feeling, and reach out if things feel heavy.',
+    'behavioral': 'A few minutes of breathing or grounding exercises most days can make a real difference.',
+    'social': 'Regular sessions help - consider scheduling a time to talk each week.',
+    'physical': 'Gentle movement, like a short walk or stretching, can lift your mood.'
+}
+
+FORECAST_HISTORY_DAYS = 90
+FORECAST_LAGS = 3
+
+# Histories shorter than this (in days with data) use the closed-form forecaster
+FAST_FORECAST_MAX_DAYS = int(os.environ.get('FAST_FORECAST_MAX_DAYS', 28))
 
 class AnalyticsController:
     def __init__(self):
         self.mood_model = RandomForestRegressor()
+        
+        # Bounded per-user models; stale ones keep serving while they retrain
+        self.model_cache = ModelCache(
+            self._train_mood_model,
+            name='mood_model',
+            max_entries=int(os.environ.get('MOOD_MODEL_CACHE_ENTRIES', 1000)),
+            max_bytes=int(os.environ.get('MOOD_MODEL_CACHE_BYTES', 256 * 1024 * 1024)),
+            stale_after=int(os.environ.get('MOOD_MODEL_STALE_AFTER', 20)),
+            max_workers=int(os.environ.get('MOOD_MODEL_TRAIN_WORKERS', 2)),
+            persist_dir=os.environ.get('MOOD_MODEL_DIR')
+        )
     
     def get_user_analytics(self):
         try:
             user_id = request.args.get('user_id')
             timeframe = request.args.get('timeframe', '7d')  # 7d, 30d, 90d
             
-            # Get user data
-            user_data = self._get_user_data(user_id, timeframe)
-            
-            analytics = {
-                'mood_trends': self._calculate_mood_trends(user_data),
-                'session_effectiveness': self._calculate_session_effectiveness(user_data),
-                'crisis_patterns': self._identify_crisis_patterns(user_data),
-                'progress_metrics': self._calculate_progress_metrics(user_data),
-                'personalized_insights': self._generate_insights(user_data)
-            }
+            # One load of the user's events; unchanged data is served from the engine's cache
+            analytics = analytics_engine.user_analytics(user_id, TIMEFRAME_DAYS.get(timeframe, 7))
             
             return jsonify({
                 'success': True,
@@ -48,25 +74,29 @@ class AnalyticsController:
                     'message': 'Insufficient data for prediction'
                 }), 400
             
-            # Prepare features for prediction
-            features = self._prepare_prediction_features(historical_data)
-            
-            # Train model if needed
-            if not hasattr(self, 'trained_models'):
-                self.trained_models = {}
-            
-            if user_id not in self.trained_models:
-                self.trained_models[user_id] = self._train_mood_model(historical_data)
-            
-            # Make predictions
-            predictions = self._predict_future_mood(
-                self.trained_models[user_id], 
-                features, 
-                days
-            )
+            if len(historical_data) < FAST_FORECAST_MAX_DAYS:
+                # Too little history for a forest to beat smoothing; this fits in microseconds
+                predictions = self._fast_forecast(historical_data, days)
+                model_name = 'holt'
+            else:
+                # Prepare features for prediction
+                features = self._prepare_prediction_features(historical_data)
+                
+                # Cached per user; retrained in the background once enough new writes arrive.
+                # The data version only ever grows, unlike a count over the sliding history window
+                model = self.model_cache.get(
+                    user_id,
+                    historical_data,
+                    version=db.get_data_version(user_id)
+                )
+                
+                # Make predictions
+                predictions = self._predict_future_mood(model, features, days)
+                model_name = 'random_forest'
             
             return jsonify({
                 'success': True,
+                'model': model_name,
                 'predictions': predictions,
                 'confidence': self._calculate_prediction_confidence(historical_data)
             })
@@ -78,22 +108,90 @@ class AnalyticsController:
         try:
             user_id = request.args.get('user_id')
             
-            # Calculate comprehensive wellness score
-            wellness_data = self._get_wellness_data(user_id)
-            
-            score = self._calculate_wellness_score(wellness_data)
+            # Maintained at write time; ?recompute=1 rebuilds it from the base tables to check it
+            if request.args.get('recompute') in ('1', 'true'):
+                wellness = db.recompute_wellness(user_id)
+            else:
+                wellness = db.get_wellness(user_id)
             
             return jsonify({
                 'success': True,
-                'wellness_score': score,
+                'wellness_score': wellness['score'],
+                'version': wellness['version'],
                 'breakdown': {
-                    'emotional_health': wellness_data.get('emotional_score', 0),
-                    'behavioral_health': wellness_data.get('behavioral_score', 0),
-                    'social_health': wellness_data.get('social_score', 0),
-                    'physical_health': wellness_data.get('physical_score', 0)
+                    'emotional_health': wellness['components']['emotional'],
+                    'behavioral_health': wellness['components']['behavioral'],
+                    'social_health': wellness['components']['social'],
+                    'physical_health': wellness['components']['physical']
                 },
-                'recommendations': self._get_wellness_recommendations(score)
+                'recommendations': self._get_wellness_recommendations(wellness['components'])
             })
             
         except Exception as e:
-            return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def _get_wellness_recommendations(self, components):
+        """One suggestion for each component below WELLNESS_RECOMMEND_BELOW, weakest first"""
+        return [
+            WELLNESS_RECOMMENDATIONS[name]
+            for name, value in sorted(components.items(), key=lambda item: item[1])
+            if value < WELLNESS_RECOMMEND_BELOW
+        ]
+    
+    def _get_historical_mood_data(self, user_id):
+        """Daily mood scores, oldest first, from the daily emotion rollup"""
+        days = {}
+        for row in db.get_emotion_trends(user_id, days=FORECAST_HISTORY_DAYS):
+            day = days.setdefault(row['bucket'][:10], [0.0, 0])
+            day[0] += EMOTION_VALENCE.get(row['emotion_type'], 0.0) * row['mean_intensity'] * row['count']
+            day[1] += row['count']
+        
+        return [
+            {'date': date, 'mood': total / count, 'readings': count}
+            for date, (total, count) in sorted(days.items())
+        ]
+    
+    def _mood_features(self, moods, date):
+        """The previous FORECAST_LAGS moods plus the weekday being predicted"""
+        return list(moods[-FORECAST_LAGS:]) + [date.weekday()]
+    
+    def _prepare_prediction_features(self, historical_data):
+        return {
+            'moods': [day['mood'] for day in historical_data],
+            'last_date': datetime.fromisoformat(historical_data[-1]['date'])
+        }
+    
+    def _train_mood_model(self, historical_data):
+        """Fit next-day mood on the previous days' moods and the weekday"""
+        moods = [day['mood'] for day in historical_data]
+        features, targets = [], []
+        for i in range(FORECAST_LAGS, len(historical_data)):
+            features.append(self._mood_features(moods[:i], datetime.fromisoformat(historical_data[i]['date'])))
+            targets.append(moods[i])
+        
+        model = RandomForestRegressor(n_estimators=100, random_state=0)
+        model.fit(features, targets)
+        return model
+    
+    def _predict_future_mood(self, model, features, days):
+        """Roll the model forward one day at a time, feeding back its own predictions"""
+        moods = list(features['moods'])
+        predictions = []
+        for offset in range(1, days + 1):
+            date = features['last_date'] + timedelta(days=offset)
+            mood = float(model.predict([self._mood_features(moods, date)])[0])
+            moods.append(mood)
+            predictions.append({'date': date.strftime('%Y-%m-%d'), 'predicted_mood': round(mood, 3)})
+        return predictions
+    
+    def _fast_forecast(self, historical_data, days):
+        """Holt's linear trend with weekday offsets, with 95% prediction intervals"""
+        model = fit_holt(
+            [datetime.fromisoformat(day['date']) for day in historical_data],
+            [day['mood'] for day in historical_data]
+        )
+        return model.forecast(days)
+    
+    def _calculate_prediction_confidence(self, historical_data):
+        """Grows with the amount of history, up to 0.9 at 30 days"""
+        return round(min(len(historical_data) / 30, 1.0) * 0.9, 2)
@@ -2,58 +2,58 @@
 from flask import request, jsonify
 from app.services.integrations.counselor_api import CounselorService
 from app.services.integrations.emergency_services import EmergencyService
+import json
 import threading
-import time
+from datetime import datetime, timedelta
+from database import db
+from content_catalog import catalog
+from notifications import NotificationDispatcher, Channel
+from safety_checks import SafetyCheckScheduler, SAFETY_CHECK_INTERVAL
+from counselor_matching import CounselorMatcher
+from crisis_store import CrisisStore
+
+# A counselor whose connection just failed rejoins the pool after this many seconds
+COUNSELOR_RETRY_DELAY = 5.0
 
 class EmergencyController:
-    def __init__(self):
+    def __init__(self, notify=None):
         self.counselor_service = CounselorService()
         self.emergency_service = EmergencyService()
-        self.active_crises = {}
+        
+        # Unresolved crises indexed by level and status; dashboards subscribe to self.crises for changes
+        self.crises = CrisisStore().start()
+        
+        # notify(user_id, event, data) pushes to a connected user, e.g. a socket emit to their room
+        self.notify = notify
+        
+        # Free counselors indexed by preference, and a priority line for everyone waiting for one
+        self.counselor_matches = {}  # user id -> connection of their current session, until it ends
+        self.crisis_waits = {}  # user id -> crisis waiting on a counselor, marked attended once connected
+        self.counselor_matcher = CounselorMatcher(self.counselor_service.roster(),
+                                                  on_match=self._on_counselor_matched)
+        
+        # One timer thread for every crisis's follow-up checks; pending ones resume after a restart
+        self.safety_checks = SafetyCheckScheduler(self._confirm_safety, self._escalate_emergency).start()
+        
+        # Crisis side effects run concurrently off the request thread, through a durable outbox
+        self.notifications = NotificationDispatcher((
+            Channel('counselor', self._connect_counselor, timeout=10.0),
+            Channel('counselor_callback', self._schedule_callback, timeout=10.0),
+            Channel('emergency_contacts', self._notify_emergency_contacts, timeout=10.0),
+            Channel('safety_protocol', self._start_safety_protocol, timeout=5.0),
+            Channel('immediate_alerts', self._send_immediate_alerts, timeout=5.0, base_delay=0.5),
+            Channel('location_tracking', self._activate_location_tracking, timeout=5.0)
+        )).start()
     
     def trigger_emergency_protocol(self):
         try:
             data = request.get_json()
-            user_id = data.get('user_id')
-            crisis_level = data.get('crisis_level', 'HIGH')
-            location = data.get('location', {})
-            emotion_data = data.get('emotion_data', {})
-            
-            # Store crisis event
-            crisis_id = self._store_crisis_event(user_id, crisis_level, emotion_data)
-            
-            # Immediate actions based on crisis level
-            response = {
-                'crisis_id': crisis_id,
-                'actions_taken': [],
-                'resources_provided': []
-            }
-            
-            if crisis_level in ['HIGH', 'SEVERE']:
-                # Connect to live counselor immediately
-                counselor_connection = self.counselor_service.connect_immediate_counselor(user_id)
-                response['actions_taken'].append('counselor_connected')
-                response['counselor'] = counselor_connection
-                
-                # Notify emergency contacts
-                self._notify_emergency_contacts(user_id, crisis_level)
-                response['actions_taken'].append('contacts_notified')
-                
-                # Provide crisis resources
-                resources = self._get_crisis_resources(location)
-                response['resources_provided'] = resources
-                
-                # Start safety check protocol
-                self._start_safety_protocol(user_id, crisis_id)
-                
-            elif crisis_level == 'MODERATE':
-                # Schedule counselor callback
-                callback = self.counselor_service.schedule_callback(user_id)
-                response['counselor_callback'] = callback
-                
-                # Provide self-help resources
-                resources = self._get_self_help_resources(emotion_data)
-                response['resources_provided'] = resources
+            response = self._respond_to_crisis(
+                data.get('user_id'),
+                data.get('crisis_level', 'HIGH'),
+                data.get('location', {}),
+                data.get('emotion_data', {})
+            )
             
             return jsonify({
                 'success': True,
@@ -63,19 +63,57 @@ class EmergencyController:
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
     
+    def get_crisis_notifications(self, crisis_id):
+        """Delivery state of each side effect started for a crisis"""
+        try:
+            return jsonify({'success': True, 'crisis_id': crisis_id,
+                            'notifications': self.notifications.status(crisis_id)})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def get_active_crises(self):
+        """Unresolved crises for counselor dashboards, optionally ?level=HIGH&status=open"""
+        try:
+            level = request.args.get('level')
+            crises = self.crises.active(level.upper() if level else None, request.args.get('status'))
+            return jsonify({'success': True, 'crises': crises, 'counts': self.crises.counts()})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def get_crisis_changes(self):
+        """Crisis changes after ?since=<change id>, for dashboards resuming their feed"""
+        try:
+            changes = self.crises.changes(request.args.get('since', 0, type=int))
+            return jsonify({'success': True, 'changes': changes})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def resolve_crisis(self, crisis_id):
+        try:
+            data = request.get_json(silent=True) or {}
+            if not self.crises.resolve(crisis_id, data.get('resolution')):
+                return jsonify({'success': False, 'error': 'Crisis not found or already resolved'}), 404
+            
+            # No more follow-up checks once someone has closed the crisis, and no counselor is owed to it
+            self.safety_checks.cancel(crisis_id)
+            crisis = self.crises.get(crisis_id)
+            if self.crisis_waits.get(crisis['user_id']) == crisis_id:
+                self.crisis_waits.pop(crisis['user_id'], None)
+            return jsonify({'success': True, 'crisis': crisis})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
     def connect_live_counselor(self):
         try:
             data = request.get_json()
             user_id = data.get('user_id')
-            preference = data.get('preference', 'any')  # 'male', 'female', 'any'
+            preference = data.get('preference', 'any')  # 'male', 'female', 'any' or a skill
+            crisis_level = data.get('crisis_level', 'MODERATE')
             
-            # Find available counselor matching preference
-            counselor = self.counselor_service.find_available_counselor(preference)
+            # Matched now if a suitable counselor is free, otherwise queued and notified when one frees up
+            counselor, connection = self._match_counselor(user_id, preference, crisis_level)
             
             if counselor:
-                # Establish connection
-                connection = self.counselor_service.establish_connection(user_id, counselor)
-                
                 return jsonify({
                     'success': True,
                     'counselor': counselor,
@@ -83,30 +121,65 @@ class EmergencyController:
                 })
             else:
                 return jsonify({
-                    'success': False,
-                    'message': 'No counselors available. Please try again in few minutes.'
-                }), 503
+                    'success': True,
+                    'queued': True,
+                    'waiting': self.counselor_matcher.waiting(),
+                    'message': "All counselors are busy. You're in line and will be connected as soon as one is free."
+                }), 202
                 
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
     
-    def panic_button(self):
+    def get_counselor_match(self, user_id):
+        """Connection made for a queued user, for clients that poll rather than listen"""
+        connection = self.counselor_matches.get(user_id)
+        return jsonify({'success': True, 'matched': connection is not None, 'connection_details': connection})
+    
+    def leave_counselor_queue(self):
+        """A waiting user no longer wants a counselor"""
         try:
             data = request.get_json()
             user_id = data.get('user_id')
+            left = self.counselor_matcher.cancel(user_id)
+            self.crisis_waits.pop(user_id, None)
             
-            # Immediate highest priority response
-            response = self.trigger_emergency_protocol()
+            return jsonify({'success': True, 'left_queue': left})
             
-            # Additionally, send immediate alerts
-            self._send_immediate_alerts(user_id)
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def end_counselor_session(self):
+        """A counselor has finished a session; hand them straight to the next person in line"""
+        try:
+            data = request.get_json()
+            counselor_id = data.get('counselor_id')
+            # Forget the finished session before the counselor can be matched to someone new
+            for user_id, connection in list(self.counselor_matches.items()):
+                if connection['counselor_id'] == counselor_id:
+                    self.counselor_matches.pop(user_id, None)
+            self.counselor_service.release_counselor(counselor_id)
+            matched_user = self.counselor_matcher.release(counselor_id)
+            
+            return jsonify({'success': True, 'matched_user': matched_user})
+            
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def panic_button(self):
+        try:
+            data = request.get_json()
+            user_id = data.get('user_id')
             
-            # Start location tracking for safety
-            self._activate_location_tracking(user_id)
+            # Immediate highest priority response, plus alerts and location tracking for safety
+            response = self._respond_to_crisis(
+                user_id, 'SEVERE', data.get('location', {}), data.get('emotion_data', {}),
+                extra_channels=('immediate_alerts', 'location_tracking')
+            )
             
             return jsonify({
                 'success': True,
                 'message': 'Emergency response activated',
+                'crisis_id': response['crisis_id'],
                 'immediate_help_contacted': True,
                 'stay_on_line': True
             })
@@ -114,15 +187,126 @@ class EmergencyController:
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
     
-    def _start_safety_protocol(self, user_id, crisis_id):
+    def _respond_to_crisis(self, user_id, crisis_level, location, emotion_data, extra_channels=()):
+        """Record the crisis and start its side effects; returns without waiting for any of them"""
+        crisis_id = self._store_crisis_event(user_id, crisis_level, emotion_data)
+        
+        # Immediate actions based on crisis level
+        if crisis_level in ['HIGH', 'SEVERE']:
+            channels = ('counselor', 'emergency_contacts', 'safety_protocol')
+            resources = self._get_crisis_resources(location)
+        elif crisis_level == 'MODERATE':
+            channels = ('counselor_callback',)
+            resources = self._get_self_help_resources(emotion_data)
+        else:
+            channels, resources = (), []
+        channels += tuple(extra_channels)
+        
+        payload = {'user_id': user_id, 'crisis_id': crisis_id, 'crisis_level': crisis_level}
+        queued = self.notifications.dispatch(crisis_id, user_id, {channel: payload for channel in channels})
+        
+        return {
+            'crisis_id': crisis_id,
+            'actions_taken': [f'{channel}_queued' for channel in queued],
+            'resources_provided': resources
+        }
+    
+    def _store_crisis_event(self, user_id, crisis_level, emotion_data):
+        return self.crises.open(user_id, crisis_level)['id']
+    
+    def _get_crisis_resources(self, location):
+        return json.loads(catalog.get('emergency', 'high', default_key='moderate').payload)
+    
+    def _get_self_help_resources(self, emotion_data):
+        return json.loads(catalog.get('emergency', 'moderate', default_key='moderate').payload)
+    
+    def _connect_counselor(self, payload):
+        counselor, connection = self._match_counselor(
+            payload['user_id'], 'any', payload['crisis_level'], crisis_id=payload['crisis_id']
+        )
+        return connection if counselor else {'queued': True}
+    
+    def _match_counselor(self, user_id, preference, crisis_level, crisis_id=None):
+        """Connect a free counselor, or put the user in line; returns (counselor, connection) or (None, None)"""
+        # A new request replaces the user's place in line and any earlier session's result
+        self.counselor_matches.pop(user_id, None)
+        if crisis_id is None:
+            crisis_id = self.crisis_waits.get(user_id)
+        counselor = self.counselor_matcher.request(user_id, preference, crisis_level)
+        if counselor is None:
+            if crisis_id is not None:
+                self.crisis_waits[user_id] = crisis_id
+            return None, None
+        self.crisis_waits.pop(user_id, None)
+        try:
+            connection = self.counselor_service.establish_connection(user_id, counselor)
+        except Exception:
+            self.counselor_matcher.release(counselor['id'])
+            raise
+        self._connected(user_id, counselor, connection, crisis_id)
+        return counselor, connection
+    
+    def _on_counselor_matched(self, ticket, counselor):
+        """A counselor freed up for a queued user"""
+        try:
+            connection = self.counselor_service.establish_connection(ticket.user_id, counselor)
+        except Exception as e:
+            print(f"Connecting queued user {ticket.user_id} to {counselor['id']} failed, requeued: {e}")
+            # Back to their old place in line; the counselor rejoins after a pause rather than failing in a loop
+            self.counselor_matcher.requeue(ticket)
+            threading.Timer(COUNSELOR_RETRY_DELAY, self.counselor_matcher.release, (counselor['id'],)).start()
+            return
+        self._connected(ticket.user_id, counselor, connection, self.crisis_waits.pop(ticket.user_id, None))
+        if self.notify is not None:
+            self.notify(ticket.user_id, 'counselor_matched', {
+                'counselor': counselor,
+                'connection_details': connection,
+                'waited_seconds': round(ticket.waited, 1)
+            })
+    
+    def _connected(self, user_id, counselor, connection, crisis_id):
+        self.counselor_matches[user_id] = connection
+        if crisis_id is not None:
+            self.crises.record_action(crisis_id, f"counselor connected: {counselor['id']}", counselor_contacted=True)
+    
+    def _schedule_callback(self, payload):
+        return self.counselor_service.schedule_callback(payload['user_id'])
+    
+    def _notify_emergency_contacts(self, payload):
+        user = db.get_user(payload['user_id'])
+        if not user or not user['emergency_contact_phone']:
+            return {'notified': False, 'reason': 'No emergency contact on file'}
+        return self.emergency_service.notify_contact(
+            user['emergency_contact_name'],
+            user['emergency_contact_phone'],
+            f"{user['name']} may need support right now. Please reach out to them."
+        )
+    
+    def _send_immediate_alerts(self, payload):
+        return self.emergency_service.send_alert(payload['user_id'], payload['crisis_level'])
+    
+    def _activate_location_tracking(self, payload):
+        return self.emergency_service.start_location_tracking(payload['user_id'])
+    
+    def _start_safety_protocol(self, payload):
         """Start automated safety checking"""
-        def safety_check():
-            for i in range(6):  # Check for 30 minutes
-                time.sleep(300)  # 5 minutes
-                if not self._confirm_safety(user_id):
-                    # Escalate emergency
-                    self._escalate_emergency(user_id, crisis_id)
+        return {'check_id': self.safety_checks.schedule(payload['user_id'], payload['crisis_id'])}
+    
+    def _confirm_safety(self, user_id, crisis_id):
+        """Safe once the crisis is resolved or the user has written since the last check"""
+        crisis = self.crises.get(crisis_id)
+        if crisis and crisis['status'] == 'resolved':
+            return True
         
-        thread = threading.Thread(target=safety_check)
-        thread.daemon = True
-        thread.start()
\ No newline at end of file
+        # /api/chat and the user_message socket event persist every message the user sends
+        since = (datetime.utcnow() - timedelta(seconds=SAFETY_CHECK_INTERVAL)).strftime('%Y-%m-%d %H:%M:%S')
+        return db.user_wrote_since(user_id, since)
+    
+    def _escalate_emergency(self, user_id, crisis_id):
+        """Called at most once per crisis, when a safety check goes unanswered"""
+        counselor, _ = self._match_counselor(user_id, 'any', 'SEVERE', crisis_id=crisis_id)
+        if counselor is None:
+            # Marked attended only once a counselor is actually connected
+            self.crises.record_action(crisis_id, 'escalated: safety check unanswered, queued for a counselor')
+        else:
+            self.crises.record_action(crisis_id, 'escalated: safety check unanswered')
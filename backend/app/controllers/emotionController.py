@@ -5,11 +5,24 @@ from app.services.ai_services.crisis_predictor import CrisisPredictor
 import base64
 import cv2
 import numpy as np
+from datetime import datetime
+from database import db
+from emotion_fusion import EmotionFusion, modality_reading
+
+# Fused valence below this suggests grounding and support; above the upper one, reinforcement
+DISTRESSED_VALENCE = -0.4
+POSITIVE_VALENCE = 0.4
 
 class EmotionController:
-    def __init__(self):
+    def __init__(self, notify=None):
         self.emotion_detector = AdvancedEmotionDetector()
         self.crisis_predictor = CrisisPredictor()
+        
+        # notify(user_id, event, data) pushes to a connected user, e.g. a socket emit to their room
+        self.notify = notify
+        
+        # Latest reading per modality for each user, fused as they are stored
+        self.fusion = EmotionFusion(on_change=self._on_fused_emotion_change)
     
     def analyze_text_emotion(self):
         try:
@@ -84,6 +97,9 @@ class EmotionController:
             import os
             os.remove(audio_path)
             
+            if analysis.get('success'):
+                self._store_emotion_analysis(user_id, 'voice', analysis)
+            
             return jsonify(analysis)
             
         except Exception as e:
@@ -94,15 +110,8 @@ class EmotionController:
             data = request.get_json()
             user_id = data.get('user_id')
             
-            # Get all emotion data from last session
-            text_emotion = self._get_recent_text_emotion(user_id)
-            facial_emotion = self._get_recent_facial_emotion(user_id)
-            voice_emotion = self._get_recent_voice_emotion(user_id)
-            
-            # Combine analyses
-            combined_analysis = self._fuse_emotion_modalities(
-                text_emotion, facial_emotion, voice_emotion
-            )
+            # Latest text, facial and voice readings, already fused when they were stored
+            combined_analysis = self.fusion.combined(user_id)
             
             return jsonify({
                 'success': True,
@@ -117,4 +126,28 @@ class EmotionController:
         # Convert base64 string to OpenCV image
         encoded_data = base64_string.split(',')[1]
         nparr = np.frombuffer(base64.b64decode(encoded_data), np.uint8)
-        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
\ No newline at end of file
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    
+    def _store_emotion_analysis(self, user_id, modality, analysis):
+        """Record a detector's result and fold it into the user's fused emotion"""
+        reading = modality_reading(modality, analysis)
+        if reading is None:
+            return None
+        emotions, confidence = reading
+        emotion = max(emotions, key=emotions.get)
+        db.track_emotion(user_id, emotion, emotions[emotion], modality)
+        return self.fusion.update(user_id, modality, emotions, confidence)
+    
+    def _on_fused_emotion_change(self, user_id, combined):
+        if self.notify is not None:
+            self.notify(user_id, 'emotion_changed', combined)
+    
+    def _get_recommended_actions(self, combined):
+        if combined['dominant_emotion'] is None:
+            return ['Share how you feel or start an emotion scan to get suggestions']
+        if combined['valence'] <= DISTRESSED_VALENCE:
+            return ['Try a grounding breathing exercise', 'Talk it through with the AI companion',
+                    'Reach out to a counselor if this feeling persists']
+        if combined['valence'] >= POSITIVE_VALENCE:
+            return ['Note what is going well in your journal', 'Keep up your current routine']
+        return ['Take a short mindfulness break', 'Check in again later today']
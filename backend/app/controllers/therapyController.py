@@ -1,13 +1,12 @@
 # backend/app/controllers/therapyController.py
 from flask import request, jsonify
 from app.services.ai_services.response_generator import ResponseGenerator
+from content_catalog import catalog
 import json
-import random
 
 class TherapyController:
     def __init__(self):
         self.response_generator = ResponseGenerator()
-        self.exercises = self._load_therapy_exercises()
     
     def chat_with_ai_therapist(self):
         try:
@@ -49,12 +48,13 @@ class TherapyController:
             duration = data.get('duration', 5)  # minutes
             difficulty = data.get('difficulty', 'beginner')
             
-            exercise = self.exercises['breathing'][difficulty]
-            exercise['duration'] = duration
+            exercise = catalog.get('therapy_breathing', difficulty)
+            if exercise is None:
+                return jsonify({'success': False, 'error': f'Unknown difficulty: {difficulty}'}), 404
             
-            return jsonify({
-                'success': True,
-                'exercise': exercise,
+            # The catalog's bytes as they are, with the per-request fields alongside
+            return catalog.respond(request, exercise, 'exercise', {
+                'duration': duration,
                 'instructions': self._generate_breathing_instructions(duration)
             })
             
@@ -67,12 +67,12 @@ class TherapyController:
             theme = data.get('theme', 'mindfulness')
             duration = data.get('duration', 10)
             
-            meditation = self.exercises['meditation'][theme]
-            meditation['duration'] = duration
+            meditation = catalog.get('meditation', theme)
+            if meditation is None:
+                return jsonify({'success': False, 'error': f'Unknown theme: {theme}'}), 404
             
-            return jsonify({
-                'success': True,
-                'meditation': meditation,
+            return catalog.respond(request, meditation, 'meditation', {
+                'duration': duration,
                 'audio_url': self._get_meditation_audio(theme, duration)
             })
             
@@ -82,61 +82,11 @@ class TherapyController:
     def get_journaling_prompts(self):
         try:
             emotion = request.args.get('emotion', 'general')
-            prompts = self.exercises['journaling'][emotion]
+            prompts = catalog.get('journaling', emotion)
+            if prompts is None:
+                return jsonify({'success': False, 'error': f'Unknown emotion: {emotion}'}), 404
             
-            return jsonify({
-                'success': True,
-                'prompts': random.sample(prompts, 3)  # Return 3 random prompts
-            })
+            return catalog.respond(request, prompts, 'prompts')
             
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
-    
-    def _load_therapy_exercises(self):
-        return {
-            'breathing': {
-                'beginner': {
-                    'name': '4-7-8 Breathing',
-                    'description': 'Calming breathing technique for stress relief',
-                    'pattern': [4, 7, 8],  # inhale, hold, exhale
-                    'cycles': 10
-                },
-                'intermediate': {
-                    'name': 'Box Breathing',
-                    'description': 'Military technique for focus and calm',
-                    'pattern': [4, 4, 4, 4],  # inhale, hold, exhale, hold
-                    'cycles': 12
-                }
-            },
-            'meditation': {
-                'mindfulness': {
-                    'name': 'Mindfulness Meditation',
-                    'description': 'Focus on present moment awareness'
-                },
-                'loving_kindness': {
-                    'name': 'Loving Kindness Meditation',
-                    'description': 'Cultivate compassion for self and others'
-                },
-                'body_scan': {
-                    'name': 'Body Scan Meditation',
-                    'description': 'Progressive relaxation through body awareness'
-                }
-            },
-            'journaling': {
-                'anxiety': [
-                    "What's causing your anxiety right now?",
-                    "What evidence supports your worried thoughts?",
-                    "What would you tell a friend with these worries?"
-                ],
-                'depression': [
-                    "What small thing brought you joy today?",
-                    "What are you grateful for right now?",
-                    "What would you like to accomplish this week?"
-                ],
-                'anger': [
-                    "What triggered your anger?",
-                    "How does your body feel when angry?",
-                    "What's a constructive way to express this feeling?"
-                ]
-            }
-        }
\ No newline at end of file
@@ -3,6 +3,7 @@ import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from transformers import pipeline
 import numpy as np
+from metrics import stage_timer, timed
 
 class CrisisPredictor:
     def __init__(self):
@@ -13,13 +14,16 @@ class CrisisPredictor:
         )
         self.ml_model = RandomForestClassifier()
         
+    @timed('crisis_predictor', 'analyze_text_crisis')
     def analyze_text_crisis(self, text_input, user_history):
         """Analyze text for crisis indicators"""
         # Sentiment analysis
-        sentiment = self.sentiment_analyzer(text_input)[0]
+        with stage_timer('crisis_predictor', 'sentiment'):
+            sentiment = self.sentiment_analyzer(text_input)[0]
         
         # Suicide risk detection
-        risk_assessment = self.suicide_risk_classifier(text_input)[0]
+        with stage_timer('crisis_predictor', 'risk_classifier'):
+            risk_assessment = self.suicide_risk_classifier(text_input)[0]
         
         # Pattern matching for crisis keywords
         crisis_keywords = ['suicide', 'kill myself', 'end it all', 'want to die']
@@ -40,6 +44,7 @@ class CrisisPredictor:
             'recommended_intervention': self._get_intervention_protocol(crisis_level)
         }
     
+    @timed('crisis_predictor', 'predict_mood_trends')
     def predict_mood_trends(self, user_data):
         """Predict future mood trends using ML"""
         features = self._extract_features(user_data)
@@ -6,6 +6,7 @@ from fer import FER
 import dlib
 from deepface import DeepFace
 import mediapipe as mp
+from metrics import stage_timer, timed
 
 class AdvancedEmotionDetector:
     def __init__(self):
@@ -20,26 +21,31 @@ class AdvancedEmotionDetector:
             min_detection_confidence=0.5
         )
     
+    @timed('emotion_detector', 'multi_model_emotion_analysis')
     def multi_model_emotion_analysis(self, image_path):
         """Combine multiple models for accurate emotion detection"""
         try:
             # FER Analysis
-            image = cv2.imread(image_path)
-            fer_results = self.detector.detect_emotions(image)
+            with stage_timer('emotion_detector', 'fer'):
+                image = cv2.imread(image_path)
+                fer_results = self.detector.detect_emotions(image)
             
             # DeepFace Analysis
-            deepface_analysis = DeepFace.analyze(img_path=image_path, actions=['emotion'])
+            with stage_timer('emotion_detector', 'deepface'):
+                deepface_analysis = DeepFace.analyze(img_path=image_path, actions=['emotion'])
             
             # MediaPipe for facial landmarks
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            mediapipe_results = self.face_mesh.process(rgb_image)
+            with stage_timer('emotion_detector', 'mediapipe'):
+                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                mediapipe_results = self.face_mesh.process(rgb_image)
             
             # Combine results
-            combined_emotion = self._fuse_emotions(
-                fer_results, 
-                deepface_analysis, 
-                mediapipe_results
-            )
+            with stage_timer('emotion_detector', 'fusion'):
+                combined_emotion = self._fuse_emotions(
+                    fer_results, 
+                    deepface_analysis, 
+                    mediapipe_results
+                )
             
             return {
                 'success': True,
@@ -3,12 +3,14 @@ import librosa
 import numpy as np
 import tensorflow as tf
 from sklearn.svm import SVC
+from metrics import stage_timer, timed
 
 class VoiceAnalyzer:
     def __init__(self):
         self.model = self._load_voice_emotion_model()
         self.emotions = ['neutral', 'calm', 'happy', 'sad', 'angry', 'fearful', 'disgust', 'surprised']
     
+    @timed('voice_analyzer', 'analyze_voice_emotion')
     def analyze_voice_emotion(self, audio_path):
         try:
             # Extract audio features
@@ -18,8 +20,9 @@ class VoiceAnalyzer:
                 return {'success': False, 'error': 'Could not extract audio features'}
             
             # Predict emotion
-            prediction = self.model.predict([features])
-            confidence = np.max(self.model.predict_proba([features]))
+            with stage_timer('voice_analyzer', 'predict'):
+                prediction = self.model.predict([features])
+                confidence = np.max(self.model.predict_proba([features]))
             
             emotion_index = prediction[0]
             emotion = self.emotions[emotion_index]
@@ -39,6 +42,7 @@ class VoiceAnalyzer:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @timed('voice_analyzer', 'feature_extraction')
     def _extract_audio_features(self, audio_path):
         try:
             # Load audio file
@@ -0,0 +1,78 @@
+# backend/app/services/integrations/counselor_api.py
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Stand-in roster until a real counselor platform is connected
+DEFAULT_COUNSELORS = (
+    {'id': 'counselor-1', 'name': 'Counselor A', 'gender': 'female', 'skills': ('crisis', 'anxiety')},
+    {'id': 'counselor-2', 'name': 'Counselor B', 'gender': 'male', 'skills': ('crisis', 'depression')},
+    {'id': 'counselor-3', 'name': 'Counselor C', 'gender': 'female', 'skills': ('grief', 'anxiety')}
+)
+
+class CounselorService:
+    """Local stub of the counselor platform.
+
+    Keeps an in-process roster and can add latency and random failures to
+    every call, so the emergency flow can be exercised without the real
+    service.
+    """
+
+    def __init__(self, counselors=DEFAULT_COUNSELORS, latency=0.0, failure_rate=0.0, seed=None):
+        self.counselors = {counselor['id']: dict(counselor, available=True) for counselor in counselors}
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def roster(self):
+        """Every counselor on the platform, available or not"""
+        with self._lock:
+            return [self._public(counselor) for counselor in self.counselors.values()]
+
+    def find_available_counselor(self, preference='any'):
+        self._call()
+        with self._lock:
+            for counselor in self.counselors.values():
+                if counselor['available'] and preference in ('any', counselor['gender']):
+                    return self._public(counselor)
+        return None
+
+    def establish_connection(self, user_id, counselor):
+        self._call()
+        with self._lock:
+            self.counselors[counselor['id']]['available'] = False
+        return {
+            'room': f'counsel-{uuid.uuid4().hex[:12]}',
+            'counselor_id': counselor['id'],
+            'user_id': user_id,
+            'connected_at': datetime.utcnow().isoformat()
+        }
+
+    def release_counselor(self, counselor_id):
+        with self._lock:
+            self.counselors[counselor_id]['available'] = True
+
+    def connect_immediate_counselor(self, user_id):
+        counselor = self.find_available_counselor()
+        if counselor is None:
+            raise RuntimeError('No counselor available')
+        return self.establish_connection(user_id, counselor)
+
+    def schedule_callback(self, user_id, within_minutes=30):
+        self._call()
+        return {
+            'user_id': user_id,
+            'scheduled_for': (datetime.utcnow() + timedelta(minutes=within_minutes)).isoformat()
+        }
+
+    def _public(self, counselor):
+        return {key: value for key, value in counselor.items() if key != 'available'}
+
+    def _call(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise ConnectionError('Counselor service unavailable')
@@ -0,0 +1,38 @@
+# backend/app/services/integrations/emergency_services.py
+import random
+import threading
+import time
+from datetime import datetime
+
+class EmergencyService:
+    """Local stub of the alerting and emergency-contact provider.
+
+    Records every message it would have sent in `sent`, and can add latency
+    and random failures to every call.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def notify_contact(self, name, phone, message):
+        return self._record('contact', name=name, phone=phone, message=message)
+
+    def send_alert(self, user_id, crisis_level):
+        return self._record('alert', user_id=user_id, crisis_level=crisis_level)
+
+    def start_location_tracking(self, user_id):
+        return self._record('location_tracking', user_id=user_id)
+
+    def _record(self, kind, **details):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise ConnectionError('Emergency service unavailable')
+        message = dict(details, kind=kind, sent_at=datetime.utcnow().isoformat())
+        with self._lock:
+            self.sent.append(message)
+        return message
@@ -0,0 +1,160 @@
+# backend/benchmarks/bench_admission.py
+"""Emergency latency while chat traffic overloads the server, with and without admission control.
+
+Serves the app from a fixed pool of worker threads, as gunicorn's gthread
+workers do, once with ADMISSION_CONTROL=off and once with it on. Each
+time it starts /api/chat requests at a fixed rate above what the workers
+can answer, and meanwhile probes /api/emergency/help at a steady rate. Chat replies get
+a simulated model cost that releases the GIL, as native inference does,
+since the keyword detector alone is too cheap to saturate anything. Without
+priority lanes the emergency probe waits for a free worker behind the chat
+backlog. With them, chat holds at most capacity + queue workers, the excess
+is shed with 503s, and the emergency p99 stays close to its unloaded value.
+Needs the client extras: pip install aiohttp
+
+    python benchmarks/bench_admission.py --chat-rate 300 --workers 32 --capacity 8 --model-ms 200
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def chat_once(session, statuses):
+    payload = {'message': 'I feel anxious and overwhelmed today', 'user_id': 'flood'}
+    try:
+        async with session.post('/api/chat', json=payload) as response:
+            await response.read()
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+    except aiohttp.ClientError:
+        statuses['error'] = statuses.get('error', 0) + 1
+
+async def flood_chat(session, deadline, rate, statuses):
+    """Open-loop chat arrivals: a new request every 1/rate seconds however slow the replies"""
+    pending = set()
+    next_at = time.monotonic()
+    while time.monotonic() < deadline:
+        task = asyncio.create_task(chat_once(session, statuses))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        next_at += 1 / rate
+        await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+    for task in list(pending):
+        task.cancel()
+    statuses['unfinished'] = len(pending)
+
+async def probe_emergency(session, deadline, interval, latencies, failures):
+    payload = {'user_id': 'probe', 'crisis_level': 'high'}
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            async with session.post('/api/emergency/help', json=payload) as response:
+                await response.read()
+                if response.status != 200:
+                    failures.append(response.status)
+        except aiohttp.ClientError as e:
+            failures.append(str(e))
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+
+async def measure(base_url, chat_rate, duration, probe_interval):
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=timeout) as session:
+        # Unloaded emergency latency first, then the same probe under the chat flood
+        idle = []
+        await probe_emergency(session, time.monotonic() + 3, probe_interval, idle, [])
+
+        loaded, failures, statuses = [], [], {}
+        deadline = time.monotonic() + duration
+        await asyncio.gather(
+            probe_emergency(session, deadline, probe_interval, loaded, failures),
+            flood_chat(session, deadline, chat_rate, statuses)
+        )
+    return idle, loaded, failures, statuses
+
+def serve(port, model_ms, workers):
+    """Run the app on a bounded thread pool with chat detection slowed by model_ms"""
+    sys.path.insert(0, BACKEND_DIR)
+    from werkzeug.serving import BaseWSGIServer
+    import app as app_module
+    detect = app_module.emotion_detector.detect_from_text
+
+    def detect_with_model_cost(text):
+        time.sleep(model_ms / 1000)
+        return detect(text)
+
+    class PooledWSGIServer(BaseWSGIServer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(workers)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    app_module.emotion_detector.detect_from_text = detect_with_model_cost
+    PooledWSGIServer('127.0.0.1', port, app_module.app).serve_forever()
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run(args, admission):
+    env = dict(os.environ, ADMISSION_CONTROL=admission, ADMISSION_CAPACITY=str(args.capacity),
+               ADMISSION_CHAT_QUEUE=str(args.queue))
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(args.port),
+         '--model-ms', str(args.model_ms), '--workers', str(args.workers)],
+        cwd=tempfile.mkdtemp(prefix='bench_admission_'),
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        time.sleep(3)
+        return asyncio.run(measure(f'http://127.0.0.1:{args.port}', args.chat_rate,
+                                   args.duration, args.probe_interval / 1000))
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chat-rate', type=float, default=300, help='Chat requests started per second')
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=32, help='Server worker threads')
+    parser.add_argument('--capacity', type=int, default=8, help='ADMISSION_CAPACITY for the server')
+    parser.add_argument('--queue', type=int, default=8, help='ADMISSION_CHAT_QUEUE for the server')
+    parser.add_argument('--probe-interval', type=float, default=50, help='Milliseconds between emergency probes')
+    parser.add_argument('--model-ms', type=float, default=200, help='Simulated inference time of each chat reply')
+    parser.add_argument('--port', type=int, default=5057)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.port, args.model_ms, args.workers)
+
+    print(f"{'admission':<11}{'idle p99':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'failed':>8}"
+          f"{'chat ok/s':>11}{'chat 503/s':>12}{'unfinished':>12}")
+    for admission in ('off', 'on'):
+        idle, loaded, failures, statuses = run(args, admission)
+        print(f"{admission:<11}{percentile(idle, 99):>10.1f}{percentile(loaded, 50):>9.1f}"
+              f"{percentile(loaded, 95):>9.1f}{percentile(loaded, 99):>9.1f}{len(failures):>8}"
+              f"{statuses.get(200, 0) / args.duration:>11.0f}{statuses.get(503, 0) / args.duration:>12.0f}"
+              f"{statuses.get('unfinished', 0):>12}")
+    print('Emergency latencies in ms')
+
+if __name__ == '__main__':
+    main()
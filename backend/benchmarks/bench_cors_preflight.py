@@ -0,0 +1,73 @@
+# backend/benchmarks/bench_cors_preflight.py
+"""HTTP requests per /api/chat turn with the browser's preflight cache modelled.
+
+A JSON POST from the frontend origin is not a "simple" request, so the
+browser preflights it unless it still has a cached preflight answer for
+that URL. The cache lifetime comes from Access-Control-Max-Age; without it
+Chromium keeps the answer for only 5 seconds. This replays a chat
+conversation against the Flask test client, sends a preflight whenever the
+modelled cache has expired, and counts requests.
+
+    python benchmarks/bench_cors_preflight.py --turns 60 --think-time 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+ORIGIN = 'http://localhost:3000'
+BROWSER_DEFAULT_MAX_AGE = 5  # Chromium's cache lifetime when the header is missing
+BROWSER_MAX_AGE_CAP = 7200  # Chromium never caches longer than this
+
+def replay(client, turns, think_time, honour_max_age):
+    """Replay a conversation and return (total requests, preflights, preflight ms)"""
+    clock = 0.0
+    cached_until = -1.0
+    requests_sent = preflights = 0
+    preflight_ms = []
+
+    for turn in range(turns):
+        if clock >= cached_until:
+            start = time.perf_counter()
+            response = client.options('/api/chat', headers={
+                'Origin': ORIGIN,
+                'Access-Control-Request-Method': 'POST',
+                'Access-Control-Request-Headers': 'content-type'
+            })
+            preflight_ms.append((time.perf_counter() - start) * 1000)
+            requests_sent += 1
+            preflights += 1
+
+            max_age = BROWSER_DEFAULT_MAX_AGE
+            if honour_max_age and 'Access-Control-Max-Age' in response.headers:
+                max_age = min(int(response.headers['Access-Control-Max-Age']), BROWSER_MAX_AGE_CAP)
+            cached_until = clock + max_age
+
+        client.post('/api/chat', json={'message': f'message {turn}', 'user_id': 'bench'},
+                    headers={'Origin': ORIGIN})
+        requests_sent += 1
+        clock += think_time
+
+    return requests_sent, preflights, sum(preflight_ms) / len(preflight_ms)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=60)
+    parser.add_argument('--think-time', type=float, default=20.0, help='Seconds between chat turns')
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_cors_'))
+    import app as app_module
+    client = app_module.app.test_client()
+
+    print(f"{'mode':<22}{'requests':>10}{'preflights':>12}{'req/turn':>10}{'preflight ms':>14}")
+    for label, honour in (('without max-age', False), ('with max-age', True)):
+        sent, preflights, latency = replay(client, args.turns, args.think_time, honour)
+        print(f"{label:<22}{sent:>10}{preflights:>12}{sent / args.turns:>10.2f}{latency:>14.3f}")
+
+if __name__ == '__main__':
+    main()
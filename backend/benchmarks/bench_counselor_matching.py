@@ -0,0 +1,131 @@
+# backend/benchmarks/bench_counselor_matching.py
+"""Counselor matching at scale: indexed matcher against a linear scan.
+
+Builds --counselors counselors with a random gender and skills, then has
+--users users ask for one, each with a random preference and crisis level,
+so most of them end up waiting. Counselors then finish sessions in random
+order until the line is empty or nobody left can be served. The same arrivals
+and releases are replayed through CounselorMatcher and through a list scan
+like the one it replaced, and the two must make the same matches.
+
+    python benchmarks/bench_counselor_matching.py --counselors 1000 --users 10000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from counselor_matching import CounselorMatcher, Ticket, LEVEL_OFFSETS
+
+SKILLS = ('crisis', 'anxiety', 'depression', 'grief', 'trauma', 'addiction')
+LEVELS = ('SEVERE', 'HIGH', 'MODERATE', 'LOW')
+
+class ScanMatcher:
+    """The obvious version: a list of free counselors and a list of waiting users"""
+
+    def __init__(self, counselors, on_match, clock):
+        self.on_match = on_match
+        self.clock = clock
+        self.counselors = {counselor['id']: counselor for counselor in counselors}
+        self.seq = itertools.count()
+        self.free = {counselor['id']: (clock(), next(self.seq)) for counselor in counselors}
+        self.line = []
+
+    def request(self, user_id, preference='any', crisis_level='HIGH'):
+        candidates = [(since, counselor_id) for counselor_id, since in self.free.items()
+                      if _serves(self.counselors[counselor_id], preference)]
+        if candidates:
+            _, counselor_id = min(candidates)
+            del self.free[counselor_id]
+            return self.counselors[counselor_id]
+        now = self.clock()
+        self.line.append((now + LEVEL_OFFSETS[crisis_level], next(self.seq), user_id, preference, now))
+        return None
+
+    def release(self, counselor_id):
+        counselor = self.counselors[counselor_id]
+        eligible = [entry for entry in self.line if _serves(counselor, entry[3])]
+        if not eligible:
+            self.free[counselor_id] = (self.clock(), next(self.seq))
+            return None
+        best = min(eligible)
+        self.line.remove(best)
+        self.on_match(Ticket(best[2], best[3], None, best[4]), counselor)
+        return best[2]
+
+def _serves(counselor, preference):
+    return preference in ('any', counselor['gender']) or preference in counselor['skills']
+
+def workload(args):
+    rng = random.Random(args.seed)
+    counselors = [{
+        'id': f'counselor-{i}',
+        'gender': rng.choice(('female', 'male')),
+        'skills': tuple(rng.sample(SKILLS, rng.randint(1, 3)))
+    } for i in range(args.counselors)]
+    preferences = ('any',) * 6 + ('female', 'male') + SKILLS
+    users = [(f'user-{i}', rng.choice(preferences), rng.choices(LEVELS, (1, 3, 4, 2))[0])
+             for i in range(args.users)]
+    return counselors, users, rng
+
+def replay(matcher_class, counselors, users, rng):
+    now = [0.0]
+    clock = lambda: now[0]
+    busy, matches, timings = [], [], {'request': [], 'release': []}
+
+    def on_match(ticket, counselor):
+        matches.append((ticket.user_id, counselor['id']))
+        busy.append(counselor['id'])
+
+    matcher = matcher_class(counselors, on_match=on_match, clock=clock)
+    for user_id, preference, level in users:
+        now[0] += 0.05
+        start = time.perf_counter()
+        counselor = matcher.request(user_id, preference, level)
+        timings['request'].append(time.perf_counter() - start)
+        if counselor is not None:
+            matches.append((user_id, counselor['id']))
+            busy.append(counselor['id'])
+
+    # Sessions end in random order; each freed counselor takes the next person they can serve
+    while busy:
+        now[0] += 0.05
+        counselor_id = busy.pop(rng.randrange(len(busy)))
+        start = time.perf_counter()
+        matcher.release(counselor_id)
+        timings['release'].append(time.perf_counter() - start)
+    return matches, timings
+
+def summarize(name, timings):
+    for op, samples in timings.items():
+        samples = sorted(samples)
+        if samples:
+            p99 = samples[int(len(samples) * 0.99)]
+            print(f"  {name:8} {op:8} n={len(samples):6}  mean {sum(samples) / len(samples) * 1e6:8.1f}us  "
+                  f"p99 {p99 * 1e6:8.1f}us  total {sum(samples):6.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counselors', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    results = {}
+    for name, matcher_class in (('indexed', CounselorMatcher), ('scan', ScanMatcher)):
+        counselors, users, rng = workload(args)
+        results[name] = replay(matcher_class, counselors, users, rng)
+
+    indexed, scan = results['indexed'][0], results['scan'][0]
+    print(f"counselors: {args.counselors}, users: {args.users}, matched: {len(indexed)}")
+    print(f"same matches as the scan: {indexed == scan}")
+    for name, (_, timings) in results.items():
+        summarize(name, timings)
+
+if __name__ == '__main__':
+    main()
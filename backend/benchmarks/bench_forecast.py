@@ -0,0 +1,91 @@
+# backend/benchmarks/bench_forecast.py
+"""Accuracy and latency of the Holt fast path against the per-user random forest.
+
+Generates synthetic daily mood series (level, drift, weekend lift, noise and
+occasional shocks). Each history length is fitted with both models and
+forecast over the horizon; the report shows mean absolute error against the
+held-out days, how often the Holt 95% interval covered the truth, and the
+fit + forecast time per user.
+
+    python benchmarks/bench_forecast.py --users 200 --lengths 7 14 21 28 60 90
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'app', 'controllers'))
+os.chdir(tempfile.mkdtemp(prefix='bench_forecast_'))
+
+from analyticsController import AnalyticsController
+
+def synthetic_history(rng, length, horizon):
+    """One user's mood series of length + horizon days, clipped to [-1, 1]"""
+    start = datetime(2026, 1, 1) + timedelta(days=int(rng.integers(0, 7)))
+    dates = [start + timedelta(days=i) for i in range(length + horizon)]
+    level = rng.uniform(-0.5, 0.5)
+    drift = rng.normal(0, 0.01)
+    weekend = rng.uniform(-0.2, 0.3)
+    noise = rng.uniform(0.05, 0.25)
+    moods = []
+    for i, date in enumerate(dates):
+        if rng.random() < 0.03:
+            level += rng.normal(0, 0.3)
+        mood = level + drift * i + (weekend if date.weekday() >= 5 else 0) + rng.normal(0, noise)
+        moods.append(float(np.clip(mood, -1, 1)))
+    history = [
+        {'date': date.strftime('%Y-%m-%d'), 'mood': mood, 'readings': 10}
+        for date, mood in zip(dates, moods)
+    ]
+    return history[:length], moods[length:]
+
+def evaluate(controller, histories, horizon):
+    results = {}
+    for name in ('holt', 'random_forest'):
+        errors, covered, elapsed = [], [], 0.0
+        for history, truth in histories:
+            start = time.perf_counter()
+            if name == 'holt':
+                predictions = controller._fast_forecast(history, horizon)
+            else:
+                model = controller._train_mood_model(history)
+                features = controller._prepare_prediction_features(history)
+                predictions = controller._predict_future_mood(model, features, horizon)
+            elapsed += time.perf_counter() - start
+
+            for prediction, actual in zip(predictions, truth):
+                errors.append(abs(prediction['predicted_mood'] - actual))
+                if 'lower' in prediction:
+                    covered.append(prediction['lower'] <= actual <= prediction['upper'])
+        results[name] = {
+            'mae': float(np.mean(errors)),
+            'coverage': float(np.mean(covered)) if covered else None,
+            'ms_per_user': elapsed / len(histories) * 1000
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[7, 14, 21, 28, 60, 90])
+    parser.add_argument('--horizon', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    controller = AnalyticsController()
+    print(f"{'days':>5}{'holt MAE':>10}{'forest MAE':>12}{'holt 95% cov':>14}{'holt ms':>10}{'forest ms':>11}")
+    for length in args.lengths:
+        rng = np.random.default_rng(args.seed)
+        histories = [synthetic_history(rng, length, args.horizon) for _ in range(args.users)]
+        results = evaluate(controller, histories, args.horizon)
+        holt, forest = results['holt'], results['random_forest']
+        print(f"{length:>5}{holt['mae']:>10.3f}{forest['mae']:>12.3f}{holt['coverage']:>14.0%}"
+              f"{holt['ms_per_user']:>10.2f}{forest['ms_per_user']:>11.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# backend/benchmarks/bench_retention.py
+"""Hot database size and query latency before and after retention compaction.
+
+    python benchmarks/bench_retention.py --users 50 --days 365 --per-day 40
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+EMOTIONS = ['happy', 'sad', 'angry', 'anxious', 'neutral']
+SOURCES = ['text', 'facial', 'voice']
+
+def seed(db_path, users, days, per_day):
+    """Fill chat_messages and emotion_tracking with evenly spread synthetic history"""
+    conn = sqlite3.connect(db_path)
+    now = datetime.utcnow()
+    emotions, messages = [], []
+
+    for user in range(users):
+        user_id = f'user-{user}'
+        for _ in range(days * per_day):
+            timestamp = (now - timedelta(seconds=random.randint(0, days * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+            emotion = random.choice(EMOTIONS)
+            emotions.append((user_id, emotion, random.random(), random.choice(SOURCES), timestamp))
+            messages.append((user_id, 'I have been feeling a bit ' + emotion + ' lately ' * 8, 'user',
+                             '{"emotion": "%s", "confidence": 0.7}' % emotion, timestamp))
+
+    conn.executemany('''
+        INSERT INTO emotion_tracking (user_id, emotion_type, intensity, source, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+    ''', emotions)
+    conn.executemany('''
+        INSERT INTO chat_messages (user_id, message_text, sender, emotion_detected, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+    ''', messages)
+    conn.commit()
+    conn.close()
+
+def measure(database, users, repeat):
+    """Median latency in milliseconds of the common history reads"""
+    def median_ms(fn):
+        samples = []
+        for _ in range(repeat):
+            user_id = f'user-{random.randrange(users)}'
+            start = time.perf_counter()
+            fn(user_id)
+            samples.append((time.perf_counter() - start) * 1000)
+        return sorted(samples)[len(samples) // 2]
+
+    def chat_scan(user_id):
+        conn = sqlite3.connect(database.db_path)
+        conn.execute('SELECT COUNT(*) FROM chat_messages WHERE message_text LIKE ?', ('%anxious%',)).fetchone()
+        conn.close()
+
+    return {
+        'db_size_mb': os.path.getsize(database.db_path) / 1024 / 1024,
+        'get_user_emotions_7d_ms': median_ms(lambda user_id: database.get_user_emotions(user_id, 7)),
+        'get_emotion_trends_90d_ms': median_ms(lambda user_id: database.get_emotion_trends(user_id, 90)),
+        'get_user_stats_ms': median_ms(database.get_user_stats),
+        'chat_full_scan_ms': median_ms(chat_scan)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--per-day', type=int, default=20, help='Messages and emotion readings per user per day')
+    parser.add_argument('--max-age-days', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_retention_')
+    os.chdir(workdir)
+
+    from database import MentalHealthDB
+    from retention import compact
+
+    database = MentalHealthDB(os.path.join(workdir, 'bench.db'), archive_dir=os.path.join(workdir, 'archive'))
+    seed(database.db_path, args.users, args.days, args.per_day)
+    database.rebuild_user_stats()
+    database.rebuild_emotion_rollups()
+    sqlite3.connect(database.db_path).execute('VACUUM')
+
+    before = measure(database, args.users, args.repeat)
+
+    start = time.perf_counter()
+    moved = compact(database, max_age_days=args.max_age_days, vacuum=True)
+    compaction_s = time.perf_counter() - start
+
+    after = measure(database, args.users, args.repeat)
+
+    archive_mb = sum(
+        os.path.getsize(os.path.join(database.archive_dir, name))
+        for name in os.listdir(database.archive_dir)
+    ) / 1024 / 1024
+
+    print(f"Archived {moved} in {compaction_s:.1f}s ({archive_mb:.1f} MB compressed archive)")
+    print(f"{'metric':<28}{'before':>12}{'after':>12}")
+    for metric in before:
+        print(f"{metric:<28}{before[metric]:>12.2f}{after[metric]:>12.2f}")
+    print(f"Scratch files left in {workdir}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# backend/benchmarks/bench_socket_connections.py
+"""Concurrent idle and active Socket.IO connections per node.
+
+Starts serve.py in a subprocess with the chosen worker model, opens N
+websocket clients, reports server memory with everyone idle, then has
+every client send user_message and reports round-trip latency.
+Needs the client extras: pip install "python-socketio[asyncio_client]"
+
+    python benchmarks/bench_socket_connections.py --async-mode threading --connections 200
+    python benchmarks/bench_socket_connections.py --async-mode eventlet --connections 2000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import socketio
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def server_stats(pid):
+    """Resident memory (MB) and OS thread count of the server process"""
+    stats = {}
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                stats['rss_mb'] = int(line.split()[1]) / 1024
+            elif line.startswith('Threads:'):
+                stats['threads'] = int(line.split()[1])
+    return stats
+
+async def connect_clients(url, count, concurrency=50):
+    clients = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def connect(index):
+        client = socketio.AsyncClient()
+        async with limit:
+            await client.connect(url, auth={'user_id': f'bench-{index}'}, transports=['websocket'])
+        clients.append(client)
+
+    results = await asyncio.gather(*(connect(i) for i in range(count)), return_exceptions=True)
+    failures = sum(1 for result in results if isinstance(result, Exception))
+    return clients, failures
+
+async def round_trips(clients, messages):
+    latencies = []
+
+    async def chat(index, client):
+        for _ in range(messages):
+            reply = asyncio.get_running_loop().create_future()
+            client.on('ai_response', lambda data, reply=reply: reply.done() or reply.set_result(data))
+            start = time.perf_counter()
+            await client.emit('user_message', {'user_id': f'bench-{index}', 'message': 'I feel anxious today'})
+            await asyncio.wait_for(reply, timeout=30)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(chat(i, client) for i, client in enumerate(clients)))
+    return latencies, time.perf_counter() - start
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--async-mode', default='threading', choices=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=5, help='Messages per client in the active phase')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    env = dict(os.environ, SOCKETIO_ASYNC_MODE=args.async_mode, PORT=str(args.port), HOST='127.0.0.1')
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, 'serve.py')],
+        cwd=tempfile.mkdtemp(prefix='bench_socket_connections_'),
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        time.sleep(3)
+        baseline = server_stats(server.pid)
+
+        clients, failures = await connect_clients(f'http://127.0.0.1:{args.port}', args.connections)
+        await asyncio.sleep(1)
+        idle = server_stats(server.pid)
+
+        latencies, elapsed = await round_trips(clients, args.messages)
+        active = server_stats(server.pid)
+
+        for client in clients:
+            await client.disconnect()
+    finally:
+        server.terminate()
+        server.wait()
+
+    per_connection_kb = (idle['rss_mb'] - baseline['rss_mb']) * 1024 / max(len(clients), 1)
+    print(f"async_mode={args.async_mode} connected={len(clients)} failed={failures}")
+    print(f"idle:   rss={idle['rss_mb']:.1f} MB threads={idle['threads']} (~{per_connection_kb:.0f} KB/connection)")
+    print(f"active: rss={active['rss_mb']:.1f} MB threads={active['threads']} "
+          f"throughput={len(latencies) / elapsed:.0f} msg/s")
+    if latencies:
+        print(f"latency ms: p50={percentile(latencies, 50):.1f} "
+              f"p95={percentile(latencies, 95):.1f} p99={percentile(latencies, 99):.1f}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
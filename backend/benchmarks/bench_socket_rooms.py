@@ -0,0 +1,64 @@
+# backend/benchmarks/bench_socket_rooms.py
+"""Socket.IO delivery cost per chat message as the number of connections grows.
+
+Connects N test clients (one user each), then times `user_message` round
+trips for a single user. With per-user rooms the cost should stay flat; the
+broadcast baseline shows what every message cost when it went to everyone.
+
+    python benchmarks/bench_socket_rooms.py --connections 10 100 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+def run(app_module, connections, messages, broadcast):
+    socketio = app_module.socketio
+    clients = [
+        socketio.test_client(app_module.app, auth={'user_id': f'user-{i}'})
+        for i in range(connections)
+    ]
+    sender = clients[0]
+    payload = {'user_id': 'user-0', 'message': 'I feel a bit anxious about exams'}
+
+    start = time.perf_counter()
+    for _ in range(messages):
+        if broadcast:
+            # What handle_user_message used to do: emit without a room
+            socketio.emit('ai_response', payload)
+        else:
+            sender.emit('user_message', payload)
+    elapsed = time.perf_counter() - start
+
+    # Count what every client received to show who the events reached
+    reached = sum(
+        1 for client in clients
+        if any(packet['name'] == 'ai_response' for packet in client.get_received())
+    )
+    for client in clients:
+        client.disconnect()
+
+    return elapsed / messages * 1e6, reached
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--messages', type=int, default=200)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_socket_rooms_'))
+    import app as app_module
+
+    print(f"{'connections':>12}{'mode':>11}{'us/message':>12}{'clients reached':>17}")
+    for connections in args.connections:
+        for broadcast in (True, False):
+            per_message_us, reached = run(app_module, connections, args.messages, broadcast)
+            mode = 'broadcast' if broadcast else 'room'
+            print(f"{connections:>12}{mode:>11}{per_message_us:>12.1f}{reached:>17}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+# backend/benchmarks/loadtest.py
+"""Load test of the HTTP API and Socket.IO events with a mix of simulated users.
+
+Each virtual user holds one HTTP session and one websocket connection. It
+picks operations by weight, sends messages drawn from a corpus and waits a
+random think time between them. Runs are seeded, so the same arguments
+replay the same sequence of operations. Prints throughput and p50/p95/p99
+per operation, optionally saves the results as JSON, and can compare them
+against an earlier run.
+Needs the client extras: pip install aiohttp "python-socketio[asyncio_client]"
+
+    python benchmarks/loadtest.py --users 50 --duration 60 --output run.json
+    python benchmarks/loadtest.py --mix chat=1,user_message=1 --think-time 0 0
+    python benchmarks/loadtest.py --users 50 --duration 60 --compare run.json --threshold 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+import aiohttp
+import socketio
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpora', 'messages.txt')
+
+DEFAULT_MIX = {
+    'chat': 40,
+    'breathing': 15,
+    'emergency': 5,
+    'session': 15,
+    'user_message': 20,
+    'start_emotion_tracking': 5
+}
+
+BREATHING_TYPES = ['478', 'box']
+CRISIS_LEVELS = ['moderate', 'high', 'immediate']
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as corpus:
+        messages = [line.strip() for line in corpus if line.strip() and not line.startswith('#')]
+    if not messages:
+        raise SystemExit(f'No messages in corpus {path}')
+    return messages
+
+def parse_mix(text):
+    """'chat=3,session=1' -> {'chat': 3.0, 'session': 1.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'Unknown operation {name!r}; choose from {", ".join(DEFAULT_MIX)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+class VirtualUser:
+    """One simulated user: an HTTP session, a websocket and a seeded random stream"""
+
+    def __init__(self, index, base_url, corpus, seed):
+        self.user_id = f'load-{index}'
+        self.base_url = base_url
+        self.corpus = corpus
+        self.rng = random.Random(seed * 100003 + index)
+        self.http = None
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self._waiting = {}
+        for event in ('ai_response', 'tracking_started'):
+            self.sio.on(event, self._resolver(event))
+
+    def _resolver(self, event):
+        async def resolve(data):
+            future = self._waiting.pop(event, None)
+            if future is not None and not future.done():
+                future.set_result(data)
+        return resolve
+
+    async def connect(self):
+        self.http = aiohttp.ClientSession(self.base_url)
+        await self.sio.connect(self.base_url, auth={'user_id': self.user_id}, transports=['websocket'])
+
+    async def close(self):
+        if self.sio.connected:
+            await self.sio.disconnect()
+        if self.http is not None:
+            await self.http.close()
+
+    async def _get(self, path, **params):
+        async with self.http.get(path, params=params) as response:
+            await response.read()
+            return response.status
+
+    async def _post(self, path, payload):
+        async with self.http.post(path, json=payload) as response:
+            await response.read()
+            return response.status
+
+    async def _emit_and_wait(self, event, payload, reply_event, timeout):
+        reply = asyncio.get_running_loop().create_future()
+        self._waiting[reply_event] = reply
+        await self.sio.emit(event, payload)
+        await asyncio.wait_for(reply, timeout=timeout)
+        return 200
+
+    async def run(self, operation, timeout):
+        """Perform one operation; returns the HTTP status (200 for socket round trips)"""
+        if operation == 'chat':
+            return await self._post('/api/chat', {'message': self.rng.choice(self.corpus), 'user_id': self.user_id})
+        if operation == 'breathing':
+            return await self._get('/api/exercises/breathing', type=self.rng.choice(BREATHING_TYPES))
+        if operation == 'emergency':
+            return await self._post('/api/emergency/help', {
+                'user_id': self.user_id, 'crisis_level': self.rng.choice(CRISIS_LEVELS)
+            })
+        if operation == 'session':
+            return await self._get(f'/api/user/session/{self.user_id}')
+        if operation == 'user_message':
+            return await self._emit_and_wait('user_message', {
+                'user_id': self.user_id, 'message': self.rng.choice(self.corpus)
+            }, 'ai_response', timeout)
+        return await self._emit_and_wait('start_emotion_tracking', {'user_id': self.user_id},
+                                         'tracking_started', timeout)
+
+async def drive(user, mix, think_time, deadline, timeout, latencies, errors):
+    operations, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        operation = user.rng.choices(operations, weights)[0]
+        start = time.perf_counter()
+        try:
+            status = await user.run(operation, timeout)
+        except Exception:
+            status = None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if status is not None and status < 400:
+            latencies[operation].append(elapsed_ms)
+        else:
+            errors[operation] += 1
+        if think_time[1] > 0:
+            await asyncio.sleep(user.rng.uniform(*think_time) / 1000)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def summarize(samples, errors, elapsed):
+    if not samples:
+        return {'count': 0, 'errors': errors, 'throughput': 0.0}
+    return {
+        'count': len(samples),
+        'errors': errors,
+        'throughput': len(samples) / elapsed,
+        'mean_ms': sum(samples) / len(samples),
+        'p50_ms': percentile(samples, 50),
+        'p95_ms': percentile(samples, 95),
+        'p99_ms': percentile(samples, 99),
+        'max_ms': max(samples)
+    }
+
+async def run_load(args, base_url):
+    corpus = load_corpus(args.corpus)
+    users = [VirtualUser(i, base_url, corpus, args.seed) for i in range(args.users)]
+
+    # Ramp up in small batches so connection setup is not part of the measurement
+    for batch in range(0, len(users), 50):
+        await asyncio.gather(*(user.connect() for user in users[batch:batch + 50]))
+
+    latencies, errors = defaultdict(list), defaultdict(int)
+    start = time.monotonic()
+    try:
+        await asyncio.gather(*(
+            drive(user, args.mix, args.think_time, start + args.duration, args.timeout, latencies, errors)
+            for user in users
+        ))
+    finally:
+        elapsed = time.monotonic() - start
+        await asyncio.gather(*(user.close() for user in users), return_exceptions=True)
+
+    every_sample = [sample for samples in latencies.values() for sample in samples]
+    return {
+        'meta': {
+            'started_at': datetime.now().isoformat(),
+            'users': args.users,
+            'duration': args.duration,
+            'elapsed': elapsed,
+            'think_time_ms': list(args.think_time),
+            'mix': args.mix,
+            'seed': args.seed,
+            'corpus': os.path.basename(args.corpus),
+            'async_mode': args.async_mode if args.url is None else None
+        },
+        'operations': {
+            operation: summarize(latencies[operation], errors[operation], elapsed)
+            for operation in args.mix
+        },
+        'total': summarize(every_sample, sum(errors.values()), elapsed)
+    }
+
+def print_report(results):
+    meta = results['meta']
+    print(f"users={meta['users']} duration={meta['elapsed']:.1f}s mix={meta['mix']}")
+    print(f"{'operation':<24}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, stats in list(results['operations'].items()) + [('TOTAL', results['total'])]:
+        if not stats['count']:
+            print(f"{name:<24}{0:>8}{stats['errors']:>8}")
+            continue
+        print(f"{name:<24}{stats['count']:>8}{stats['errors']:>8}{stats['throughput']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+
+def compare(results, baseline, threshold, min_count=50):
+    """Print latency and throughput changes against a baseline; returns the regressed metrics"""
+    regressions = []
+    print(f"\nAgainst {baseline['meta']['started_at']} (threshold {threshold:.0f}%)")
+    operations = dict(results['operations'], TOTAL=results['total'])
+    previous = dict(baseline['operations'], TOTAL=baseline['total'])
+    for name, stats in operations.items():
+        before = previous.get(name)
+        # Tail percentiles of a handful of samples are noise, not a regression
+        if not before or min(before['count'], stats['count']) < min_count:
+            continue
+        changes = []
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            change = (stats[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            changes.append(f'{metric[:3]} {change:+.0f}%')
+            if change > threshold:
+                regressions.append(f'{name} {metric}')
+        change = (stats['throughput'] - before['throughput']) / before['throughput'] * 100
+        changes.append(f'req/s {change:+.0f}%')
+        if -change > threshold:
+            regressions.append(f'{name} throughput')
+        print(f"{name:<24}" + '  '.join(changes))
+    return regressions
+
+def start_server(args):
+    env = dict(os.environ, SOCKETIO_ASYNC_MODE=args.async_mode, PORT=str(args.port), HOST='127.0.0.1')
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, 'serve.py')],
+        cwd=tempfile.mkdtemp(prefix='loadtest_'),
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    time.sleep(3)
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='Target a running server instead of starting one')
+    parser.add_argument('--async-mode', default='threading', choices=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load after ramp-up')
+    parser.add_argument('--think-time', type=float, nargs=2, default=(200, 1000), metavar=('MIN_MS', 'MAX_MS'))
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='Operation weights, e.g. chat=4,breathing=1,user_message=2')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='Text file with one message per line')
+    parser.add_argument('--timeout', type=float, default=10, help='Seconds to wait for a socket reply')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the results as JSON')
+    parser.add_argument('--compare', help='Results JSON of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='Percent slowdown (or throughput drop) that counts as a regression')
+    parser.add_argument('--min-count', type=int, default=50,
+                        help='Skip operations with fewer samples than this when comparing')
+    args = parser.parse_args()
+
+    server = None if args.url else start_server(args)
+    try:
+        results = asyncio.run(run_load(args, args.url or f'http://127.0.0.1:{args.port}'))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold, args.min_count)
+        if regressions:
+            print(f"\nRegressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,368 @@
+# backend/benchmarks/microbench.py
+"""Micro-benchmarks of the emotion detectors, crisis predictor and database methods.
+
+Benchmarks are the bench_* functions below. As in pytest-benchmark, each one
+takes a `benchmark` fixture and calls benchmark(func, *args). The runner
+calibrates the iterations per round and records per-call timings. Results
+can be saved as the baseline. Later runs compare their medians against it
+and exit 1 when any benchmark is slower by more than --threshold percent.
+Benchmarks whose optional dependencies (transformers, librosa) are missing
+are skipped.
+
+    python benchmarks/microbench.py --save-baseline
+    python benchmarks/microbench.py --threshold 25
+    python benchmarks/microbench.py -k db_ --rounds 50
+"""
+import argparse
+import functools
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baselines', 'microbench.json')
+sys.path.insert(0, BACKEND_DIR)
+
+# The app module and database are created relative to the working directory
+WORK_DIR = tempfile.mkdtemp(prefix='microbench_')
+os.chdir(WORK_DIR)
+
+EMOTIONS = ['happy', 'sad', 'angry', 'anxious', 'neutral']
+SOURCES = ['text', 'facial', 'voice']
+SEED_USERS = 50
+SEED_ROWS_PER_USER = 400
+
+class Skip(Exception):
+    """Raised by a benchmark whose prerequisites are not available"""
+
+class Benchmark:
+    """Callable fixture timing func(*args) over calibrated rounds"""
+
+    def __init__(self, rounds=30, warmup=3, min_round_time=0.005):
+        self.rounds = rounds
+        self.warmup = warmup
+        self.min_round_time = min_round_time
+        self.stats = None
+
+    def __call__(self, func, *args, **kwargs):
+        for _ in range(self.warmup):
+            result = func(*args, **kwargs)
+
+        # Grow the iterations per round until one round is long enough to time reliably
+        iterations = 1
+        while True:
+            elapsed = self._round(func, args, kwargs, iterations)
+            if elapsed >= self.min_round_time or iterations >= 100000:
+                break
+            iterations *= 10
+
+        samples = [self._round(func, args, kwargs, iterations) / iterations for _ in range(self.rounds)]
+        self.stats = {
+            'rounds': self.rounds,
+            'iterations': iterations,
+            'min': min(samples),
+            'median': statistics.median(samples),
+            'mean': statistics.fmean(samples),
+            'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            'ops': 1 / statistics.median(samples)
+        }
+        return result
+
+    @staticmethod
+    def _round(func, args, kwargs, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func(*args, **kwargs)
+        return time.perf_counter() - start
+
+def load_service(relative_path):
+    """Import a service module by path, or skip when its dependencies are missing"""
+    path = os.path.join(BACKEND_DIR, 'app', 'services', relative_path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as e:
+        raise Skip(f'{relative_path}: {e}') from None
+    return module
+
+# Fixtures
+
+@functools.lru_cache(maxsize=None)
+def corpus():
+    with open(os.path.join(BENCH_DIR, 'corpora', 'messages.txt'), encoding='utf-8') as messages:
+        return [line.strip() for line in messages if line.strip() and not line.startswith('#')]
+
+@functools.lru_cache(maxsize=None)
+def detector():
+    import app
+    return app.emotion_detector
+
+@functools.lru_cache(maxsize=None)
+def seeded_db():
+    """A database with SEED_USERS users and a few months of sessions, messages and emotions"""
+    from database import MentalHealthDB
+    database = MentalHealthDB(os.path.join(WORK_DIR, 'microbench.db'), os.path.join(WORK_DIR, 'archive'))
+    rng = random.Random(1)
+
+    import sqlite3
+    conn = sqlite3.connect(database.db_path)
+    now = time.time()
+    def stamp():
+        return datetime.utcfromtimestamp(now - rng.randint(0, 90 * 86400)).strftime('%Y-%m-%d %H:%M:%S')
+
+    for user in range(SEED_USERS):
+        user_id = f'user-{user}'
+        conn.execute('INSERT INTO users (id, name, email) VALUES (?, ?, ?)',
+                     (user_id, f'User {user}', f'{user_id}@example.com'))
+        conn.executemany('''
+            INSERT INTO emotion_tracking (user_id, emotion_type, intensity, source, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(user_id, rng.choice(EMOTIONS), rng.random(), rng.choice(SOURCES), stamp())
+              for _ in range(SEED_ROWS_PER_USER)])
+        conn.executemany('''
+            INSERT INTO chat_messages (user_id, message_text, sender, emotion_detected, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(user_id, rng.choice(corpus()), 'user', '{"emotion": "neutral", "confidence": 0.5}', stamp())
+              for _ in range(SEED_ROWS_PER_USER)])
+        conn.executemany('''
+            INSERT INTO sessions (user_id, session_type, start_time, duration)
+            VALUES (?, 'chat', ?, ?)
+        ''', [(user_id, stamp(), rng.randint(60, 3600)) for _ in range(SEED_ROWS_PER_USER // 10)])
+    conn.commit()
+    conn.close()
+
+    database.rebuild_user_stats()
+    database.rebuild_emotion_rollups()
+    return database
+
+@functools.lru_cache(maxsize=None)
+def synthetic_audio(seconds=3, sample_rate=22050):
+    """A WAV file of a wandering tone with noise, roughly speech-like in pitch and energy"""
+    import numpy as np
+    t = np.arange(seconds * sample_rate) / sample_rate
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    signal = 0.4 * np.sin(2 * np.pi * np.cumsum(pitch) / sample_rate)
+    signal += 0.05 * np.random.default_rng(1).standard_normal(len(t))
+    path = os.path.join(WORK_DIR, 'synthetic.wav')
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes())
+    return path
+
+def random_user():
+    return f'user-{random.randrange(SEED_USERS)}'
+
+# Detectors and predictors
+
+def bench_detect_from_text_short(benchmark):
+    benchmark(detector().detect_from_text, 'I feel anxious about my exams tomorrow')
+
+def bench_detect_from_text_long(benchmark):
+    benchmark(detector().detect_from_text, ' '.join(corpus() * 10))
+
+def bench_crisis_analyze_text(benchmark):
+    module = load_service('ai_services/crisis_predictor.py')
+
+    class StubbedCrisisPredictor(module.CrisisPredictor):
+        """Canned model outputs so only the predictor's own work is measured"""
+
+        def __init__(self):
+            self.sentiment_analyzer = lambda text: [{'label': 'NEGATIVE', 'score': 0.91}]
+            self.suicide_risk_classifier = lambda text: [{'label': 'LOW_RISK', 'score': 0.8}]
+
+        # The scoring helpers are not implemented in this tree yet
+        if not hasattr(module.CrisisPredictor, '_calculate_crisis_level'):
+            def _calculate_crisis_level(self, sentiment, risk_assessment, keyword_alert, user_history):
+                return 'HIGH' if keyword_alert else 'LOW'
+
+        if not hasattr(module.CrisisPredictor, '_get_intervention_protocol'):
+            def _get_intervention_protocol(self, crisis_level):
+                return {'level': crisis_level}
+
+    benchmark(StubbedCrisisPredictor().analyze_text_crisis, ' '.join(corpus()), [])
+
+def bench_voice_extract_audio_features(benchmark):
+    module = load_service('ai_services/voice_analyzer.py')
+    analyzer = module.VoiceAnalyzer.__new__(module.VoiceAnalyzer)
+    benchmark(analyzer._extract_audio_features, synthetic_audio())
+
+# Database writes
+
+def bench_db_add_user(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.add_user({'id': random_user(), 'name': 'Bench', 'email': 'bench@example.com'}))
+
+def bench_db_start_session(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.start_session(random_user()))
+
+def bench_db_end_session(benchmark):
+    database = seeded_db()
+    session_id = database.start_session('user-0')
+    benchmark(database.end_session, session_id, {'dominant': 'calm'})
+
+def bench_db_add_chat_message(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.add_chat_message(random_user(), None, 'I feel a bit better today', 'user',
+                                                {'emotion': 'happy', 'confidence': 0.6}))
+
+def bench_db_track_emotion(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.track_emotion(random_user(), random.choice(EMOTIONS), random.random(), 'text'))
+
+def bench_db_track_emotions_batch(benchmark):
+    database = seeded_db()
+    stamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    batch = [(random.choice(EMOTIONS), random.random(), 'facial', stamp) for _ in range(20)]
+    benchmark(lambda: database.track_emotions(random_user(), batch))
+
+def bench_db_log_exercise(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.log_exercise(random_user(), 'breathing', 240, 0.7))
+
+def bench_db_log_emergency(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.log_emergency(random_user(), 'moderate', 'resources_shown'))
+
+# Database reads
+
+def bench_db_get_user(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.get_user(random_user()))
+
+def bench_db_get_user_sessions(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.get_user_sessions(random_user()))
+
+def bench_db_get_user_emotions(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.get_user_emotions(random_user(), days=30))
+
+def bench_db_get_history_page(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.get_history_page('chat', random_user()))
+
+def bench_db_iter_history(benchmark):
+    database = seeded_db()
+    benchmark(lambda: sum(1 for _ in database.iter_history('emotions', random_user())))
+
+def bench_db_get_emotion_trends_day(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.get_emotion_trends(random_user(), days=30))
+
+def bench_db_get_emotion_trends_hour(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.get_emotion_trends(random_user(), days=2, granularity='hour'))
+
+def bench_db_get_user_stats(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.get_user_stats(random_user()))
+
+def bench_db_get_user_events(benchmark):
+    database = seeded_db()
+    benchmark(lambda: database.get_user_events(random_user(), days=30))
+
+# Analytics
+
+def bench_analytics_compute(benchmark):
+    from analytics_engine import AnalyticsEngine
+    engine = AnalyticsEngine(seeded_db(), max_entries=0)
+    benchmark(lambda: engine.user_analytics(random_user(), 30))
+
+def bench_analytics_cached(benchmark):
+    from analytics_engine import AnalyticsEngine
+    engine = AnalyticsEngine(seeded_db())
+    for user in range(SEED_USERS):
+        engine.user_analytics(f'user-{user}', 30)
+    benchmark(lambda: engine.user_analytics(random_user(), 30))
+
+def collect(keyword=None):
+    return {
+        name[len('bench_'):]: func
+        for name, func in globals().items()
+        if name.startswith('bench_') and callable(func) and (not keyword or keyword in name)
+    }
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return f'{seconds * scale:.2f} {unit}'
+    return f'{seconds * 1e9:.0f} ns'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', dest='keyword', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--threshold', type=float, default=20,
+                        help='Percent slowdown of the median that fails the run')
+    parser.add_argument('--json', help='Also write this run to a JSON file')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as baseline_file:
+            stored = json.load(baseline_file)
+        baseline = stored['benchmarks']
+        if stored['machine'] != platform.node():
+            print(f"Note: baseline was recorded on {stored['machine']}; timings may not be comparable")
+
+    results, regressions = {}, []
+    print(f"{'benchmark':<36}{'median':>12}{'stddev':>12}{'ops/s':>12}{'baseline':>12}{'change':>9}")
+    for name, func in collect(args.keyword).items():
+        benchmark = Benchmark(rounds=args.rounds)
+        try:
+            func(benchmark)
+        except Skip as e:
+            print(f"{name:<36}{'skipped':>12}  ({e})")
+            continue
+        stats = results[name] = benchmark.stats
+        line = f"{name:<36}{format_time(stats['median']):>12}{format_time(stats['stddev']):>12}{stats['ops']:>12.0f}"
+        if name in baseline:
+            change = (stats['median'] - baseline[name]['median']) / baseline[name]['median'] * 100
+            line += f"{format_time(baseline[name]['median']):>12}{change:>+8.0f}%"
+            if change > args.threshold:
+                regressions.append(name)
+                line += '  SLOWER'
+        print(line)
+
+    run = {
+        'machine': platform.node(),
+        'python': platform.python_version(),
+        'recorded_at': datetime.now().isoformat(),
+        'benchmarks': results
+    }
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        if os.path.exists(args.baseline) and args.keyword:
+            # A filtered run only replaces the baselines it measured
+            with open(args.baseline) as baseline_file:
+                run['benchmarks'] = dict(json.load(baseline_file)['benchmarks'], **results)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(run, baseline_file, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(run, output, indent=2)
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0f}%: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
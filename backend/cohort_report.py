@@ -0,0 +1,264 @@
+# backend/cohort_report.py
+"""Nightly cohort analytics over every user, stored for the dashboard.
+
+Users are split into contiguous id ranges and each range is aggregated in
+its own process. Each process streams its rows with indexed range queries
+and returns partial aggregates, which are merged into the cohort_reports
+table:
+
+    wellness                score distribution and mean components
+    crisis_trends           emergencies per week by level, per 100 active users
+    exercise_effectiveness  practice and rated effectiveness by exercise_type
+
+    python cohort_report.py --workers 8
+"""
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from database import db
+from wellness import WellnessCounters, WELLNESS_WEIGHTS
+
+# Week buckets start on Monday
+WEEK_SQL = "date({column}, 'weekday 0', '-6 days')"
+EPOCH_SQL = "CAST(strftime('%s', {column}) AS INTEGER)"
+
+# Streamed per partition; {where} restricts user_id to the partition's range
+PARTITION_QUERIES = {
+    'emotions': f'''
+        SELECT user_id, {EPOCH_SQL.format(column='timestamp')}, {WEEK_SQL.format(column='timestamp')},
+               emotion_type, intensity
+        FROM emotion_tracking WHERE {{where}}
+    ''',
+    'sessions': f'''
+        SELECT user_id, {EPOCH_SQL.format(column='start_time')}, duration
+        FROM sessions WHERE {{where}}
+    ''',
+    'exercises': f'''
+        SELECT user_id, {EPOCH_SQL.format(column='timestamp')}, exercise_type, duration, effectiveness
+        FROM exercises WHERE {{where}}
+    ''',
+    'emergencies': f'''
+        SELECT user_id, {EPOCH_SQL.format(column='triggered_at')}, {WEEK_SQL.format(column='triggered_at')},
+               crisis_level
+        FROM emergency_events WHERE {{where}}
+    '''
+}
+
+def partition_users(database=db, partitions=8):
+    """Split the user id space into up to `partitions` ranges of similar size.
+
+    Ranges are (low, high) with low inclusive and high exclusive; the first
+    and last are open-ended so rows for ids missing from `users` are still
+    counted.
+    """
+    conn = sqlite3.connect(database.db_path)
+    user_ids = [row[0] for row in conn.execute('SELECT id FROM users ORDER BY id')]
+    conn.close()
+
+    step = max(len(user_ids) // max(partitions, 1), 1)
+    boundaries = user_ids[step::step][:partitions - 1]
+    return list(zip([None] + boundaries, boundaries + [None]))
+
+def aggregate_partition(db_path, low, high, now, batch_size=5000):
+    """Partial aggregates for users with low <= user_id < high"""
+    where, params = _range_clause('user_id', low, high)
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    counters = {}
+    def user(user_id):
+        state = counters.get(user_id)
+        if state is None:
+            state = counters[user_id] = WellnessCounters(as_of=now)
+        return state
+
+    # Users with no activity still belong in the wellness distribution
+    users_where, _ = _range_clause('id', low, high)
+    for (user_id,) in conn.execute(f'SELECT id FROM users WHERE {users_where}', params):
+        user(user_id)
+
+    active, weeks, exercises = {}, {}, {}
+    for kind, query in PARTITION_QUERIES.items():
+        cursor = conn.execute(query.format(where=where), params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if kind == 'emotions':
+                for user_id, at, week, emotion_type, intensity in rows:
+                    user(user_id).add_emotion(emotion_type, intensity, at)
+                    active.setdefault(week, set()).add(user_id)
+            elif kind == 'sessions':
+                for user_id, at, duration in rows:
+                    user(user_id).add_session(at, completed=duration is not None)
+            elif kind == 'exercises':
+                for user_id, at, exercise_type, duration, effectiveness in rows:
+                    user(user_id).add_exercise(at, duration, effectiveness)
+                    totals = exercises.setdefault(exercise_type, {
+                        'count': 0, 'rated': 0, 'effectiveness': 0.0, 'minutes': 0.0, 'users': set()
+                    })
+                    totals['count'] += 1
+                    totals['minutes'] += duration / 60
+                    totals['users'].add(user_id)
+                    if effectiveness is not None:
+                        totals['rated'] += 1
+                        totals['effectiveness'] += effectiveness
+            else:
+                for user_id, at, week, crisis_level in rows:
+                    user(user_id).add_emergency(at)
+                    levels = weeks.setdefault(week, {})
+                    levels[crisis_level] = levels.get(crisis_level, 0) + 1
+    conn.close()
+
+    histogram = [0] * 101
+    component_sums = dict.fromkeys(WELLNESS_WEIGHTS, 0.0)
+    score_sum = 0.0
+    for state in counters.values():
+        score, components = state.score(now)
+        histogram[int(score)] += 1
+        score_sum += score
+        for name, value in components.items():
+            component_sums[name] += value
+
+    # Partitions hold disjoint users, so distinct-user counts can simply be added when merging
+    for totals in exercises.values():
+        totals['users'] = len(totals['users'])
+    return {
+        'users': len(counters),
+        'score_sum': score_sum,
+        'component_sums': component_sums,
+        'histogram': histogram,
+        'active_users': {week: len(users) for week, users in active.items()},
+        'emergencies': weeks,
+        'exercises': exercises
+    }
+
+def _range_clause(column, low, high):
+    clauses, params = [], []
+    if low is not None:
+        clauses.append(f'{column} >= ?')
+        params.append(low)
+    if high is not None:
+        clauses.append(f'{column} < ?')
+        params.append(high)
+    return ' AND '.join(clauses) or '1', params
+
+def merge_partials(partials):
+    """Add partial aggregates from disjoint partitions together"""
+    merged = {
+        'users': 0, 'score_sum': 0.0, 'component_sums': dict.fromkeys(WELLNESS_WEIGHTS, 0.0),
+        'histogram': [0] * 101, 'active_users': {}, 'emergencies': {}, 'exercises': {}
+    }
+    for partial in partials:
+        merged['users'] += partial['users']
+        merged['score_sum'] += partial['score_sum']
+        for name, value in partial['component_sums'].items():
+            merged['component_sums'][name] += value
+        merged['histogram'] = [a + b for a, b in zip(merged['histogram'], partial['histogram'])]
+        for week, count in partial['active_users'].items():
+            merged['active_users'][week] = merged['active_users'].get(week, 0) + count
+        for week, levels in partial['emergencies'].items():
+            merged_levels = merged['emergencies'].setdefault(week, {})
+            for level, count in levels.items():
+                merged_levels[level] = merged_levels.get(level, 0) + count
+        for exercise_type, totals in partial['exercises'].items():
+            merged_totals = merged['exercises'].setdefault(exercise_type, dict.fromkeys(totals, 0))
+            for field, value in totals.items():
+                merged_totals[field] += value
+    return merged
+
+def build_report(merged):
+    """Turn merged aggregates into the report sections"""
+    users = merged['users']
+    histogram = merged['histogram']
+
+    def percentile(fraction):
+        threshold, seen = fraction * users, 0
+        for score, count in enumerate(histogram):
+            seen += count
+            if seen >= threshold and seen:
+                return score
+        return None
+
+    wellness = {
+        'users': users,
+        'mean_score': round(merged['score_sum'] / users, 1) if users else None,
+        'percentiles': {f'p{p}': percentile(p / 100) for p in (10, 25, 50, 75, 90)},
+        'mean_components': {
+            name: round(total / users, 1) if users else None
+            for name, total in merged['component_sums'].items()
+        },
+        # Users per 10-point score band, 0-9 up to 90-100
+        'distribution': [sum(histogram[band:band + 10]) for band in range(0, 90, 10)] + [sum(histogram[90:])]
+    }
+
+    crisis_trends = []
+    for week in sorted(set(merged['active_users']) | set(merged['emergencies'])):
+        levels = merged['emergencies'].get(week, {})
+        active_users = merged['active_users'].get(week, 0)
+        total = sum(levels.values())
+        crisis_trends.append({
+            'week': week,
+            'active_users': active_users,
+            'emergencies': total,
+            'by_level': levels,
+            'per_100_active_users': round(total * 100 / active_users, 2) if active_users else None
+        })
+
+    exercise_effectiveness = {
+        exercise_type: {
+            'completed': totals['count'],
+            'users': totals['users'],
+            'average_minutes': round(totals['minutes'] / totals['count'], 1),
+            'mean_effectiveness': round(totals['effectiveness'] / totals['rated'], 3) if totals['rated'] else None,
+            'rated': totals['rated']
+        }
+        for exercise_type, totals in sorted(merged['exercises'].items())
+    }
+
+    return {
+        'wellness': wellness,
+        'crisis_trends': crisis_trends,
+        'exercise_effectiveness': exercise_effectiveness
+    }
+
+def run(database=db, workers=None, partitions=None, batch_size=5000, keep=30):
+    """Aggregate every user in parallel and store the report; returns (generated_at, report)"""
+    workers = workers or os.cpu_count() or 1
+    ranges = partition_users(database, partitions or workers * 4)
+    now = time.time()
+    generated_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now))
+
+    if workers == 1:
+        partials = [aggregate_partition(database.db_path, low, high, now, batch_size) for low, high in ranges]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [
+                pool.submit(aggregate_partition, database.db_path, low, high, now, batch_size)
+                for low, high in ranges
+            ]
+            partials = [future.result() for future in as_completed(futures)]
+
+    report = build_report(merge_partials(partials))
+    database.save_cohort_report(report, generated_at=generated_at, keep=keep)
+    return generated_at, report
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compute the nightly cohort analytics report')
+    parser.add_argument('--db', default='mental_health.db', help='Path to the SQLite database')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--partitions', type=int, help='User ranges to split into (default: 4 per worker)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows fetched per round trip')
+    parser.add_argument('--keep', type=int, default=30, help='Number of past reports to keep')
+    args = parser.parse_args()
+
+    from database import MentalHealthDB
+    target = db if args.db == db.db_path else MentalHealthDB(args.db)
+
+    start = time.perf_counter()
+    generated_at, report = run(target, args.workers, args.partitions, args.batch_size, args.keep)
+    wellness = report['wellness']
+    print(f"✅ Cohort report {generated_at}: {wellness['users']} users, "
+          f"mean wellness {wellness['mean_score']}, {len(report['crisis_trends'])} weeks, "
+          f"{len(report['exercise_effectiveness'])} exercise types in {time.perf_counter() - start:.1f}s")
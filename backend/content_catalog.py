@@ -0,0 +1,113 @@
+# backend/content_catalog.py
+import hashlib
+import json
+import os
+import threading
+import time
+from flask import Response
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content', 'catalog.json')
+
+class CatalogEntry:
+    """One catalog item, serialized once"""
+
+    __slots__ = ('payload', 'etag', '_envelopes')
+
+    def __init__(self, item):
+        self.payload = json.dumps(item, ensure_ascii=False).encode('utf-8')
+        self.etag = hashlib.sha256(self.payload).hexdigest()[:32]
+        self._envelopes = {}
+
+    def envelope(self, field):
+        """The item wrapped as {"success": true, field: item}, built once per field"""
+        body = self._envelopes.get(field)
+        if body is None:
+            body = self._envelopes[field] = b'{"success": true, "%s": %s}' % (field.encode(), self.payload)
+        return body
+
+class ContentCatalog:
+    """Static exercise and resource content, pre-serialized and hot-reloadable.
+
+    The catalog file is re-read when its modification time changes; the
+    check is a single stat call at most every `check_interval` seconds.
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH, check_interval=2.0, max_age=300):
+        self.path = path
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self.load()
+
+    def load(self):
+        """Read and serialize the whole catalog, then swap it in"""
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, encoding='utf-8') as catalog_file:
+            sections = json.load(catalog_file)
+
+        entries = {
+            (section, key): CatalogEntry(item)
+            for section, items in sections.items()
+            for key, item in items.items()
+        }
+
+        # Readers always see either the old or the new catalog, never a mix
+        self._entries, self._mtime = entries, mtime
+        self.version = hashlib.sha256(b''.join(sorted(e.etag.encode() for e in entries.values()))).hexdigest()[:16]
+        return len(entries)
+
+    def reload_if_changed(self):
+        """Reload the catalog if the file changed since it was last read"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        with self._lock:
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.check_interval
+            try:
+                changed = os.stat(self.path).st_mtime != self._mtime
+                if changed:
+                    self.load()
+            except (OSError, ValueError) as e:
+                # Keep serving the last good catalog while the file is being edited
+                print(f"Content catalog reload failed: {e}")
+                return False
+        if changed:
+            print(f"📚 Content catalog reloaded ({self.version})")
+        return changed
+
+    def get(self, section, key, default_key=None):
+        """Get a pre-serialized entry, falling back to default_key"""
+        self.reload_if_changed()
+        entry = self._entries.get((section, key))
+        if entry is None and default_key is not None:
+            entry = self._entries.get((section, default_key))
+        return entry
+
+    def respond(self, request, entry, field, extra=None):
+        """Serve an entry with a strong ETag, answering 304 when the client has it
+
+        `extra` adds request-specific fields next to the entry, e.g. a chosen
+        duration; they are serialized per request and folded into the ETag.
+        """
+        etag, tail = entry.etag, None
+        if extra:
+            tail = json.dumps(extra, ensure_ascii=False).encode('utf-8')
+            etag = hashlib.sha256(etag.encode() + tail).hexdigest()[:32]
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            body = entry.envelope(field)
+            if tail is not None:
+                # Both are JSON objects: drop the envelope's closing brace and the extra's opening one
+                body = b'%s, %s' % (body[:-1], tail[1:])
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        return response
+
+# Global catalog instance
+catalog = ContentCatalog(os.environ.get('CONTENT_CATALOG_PATH', DEFAULT_CATALOG_PATH))
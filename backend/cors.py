@@ -0,0 +1,76 @@
+# backend/cors.py
+from flask import Response, request
+
+class PreflightCORS:
+    """One place for CORS: preflights are answered from precomputed headers.
+
+    Every OPTIONS preflight is short-circuited before routing with a 204 and
+    an Access-Control-Max-Age, so browsers can skip the preflight on later
+    requests. Actual responses get the matching Allow-Origin header.
+    Unless `allow_headers` lists them, an allowed origin may send whatever
+    headers its preflight asks for (X-Admin-Token, X-Requested-With, ...).
+    Register this after anything that should see preflights, e.g. metrics,
+    since before_request hooks after it do not run for them.
+    """
+
+    def __init__(self, app=None, origins=(), methods=('GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'),
+                 allow_headers=None, supports_credentials=True, max_age=7200):
+        self.origins = list(origins)
+        self.methods = methods
+        self.allow_headers = allow_headers
+        self.supports_credentials = supports_credentials
+        self.max_age = max_age
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_age = app.config.get('CORS_MAX_AGE', self.max_age)
+        self._build_headers()
+        app.before_request(self._answer_preflight)
+        app.after_request(self._add_allow_origin)
+
+    def _build_headers(self):
+        # Origin -> ready-made header lists; '*' covers any origin when allowed
+        self._response_headers = {}
+        self._preflight_headers = {}
+        for origin in self.origins:
+            allow_origin = [('Access-Control-Allow-Origin', origin)]
+            if self.supports_credentials and origin != '*':
+                allow_origin.append(('Access-Control-Allow-Credentials', 'true'))
+            self._response_headers[origin] = allow_origin
+            self._preflight_headers[origin] = allow_origin + [
+                ('Vary', 'Origin, Access-Control-Request-Headers'),
+                ('Access-Control-Allow-Methods', ', '.join(self.methods)),
+                ('Access-Control-Max-Age', str(self.max_age))
+            ]
+            if self.allow_headers is not None:
+                self._preflight_headers[origin].append(
+                    ('Access-Control-Allow-Headers', ', '.join(self.allow_headers))
+                )
+
+    def _headers_for(self, table):
+        origin = request.headers.get('Origin')
+        return table.get(origin) or table.get('*')
+
+    def _answer_preflight(self):
+        if request.method != 'OPTIONS' or 'Access-Control-Request-Method' not in request.headers:
+            return None
+        headers = self._headers_for(self._preflight_headers)
+        if headers is None:
+            # Disallowed origins get no CORS headers, which the browser treats as a refusal
+            return Response(status=204, headers=[('Vary', 'Origin')])
+        requested = request.headers.get('Access-Control-Request-Headers')
+        if self.allow_headers is None and requested:
+            headers = headers + [('Access-Control-Allow-Headers', requested)]
+        return Response(status=204, headers=headers)
+
+    def _add_allow_origin(self, response):
+        if request.method == 'OPTIONS':
+            return response
+        # The allowed origin is reflected, so caches must key on it
+        response.vary.add('Origin')
+        headers = self._headers_for(self._response_headers)
+        if headers:
+            for name, value in headers:
+                response.headers[name] = value
+        return response
@@ -0,0 +1,197 @@
+# backend/counselor_matching.py
+import heapq
+import itertools
+import threading
+import time
+from metrics import registry
+
+# Seconds added to a waiting user's arrival time to place them in line: more severe
+# crises go ahead of milder ones that arrived up to this long before them, but anyone
+# who has waited longer than that is served first, so nobody waits forever
+LEVEL_OFFSETS = {'SEVERE': 0, 'IMMEDIATE': 0, 'HIGH': 120, 'MODERATE': 600, 'LOW': 1800}
+
+class _Counselor:
+    __slots__ = ('counselor', 'keys', 'available', 'since', 'token')
+
+    def __init__(self, counselor):
+        self.counselor = counselor
+        # Preferences this counselor satisfies
+        self.keys = ('any', counselor.get('gender'), *counselor.get('skills', ()))
+        self.available = False
+        self.since = 0.0
+        self.token = 0
+
+class Ticket:
+    """A user's place in line; `waited` is set when they are matched"""
+
+    __slots__ = ('user_id', 'preference', 'crisis_level', 'enqueued_at', 'waited', 'active')
+
+    def __init__(self, user_id, preference, crisis_level, enqueued_at):
+        self.user_id = user_id
+        self.preference = preference
+        self.crisis_level = crisis_level
+        self.enqueued_at = enqueued_at
+        self.waited = 0.0
+        self.active = True
+
+class CounselorMatcher:
+    """Matches users to free counselors by preference, with a priority waiting line.
+
+    Free counselors are indexed under every preference they satisfy ('any',
+    their gender and each skill), with the longest-idle one first. Waiting
+    users queue per preference, ordered by crisis level and then wait time
+    (see LEVEL_OFFSETS). Both sides are heaps with lazy deletion, so a
+    request, a release and a cancellation each cost O(log n) plus a
+    constant number of preference keys per counselor. When a counselor
+    frees up, the best waiter they can serve is matched immediately and
+    `on_match(ticket, counselor)` is called. If connecting them fails, hand
+    the ticket to `requeue` to put the user back in their old place.
+    """
+
+    def __init__(self, counselors=(), on_match=None, clock=time.time):
+        self.on_match = on_match
+        self.clock = clock
+        self._counselors = {}
+        self._free = {}       # preference -> heap of (idle since, seq, counselor id, token)
+        self._waiting = {}    # preference -> heap of (priority, seq, ticket)
+        self._waiters = {}    # user id -> ticket
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        for counselor in counselors:
+            self.add_counselor(counselor)
+
+    def add_counselor(self, counselor, available=True):
+        with self._lock:
+            self._counselors[counselor['id']] = _Counselor(counselor)
+        if available:
+            self.release(counselor['id'])
+
+    def remove_counselor(self, counselor_id):
+        """Take a counselor off the roster; they are never matched again"""
+        with self._lock:
+            entry = self._counselors.pop(counselor_id, None)
+            if entry is not None:
+                entry.available = False
+                entry.token += 1
+                self._gauges()
+
+    def request(self, user_id, preference='any', crisis_level='HIGH'):
+        """Match a user now if a suitable counselor is free; otherwise add them to the line
+
+        Returns the counselor dict, or None if the user is now waiting.
+        """
+        crisis_level = crisis_level.upper()
+        with self._lock:
+            previous = self._waiters.pop(user_id, None)
+            if previous is not None:
+                previous.active = False
+            counselor = self._take_free(preference)
+            if counselor is None:
+                self._enqueue(Ticket(user_id, preference, crisis_level, self.clock()))
+                self._count('queued')
+                return None
+        self._count('matched_immediately')
+        return counselor.counselor
+
+    def requeue(self, ticket):
+        """Put a matched user whose connection failed back in line where they were
+
+        Does nothing if the user has asked again since. Returns True if they
+        are waiting again, False if a free counselor was handed to them.
+        """
+        with self._lock:
+            if ticket.user_id in self._waiters:
+                return True
+            counselor = self._take_free(ticket.preference)
+            if counselor is None:
+                ticket.active = True
+                self._enqueue(ticket)
+                return True
+            ticket.waited = self.clock() - ticket.enqueued_at
+        if self.on_match is not None:
+            self.on_match(ticket, counselor.counselor)
+        return False
+
+    def cancel(self, user_id):
+        with self._lock:
+            ticket = self._waiters.pop(user_id, None)
+            if ticket is not None:
+                ticket.active = False
+                self._gauges()
+        return ticket is not None
+
+    def release(self, counselor_id):
+        """A counselor is free: hand them the best waiting user they can serve, or index them as free"""
+        with self._lock:
+            entry = self._counselors.get(counselor_id)
+            if entry is None:
+                return None
+            ticket = self._take_waiter(entry)
+            if ticket is None:
+                entry.available = True
+                entry.since = self.clock()
+                entry.token += 1
+                for key in entry.keys:
+                    heapq.heappush(self._free.setdefault(key, []),
+                                   (entry.since, next(self._seq), counselor_id, entry.token))
+                self._gauges()
+                return None
+            ticket.waited = self.clock() - ticket.enqueued_at
+
+        registry.histogram('counselor_wait_seconds', 'Time users waited in line for a counselor',
+                           crisis_level=ticket.crisis_level).observe(ticket.waited)
+        self._count('matched_from_queue')
+        if self.on_match is not None:
+            self.on_match(ticket, entry.counselor)
+        return ticket.user_id
+
+    def waiting(self):
+        with self._lock:
+            return len(self._waiters)
+
+    def available(self):
+        with self._lock:
+            return sum(1 for entry in self._counselors.values() if entry.available)
+
+    def _enqueue(self, ticket):
+        self._waiters[ticket.user_id] = ticket
+        heapq.heappush(self._waiting.setdefault(ticket.preference, []), (
+            ticket.enqueued_at + LEVEL_OFFSETS.get(ticket.crisis_level, LEVEL_OFFSETS['HIGH']),
+            next(self._seq), ticket
+        ))
+        self._gauges()
+
+    def _take_free(self, preference):
+        heap = self._free.get(preference)
+        while heap:
+            _, _, counselor_id, token = heapq.heappop(heap)
+            entry = self._counselors.get(counselor_id)
+            if entry is not None and entry.available and entry.token == token:
+                entry.available = False
+                entry.token += 1
+                self._gauges()
+                return entry
+        return None
+
+    def _take_waiter(self, entry):
+        """Pop the best active waiter across the preferences this counselor satisfies"""
+        best_key = None
+        for key in entry.keys:
+            heap = self._waiting.get(key)
+            while heap and not heap[0][2].active:
+                heapq.heappop(heap)
+            if heap and (best_key is None or heap[0][:2] < self._waiting[best_key][0][:2]):
+                best_key = key
+        if best_key is None:
+            return None
+        _, _, ticket = heapq.heappop(self._waiting[best_key])
+        ticket.active = False
+        del self._waiters[ticket.user_id]
+        self._gauges()
+        return ticket
+
+    def _gauges(self):
+        registry.gauge('counselor_queue_waiting', 'Users waiting for a counselor').set(len(self._waiters))
+
+    def _count(self, outcome):
+        registry.counter('counselor_requests_total', 'Counselor requests by outcome', outcome=outcome).inc()
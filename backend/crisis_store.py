@@ -0,0 +1,172 @@
+# backend/crisis_store.py
+import threading
+from database import db
+from metrics import registry
+
+# How often a started store pulls changes written by other workers, and how many per query
+CRISIS_POLL_INTERVAL = 1.0
+CHANGE_BATCH = 500
+
+def crisis_status(crisis):
+    """'open' until a counselor is involved, then 'attended', then 'resolved'"""
+    if crisis['resolved_at']:
+        return 'resolved'
+    return 'attended' if crisis['counselor_contacted'] else 'open'
+
+class CrisisStore:
+    """Unresolved crises in memory, kept current from the emergency_events table.
+
+    emergency_events is the record; every write to it also appends a row to
+    crisis_changes. The store loads the unresolved crises once, then
+    applies new changes in order, so every worker converges on the same
+    state and nothing is lost on restart. Crises are held by id and
+    indexed by (crisis level, status), so looking one up or listing e.g.
+    all open HIGH crises does not scan. Resolved crises leave memory and
+    are read from the table by id.
+
+    Writes through the store apply their change at once. Other workers'
+    changes are pulled by a background poll after `start()`, or before
+    every read otherwise, and `subscribe(listener)` sees both. Listeners
+    are called with (change, crisis) in log order, with the crisis as it
+    stands when the change is applied, and must not block.
+    """
+
+    def __init__(self, database=db):
+        self.db = database
+        self._lock = threading.RLock()
+        self._crises = {}
+        self._index = {}
+        self._listeners = []
+        self._thread = None
+        self._stopped = threading.Event()
+        self._cursor, crises = database.get_unresolved_emergencies()
+        for crisis in crises:
+            self._put(crisis)
+        self._gauge()
+
+    def open(self, user_id, crisis_level, action_taken=None):
+        crisis_id = self.db.log_emergency(user_id, crisis_level, action_taken)
+        self.refresh()
+        return self.get(crisis_id)
+
+    def record_action(self, crisis_id, action, counselor_contacted=False):
+        self.db.record_emergency_action(crisis_id, action, counselor_contacted)
+        self.refresh()
+        return self.get(crisis_id)
+
+    def resolve(self, crisis_id, resolution=None):
+        """Stamp a crisis resolved; returns False if it already was, or does not exist"""
+        resolved = self.db.resolve_emergency(crisis_id, resolution)
+        self.refresh()
+        return resolved
+
+    def get(self, crisis_id):
+        self._catch_up()
+        with self._lock:
+            crisis = self._crises.get(crisis_id)
+        if crisis is not None:
+            return dict(crisis)
+        crisis = self.db.get_emergency(crisis_id)
+        if crisis is not None:
+            crisis['status'] = crisis_status(crisis)
+        return crisis
+
+    def active(self, crisis_level=None, status=None):
+        """Unresolved crises, oldest first, optionally only one level and/or status"""
+        self._catch_up()
+        with self._lock:
+            ids = set()
+            for (level, state), members in self._index.items():
+                if crisis_level in (None, level) and status in (None, state):
+                    ids |= members
+            return [dict(self._crises[crisis_id]) for crisis_id in sorted(ids)]
+
+    def counts(self):
+        """{crisis level: {status: number of unresolved crises}}"""
+        self._catch_up()
+        with self._lock:
+            counts = {}
+            for (level, status), members in self._index.items():
+                if members:
+                    counts.setdefault(level, {})[status] = len(members)
+            return counts
+
+    def changes(self, since=0, limit=CHANGE_BATCH):
+        """Logged changes after change id `since`, for dashboards catching up after a disconnect"""
+        return self.db.get_crisis_changes(since, limit)
+
+    def subscribe(self, listener):
+        """Call listener(change, crisis) for every change applied from now on; returns an unsubscribe"""
+        with self._lock:
+            self._listeners.append(listener)
+        return lambda: self._unsubscribe(listener)
+
+    def refresh(self):
+        """Apply changes logged since the last refresh; returns how many were applied"""
+        applied = 0
+        with self._lock:
+            while True:
+                changes = self.db.get_crisis_changes(self._cursor, CHANGE_BATCH)
+                for change in changes:
+                    crisis = change.pop('crisis')
+                    self._drop(crisis['id'])
+                    crisis['status'] = crisis_status(crisis)
+                    if crisis['status'] != 'resolved':
+                        self._put(crisis)
+                    self._cursor = change['id']
+                    # Still under the lock, so every listener sees changes in log order
+                    for listener in self._listeners:
+                        try:
+                            listener(change, dict(crisis))
+                        except Exception as e:
+                            print(f"Crisis change listener failed: {e}")
+                applied += len(changes)
+                if len(changes) < CHANGE_BATCH:
+                    break
+            if applied:
+                self._gauge()
+        return applied
+
+    def start(self, poll_interval=CRISIS_POLL_INTERVAL):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._poll, args=(poll_interval,),
+                                            name='crisis-store', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self, poll_interval):
+        while not self._stopped.wait(poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Crisis store refresh failed: {e}")
+
+    def _catch_up(self):
+        # A started store is kept current by its poller and by its own writes
+        if self._thread is None:
+            self.refresh()
+
+    def _put(self, crisis):
+        crisis.setdefault('status', crisis_status(crisis))
+        self._crises[crisis['id']] = crisis
+        self._index.setdefault((crisis['crisis_level'], crisis['status']), set()).add(crisis['id'])
+
+    def _drop(self, crisis_id):
+        crisis = self._crises.pop(crisis_id, None)
+        if crisis is not None:
+            self._index[(crisis['crisis_level'], crisis['status'])].discard(crisis_id)
+
+    def _unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _gauge(self):
+        registry.gauge('crises_unresolved', 'Crises not yet resolved').set(len(self._crises))
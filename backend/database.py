@@ -1,11 +1,55 @@
 import sqlite3
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import os
+import time
+from collections.abc import Mapping
+from metrics import timed
+from wellness import WellnessCounters, merged as wellness_merged
+
+class LazyJSONRecord(Mapping):
+    """Read-only row whose JSON columns are decoded on first access"""
+    
+    __slots__ = ('_values', '_json_columns', '_decoded')
+    
+    def __init__(self, columns, row, json_columns=()):
+        self._values = dict(zip(columns, row))
+        self._json_columns = json_columns
+        self._decoded = {}
+    
+    def __getitem__(self, key):
+        if key in self._json_columns:
+            if key not in self._decoded:
+                raw = self._values[key]
+                self._decoded[key] = json.loads(raw) if raw else None
+            return self._decoded[key]
+        return self._values[key]
+    
+    def __iter__(self):
+        return iter(self._values)
+    
+    def __len__(self):
+        return len(self._values)
+    
+    def raw(self, key):
+        """Get a column exactly as stored, without decoding JSON"""
+        return self._values[key]
+    
+    def to_json(self):
+        """Serialize the row, splicing stored JSON columns in without decoding them"""
+        parts = []
+        for key, value in self._values.items():
+            if key in self._json_columns and key not in self._decoded and value:
+                encoded = value
+            else:
+                encoded = json.dumps(self[key])
+            parts.append(f'{json.dumps(key)}: {encoded}')
+        return '{' + ', '.join(parts) + '}'
 
 class MentalHealthDB:
-    def __init__(self, db_path='mental_health.db'):
+    def __init__(self, db_path='mental_health.db', archive_dir='archive'):
         self.db_path = db_path
+        self.archive_dir = archive_dir
         self.init_db()
     
     def init_db(self):
@@ -100,10 +144,193 @@ class MentalHealthDB:
             )
         ''')
         
+        # Per-user stats summary, maintained at write time
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_stats (
+                user_id TEXT PRIMARY KEY,
+                total_sessions INTEGER NOT NULL DEFAULT 0,
+                completed_sessions INTEGER NOT NULL DEFAULT 0,
+                total_duration INTEGER NOT NULL DEFAULT 0,
+                most_common_emotion TEXT,
+                most_common_emotion_count INTEGER NOT NULL DEFAULT 0,
+                emergency_events INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        # Per-user emotion counters backing most_common_emotion
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_emotion_counts (
+                user_id TEXT NOT NULL,
+                emotion_type TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, emotion_type),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        # Time-bucketed emotion rollups, maintained at write time
+        for rollup_table in EMOTION_ROLLUP_TABLES:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {rollup_table} (
+                    user_id TEXT NOT NULL,
+                    bucket TIMESTAMP NOT NULL,
+                    emotion_type TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    total_intensity REAL NOT NULL,
+                    max_intensity REAL NOT NULL,
+                    PRIMARY KEY (user_id, bucket, emotion_type, source),
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+        
+        # Raw tail lookups for the rollup queries and keyset pagination
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_emotion_tracking_user_time
+            ON emotion_tracking (user_id, timestamp)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sessions_user_time
+            ON sessions (user_id, start_time)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_chat_messages_user_time
+            ON chat_messages (user_id, timestamp)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_exercises_user_time
+            ON exercises (user_id, timestamp)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_emergency_events_user_time
+            ON emergency_events (user_id, triggered_at)
+        ''')
+        
+        # Emotion counts for rows moved to the cold archive, so stats survive compaction
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archived_emotion_counts (
+                user_id TEXT NOT NULL,
+                emotion_type TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, emotion_type),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        # Per-user counter bumped by every write that analytics read, for cache keys
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_data_versions (
+                user_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        # Per-user decayed activity totals the wellness score is read from, maintained at write time
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS user_wellness (
+                user_id TEXT PRIMARY KEY,
+                {', '.join(f'{field} REAL NOT NULL DEFAULT 0' for field in WellnessCounters.FIELDS)},
+                as_of REAL NOT NULL DEFAULT 0,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        # Pending and finished follow-up safety checks for crises, run by safety_checks.py
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS safety_checks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crisis_id INTEGER NOT NULL UNIQUE,
+                user_id TEXT NOT NULL,
+                due_at REAL NOT NULL,
+                interval REAL NOT NULL,
+                remaining INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                escalated_at REAL,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_safety_checks_pending
+            ON safety_checks (status, due_at)
+        ''')
+        
+        # Durable record of each crisis side effect (counselor, contacts, alerts...) and its delivery
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notification_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crisis_id INTEGER NOT NULL,
+                user_id TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                result TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_at TIMESTAMP,
+                UNIQUE (crisis_id, channel),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_notification_outbox_pending
+            ON notification_outbox (status, next_attempt_at)
+        ''')
+        
+        # Append-only log of crisis openings, actions and resolutions, followed by crisis_store.py
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crisis_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crisis_id INTEGER NOT NULL,
+                change TEXT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (crisis_id) REFERENCES emergency_events (id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_emergency_events_unresolved
+            ON emergency_events (id) WHERE resolved_at IS NULL
+        ''')
+        
+        # Cohort-wide aggregates written by the nightly batch job, one JSON payload per section
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cohort_reports (
+                generated_at TIMESTAMP NOT NULL,
+                section TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (generated_at, section)
+            )
+        ''')
+        
+        # Retention bookkeeping, e.g. the day boundary everything older has been archived before
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS retention_state (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        ''')
+        
+        # Backfill the summaries the first time they are created on an existing database
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM user_stats)')
+        if not cursor.fetchone()[0]:
+            self._rebuild_user_stats(cursor)
+        
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM emotion_rollup_daily)')
+        if not cursor.fetchone()[0]:
+            self._rebuild_emotion_rollups(cursor)
+        
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM user_wellness)')
+        if not cursor.fetchone()[0]:
+            self._rebuild_wellness(cursor)
+        
         conn.commit()
         conn.close()
         print("✅ Database initialized successfully!")
     
+    @timed('db')
     def add_user(self, user_data):
         """Add a new user to the database"""
         conn = sqlite3.connect(self.db_path)
@@ -127,6 +354,7 @@ class MentalHealthDB:
         conn.close()
         return user_data['id']
     
+    @timed('db')
     def get_user(self, user_id):
         """Get user by ID"""
         conn = sqlite3.connect(self.db_path)
@@ -150,6 +378,7 @@ class MentalHealthDB:
             }
         return None
     
+    @timed('db')
     def start_session(self, user_id, session_type='chat'):
         """Start a new therapy session"""
         conn = sqlite3.connect(self.db_path)
@@ -161,19 +390,23 @@ class MentalHealthDB:
         ''', (user_id, session_type))
         
         session_id = cursor.lastrowid
+        self._bump_user_stats(cursor, user_id, sessions=1)
+        self._update_wellness(cursor, user_id, lambda wellness: wellness.add_session(time.time()))
+        self._bump_data_version(cursor, user_id)
         conn.commit()
         conn.close()
         
         return session_id
     
+    @timed('db')
     def end_session(self, session_id, emotion_data=None, crisis_level='low'):
         """End a therapy session"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         # Calculate duration
-        cursor.execute('SELECT start_time FROM sessions WHERE id = ?', (session_id,))
-        start_time = cursor.fetchone()[0]
+        cursor.execute('SELECT start_time, user_id, duration FROM sessions WHERE id = ?', (session_id,))
+        start_time, user_id, previous_duration = cursor.fetchone()
         duration = (datetime.now() - datetime.fromisoformat(start_time)).seconds
         
         cursor.execute('''
@@ -185,9 +418,20 @@ class MentalHealthDB:
             WHERE id = ?
         ''', (duration, json.dumps(emotion_data) if emotion_data else None, crisis_level, session_id))
         
+        # Ending an already ended session replaces its duration rather than adding to it
+        self._bump_user_stats(
+            cursor, user_id,
+            completed=1 if previous_duration is None else 0,
+            duration=duration - (previous_duration or 0)
+        )
+        if previous_duration is None:
+            self._update_wellness(cursor, user_id, lambda wellness: wellness.complete_session(_epoch(start_time)))
+        self._bump_data_version(cursor, user_id)
+        
         conn.commit()
         conn.close()
     
+    @timed('db')
     def add_chat_message(self, user_id, session_id, message_text, sender, emotion_detected=None):
         """Add a chat message to the database"""
         conn = sqlite3.connect(self.db_path)
@@ -203,6 +447,41 @@ class MentalHealthDB:
         conn.commit()
         conn.close()
     
+    @timed('db')
+    def add_chat_turn(self, user_id, session_id, message_text, reply_text, emotion_detected=None):
+        """Add a user's message and the reply to it in one commit"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+            INSERT INTO chat_messages 
+            (user_id, session_id, message_text, sender, emotion_detected)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (user_id, session_id, message_text, 'user',
+             json.dumps(emotion_detected) if emotion_detected else None),
+            (user_id, session_id, reply_text, 'ai', None)
+        ])
+        
+        conn.commit()
+        conn.close()
+    
+    def user_wrote_since(self, user_id, since):
+        """Whether the user has sent a chat message at or after `since` ('%Y-%m-%d %H:%M:%S', UTC)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT EXISTS (
+                SELECT 1 FROM chat_messages WHERE user_id = ? AND timestamp >= ? AND sender = 'user'
+            )
+        ''', (user_id, since))
+        wrote = bool(cursor.fetchone()[0])
+        
+        conn.close()
+        return wrote
+    
+    @timed('db')
     def track_emotion(self, user_id, emotion_type, intensity, source, session_id=None):
         """Track user emotions"""
         conn = sqlite3.connect(self.db_path)
@@ -214,9 +493,51 @@ class MentalHealthDB:
             VALUES (?, ?, ?, ?, ?)
         ''', (user_id, emotion_type, intensity, source, session_id))
         
+        emotion_id = cursor.lastrowid
+        self._bump_emotion_count(cursor, user_id, emotion_type)
+        self._rollup_emotions(cursor, emotion_id, emotion_id)
+        self._update_wellness(
+            cursor, user_id, lambda wellness: wellness.add_emotion(emotion_type, intensity, time.time())
+        )
+        self._bump_data_version(cursor, user_id)
+
         conn.commit()
         conn.close()
-    
+
+    @timed('db')
+    def track_emotions(self, user_id, readings, session_id=None):
+        """Track a batch of (emotion_type, intensity, source, timestamp) readings in one commit"""
+        if not readings:
+            return 0
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.executemany('''
+            INSERT INTO emotion_tracking
+            (user_id, emotion_type, intensity, source, timestamp, session_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(user_id, emotion_type, intensity, source, timestamp, session_id)
+              for emotion_type, intensity, source, timestamp in readings])
+
+        # One write transaction, so the new ids are contiguous
+        last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+        counts = {}
+        for emotion_type, _, _, _ in readings:
+            counts[emotion_type] = counts.get(emotion_type, 0) + 1
+        for emotion_type, count in counts.items():
+            self._bump_emotion_count(cursor, user_id, emotion_type, count)
+        self._rollup_emotions(cursor, last_id - len(readings) + 1, last_id)
+        def add_readings(wellness):
+            for emotion_type, intensity, _, timestamp in readings:
+                wellness.add_emotion(emotion_type, intensity, _epoch(timestamp))
+        self._update_wellness(cursor, user_id, add_readings)
+        self._bump_data_version(cursor, user_id)
+
+        conn.commit()
+        conn.close()
+        return len(readings)
+
+    @timed('db')
     def log_exercise(self, user_id, exercise_type, duration, effectiveness=None):
         """Log wellness exercises"""
         conn = sqlite3.connect(self.db_path)
@@ -228,9 +549,14 @@ class MentalHealthDB:
             VALUES (?, ?, ?, ?)
         ''', (user_id, exercise_type, duration, effectiveness))
         
+        self._update_wellness(
+            cursor, user_id, lambda wellness: wellness.add_exercise(time.time(), duration, effectiveness)
+        )
+        self._bump_data_version(cursor, user_id)
         conn.commit()
         conn.close()
     
+    @timed('db')
     def log_emergency(self, user_id, crisis_level, action_taken=None):
         """Log emergency events"""
         conn = sqlite3.connect(self.db_path)
@@ -243,11 +569,108 @@ class MentalHealthDB:
         ''', (user_id, crisis_level, action_taken))
         
         event_id = cursor.lastrowid
+        self._log_crisis_change(cursor, event_id, 'opened')
+        self._bump_user_stats(cursor, user_id, emergencies=1)
+        self._update_wellness(cursor, user_id, lambda wellness: wellness.add_emergency(time.time()))
+        self._bump_data_version(cursor, user_id)
         conn.commit()
         conn.close()
         
         return event_id
     
+    @timed('db')
+    def get_emergency(self, event_id):
+        """Get one emergency event"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute(f'SELECT {EMERGENCY_COLUMNS} FROM emergency_events WHERE id = ?', (event_id,))
+        event = cursor.fetchone()
+        conn.close()
+        
+        return _emergency_dict(event) if event else None
+    
+    @timed('db')
+    def record_emergency_action(self, event_id, action, counselor_contacted=False):
+        """Append an action to an emergency event's log"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            UPDATE emergency_events
+            SET action_taken = CASE WHEN action_taken IS NULL OR action_taken = '' THEN ?
+                                    ELSE action_taken || '; ' || ? END,
+                counselor_contacted = counselor_contacted OR ?
+            WHERE id = ?
+        ''', (action, action, counselor_contacted, event_id))
+        if cursor.rowcount:
+            self._log_crisis_change(cursor, event_id, 'updated')
+        
+        conn.commit()
+        conn.close()
+    
+    @timed('db')
+    def resolve_emergency(self, event_id, resolution=None):
+        """Stamp an emergency event resolved; returns False if it already was, or does not exist"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            UPDATE emergency_events
+            SET resolved_at = CURRENT_TIMESTAMP,
+                action_taken = CASE WHEN ? IS NULL THEN action_taken
+                                    WHEN action_taken IS NULL OR action_taken = '' THEN ?
+                                    ELSE action_taken || '; ' || ? END
+            WHERE id = ? AND resolved_at IS NULL
+        ''', (resolution, resolution, resolution, event_id))
+        resolved = bool(cursor.rowcount)
+        if resolved:
+            self._log_crisis_change(cursor, event_id, 'resolved')
+        
+        conn.commit()
+        conn.close()
+        return resolved
+    
+    @timed('db')
+    def get_unresolved_emergencies(self):
+        """Every unresolved emergency event, and the crisis_changes id they are current as of"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('BEGIN')
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM crisis_changes')
+        change_id = cursor.fetchone()[0]
+        cursor.execute(f'SELECT {EMERGENCY_COLUMNS} FROM emergency_events WHERE resolved_at IS NULL ORDER BY id')
+        events = [_emergency_dict(row) for row in cursor.fetchall()]
+        conn.rollback()
+        conn.close()
+        
+        return change_id, events
+    
+    @timed('db')
+    def get_crisis_changes(self, since=0, limit=500):
+        """Crisis changes after change id `since`, oldest first, each with its event as it is now"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        columns = ', '.join(f'e.{column}' for column in EMERGENCY_COLUMNS.split(', '))
+        cursor.execute(f'''
+            SELECT c.id, c.change, c.changed_at, {columns}
+            FROM crisis_changes c JOIN emergency_events e ON e.id = c.crisis_id
+            WHERE c.id > ? ORDER BY c.id LIMIT ?
+        ''', (since, limit))
+        changes = [
+            {'id': row[0], 'change': row[1], 'changed_at': row[2], 'crisis': _emergency_dict(row[3:])}
+            for row in cursor.fetchall()
+        ]
+        conn.close()
+        
+        return changes
+    
+    def _log_crisis_change(self, cursor, crisis_id, change):
+        cursor.execute('INSERT INTO crisis_changes (crisis_id, change) VALUES (?, ?)', (crisis_id, change))
+    
+    @timed('db')
     def get_user_sessions(self, user_id, limit=10):
         """Get user's recent sessions"""
         conn = sqlite3.connect(self.db_path)
@@ -274,8 +697,28 @@ class MentalHealthDB:
             'crisis_level': session[7]
         } for session in sessions]
     
-    def get_user_emotions(self, user_id, days=7):
-        """Get user's emotion history"""
+    @timed('db')
+    def get_latest_emotions(self, user_id, sources):
+        """Newest reading from each source: {source: (emotion_type, intensity, Unix seconds)}"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        latest = {}
+        for source in sources:
+            cursor.execute(f'''
+                SELECT emotion_type, intensity, {EPOCH_SQL.format(column='timestamp')} FROM emotion_tracking
+                WHERE user_id = ? AND source = ? ORDER BY timestamp DESC LIMIT 1
+            ''', (user_id, source))
+            row = cursor.fetchone()
+            if row:
+                latest[source] = row
+        conn.close()
+        
+        return latest
+    
+    @timed('db')
+    def get_user_emotions(self, user_id, days=7, include_archived=False):
+        """Get user's emotion history, optionally reaching into the cold archive"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
@@ -289,49 +732,755 @@ class MentalHealthDB:
         emotions = cursor.fetchall()
         conn.close()
         
-        return [{
+        history = [{
             'emotion_type': emotion[0],
             'intensity': emotion[1],
             'timestamp': emotion[2],
             'source': emotion[3]
         } for emotion in emotions]
+        
+        if include_archived:
+            since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            archived_before = self.get_archive_watermark()
+            if archived_before and since < archived_before:
+                archived = [{
+                    'emotion_type': emotion['emotion_type'],
+                    'intensity': emotion['intensity'],
+                    'timestamp': emotion['timestamp'],
+                    'source': emotion['source']
+                } for emotion in self._archive().query('emotions', user_id, since=since)]
+                history.extend(reversed(archived))
+        
+        return history
     
-    def get_user_stats(self, user_id):
-        """Get user statistics"""
+    @timed('db')
+    def get_user_events(self, user_id, days=7):
+        """Everything analytics need about a user for the last N days, in one snapshot
+        
+        Returns (version, {kind: (columns, rows)}) for each kind in
+        ANALYTICS_EVENT_QUERIES, oldest row first. The version is read in the
+        same transaction, so it always describes exactly the rows returned.
+        """
+        since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        # Total sessions
-        cursor.execute('SELECT COUNT(*) FROM sessions WHERE user_id = ?', (user_id,))
-        total_sessions = cursor.fetchone()[0]
+        cursor.execute('BEGIN')
+        version = self._data_version(cursor, user_id)
         
-        # Average session duration
-        cursor.execute('SELECT AVG(duration) FROM sessions WHERE user_id = ? AND duration IS NOT NULL', (user_id,))
-        avg_duration = cursor.fetchone()[0] or 0
+        events = {}
+        for kind, query in ANALYTICS_EVENT_QUERIES.items():
+            cursor.execute(query, (user_id, since))
+            events[kind] = ([column[0] for column in cursor.description], cursor.fetchall())
+        
+        conn.rollback()
+        conn.close()
+        
+        return version, events
+    
+    @timed('db')
+    def get_history_page(self, kind, user_id, cursor=None, limit=50):
+        """Get one newest-first page of a user's history using keyset pagination
+
+        Raises ValueError for a malformed cursor or a limit below one.
+        """
+        history = HISTORY_TABLES[kind]
+        if limit < 1:
+            raise ValueError('limit must be at least 1')
+        order_column = history['order_by']
+        
+        query = f'''
+            SELECT {', '.join(history['columns'])}
+            FROM {history['table']}
+            WHERE user_id = ?
+        '''
+        params = [user_id]
+        if cursor:
+            # The cursor is the (timestamp, id) of the last row of the previous page
+            after_time, separator, after_id = cursor.rpartition('|')
+            if not separator or not after_time or not after_id.isdigit():
+                raise ValueError(f'Invalid cursor: {cursor}')
+            query += f' AND ({order_column}, id) < (?, ?)'
+            params += [after_time, int(after_id)]
+        query += f' ORDER BY {order_column} DESC, id DESC LIMIT ?'
+        params.append(limit)
+        
+        conn = sqlite3.connect(self.db_path)
+        db_cursor = conn.cursor()
+        
+        db_cursor.execute(query, params)
+        rows = db_cursor.fetchall()
+        conn.close()
+        
+        items = [LazyJSONRecord(history['columns'], row, history['json_columns']) for row in rows]
+        next_cursor = None
+        if len(items) == limit:
+            last = items[-1]
+            next_cursor = f"{last[order_column]}|{last['id']}"
+        
+        return {'items': items, 'next_cursor': next_cursor}
+    
+    def iter_history(self, kind, user_id, batch_size=500, include_archived=False):
+        """Stream a user's full history oldest-first without loading it into memory"""
+        history = HISTORY_TABLES[kind]
+        
+        # Archived rows are all older than anything still in the hot tables
+        if include_archived and history.get('archived'):
+            yield from self._archive().query(kind, user_id, batch_size=batch_size)
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {', '.join(history['columns'])}
+                FROM {history['table']}
+                WHERE user_id = ?
+                ORDER BY {history['order_by']}, id
+            ''', (user_id,))
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield LazyJSONRecord(history['columns'], row, history['json_columns'])
+        finally:
+            conn.close()
+    
+    def get_archive_watermark(self):
+        """Get the timestamp everything older than has been moved to the archive, if any"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT value FROM retention_state WHERE name = 'archived_before'")
+        watermark = cursor.fetchone()
+        conn.close()
+        
+        return watermark[0] if watermark else None
+    
+    def _archive(self):
+        # Imported lazily; retention builds on this module
+        from retention import ArchiveStore
+        return ArchiveStore(self.archive_dir)
+    
+    @timed('db')
+    def get_emotion_trends(self, user_id, days=7, granularity='day'):
+        """Get per-bucket emotion distributions for the last N days from the rollups"""
+        if granularity not in ('day', 'hour'):
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        
+        # Whole days come from the daily rollup, whole hours at the window's
+        # leading edge from the hourly rollup, and only the partial first hour
+        # from raw rows, so the cost barely depends on the window length
+        start = datetime.utcnow() - timedelta(days=days)
+        hour_edge = start.replace(minute=0, second=0, microsecond=0)
+        if hour_edge < start:
+            hour_edge += timedelta(hours=1)
+        day_edge = hour_edge.replace(hour=0)
+        if day_edge < hour_edge:
+            day_edge += timedelta(days=1)
+        
+        if granularity == 'hour':
+            bucket_format = '%Y-%m-%d %H:00'
+            day_edge = None
+        else:
+            bucket_format = '%Y-%m-%d'
+        
+        fmt = '%Y-%m-%d %H:%M:%S'
+        start, hour_edge = start.strftime(fmt), hour_edge.strftime(fmt)
+        day_edge = day_edge.strftime(fmt) if day_edge else '9999-12-31 23:59:59'
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
         
-        # Most common emotion
         cursor.execute('''
-            SELECT emotion_type, COUNT(*) as count 
-            FROM emotion_tracking 
-            WHERE user_id = ? 
-            GROUP BY emotion_type 
-            ORDER BY count DESC 
-            LIMIT 1
-        ''', (user_id,))
-        common_emotion = cursor.fetchone()
+            SELECT bucket, emotion_type, source,
+                   SUM(count), SUM(total_intensity), MAX(max_intensity)
+            FROM (
+                SELECT strftime(?, timestamp) AS bucket, emotion_type, source,
+                       1 AS count, intensity AS total_intensity, intensity AS max_intensity
+                FROM emotion_tracking
+                WHERE user_id = ? AND timestamp >= ? AND timestamp < ?
+                UNION ALL
+                SELECT strftime(?, bucket), emotion_type, source,
+                       count, total_intensity, max_intensity
+                FROM emotion_rollup_hourly
+                WHERE user_id = ? AND bucket >= ? AND bucket < ?
+                UNION ALL
+                SELECT strftime(?, bucket), emotion_type, source,
+                       count, total_intensity, max_intensity
+                FROM emotion_rollup_daily
+                WHERE user_id = ? AND bucket >= ?
+            )
+            GROUP BY bucket, emotion_type, source
+            ORDER BY bucket, emotion_type, source
+        ''', (
+            bucket_format, user_id, start, hour_edge,
+            bucket_format, user_id, hour_edge, day_edge,
+            bucket_format, user_id, day_edge
+        ))
+        
+        buckets = cursor.fetchall()
+        conn.close()
+        
+        return [{
+            'bucket': bucket[0],
+            'emotion_type': bucket[1],
+            'source': bucket[2],
+            'count': bucket[3],
+            'mean_intensity': bucket[4] / bucket[3],
+            'max_intensity': bucket[5]
+        } for bucket in buckets]
+    
+    def save_cohort_report(self, sections, generated_at=None, keep=30):
+        """Store one cohort report run, keeping only the newest `keep` runs"""
+        generated_at = generated_at or datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+            INSERT OR REPLACE INTO cohort_reports (generated_at, section, payload) VALUES (?, ?, ?)
+        ''', [(generated_at, section, json.dumps(payload)) for section, payload in sections.items()])
+        cursor.execute('''
+            DELETE FROM cohort_reports WHERE generated_at NOT IN (
+                SELECT DISTINCT generated_at FROM cohort_reports ORDER BY generated_at DESC LIMIT ?
+            )
+        ''', (keep,))
         
-        # Emergency events count
-        cursor.execute('SELECT COUNT(*) FROM emergency_events WHERE user_id = ?', (user_id,))
-        emergency_count = cursor.fetchone()[0]
+        conn.commit()
+        conn.close()
+        return generated_at
+    
+    @timed('db')
+    def get_cohort_report(self, sections=None):
+        """Get the newest cohort report, optionally only some of its sections"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT generated_at, section, payload FROM cohort_reports
+            WHERE generated_at = (SELECT MAX(generated_at) FROM cohort_reports)
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+        
+        if not rows:
+            return None
+        return {
+            'generated_at': rows[0][0],
+            'sections': {
+                section: json.loads(payload)
+                for _, section, payload in rows
+                if sections is None or section in sections
+            }
+        }
+    
+    def rebuild_emotion_rollups(self):
+        """Recompute the hourly and daily emotion rollups from emotion_tracking"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        self._rebuild_emotion_rollups(cursor)
+        
+        cursor.execute('SELECT COUNT(*) FROM emotion_rollup_hourly')
+        rebuilt = cursor.fetchone()[0]
+        conn.commit()
+        conn.close()
+        
+        return rebuilt
+    
+    @timed('db')
+    def get_user_stats(self, user_id):
+        """Get user statistics"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT total_sessions, completed_sessions, total_duration,
+                   most_common_emotion, emergency_events
+            FROM user_stats
+            WHERE user_id = ?
+        ''', (user_id,))
+        stats = cursor.fetchone()
         
         conn.close()
         
+        if not stats:
+            stats = (0, 0, 0, None, 0)
+        total_sessions, completed_sessions, total_duration, common_emotion, emergency_count = stats
+        avg_duration = total_duration / completed_sessions if completed_sessions else 0
+        
         return {
             'total_sessions': total_sessions,
             'average_session_duration': round(avg_duration / 60, 1),  # Convert to minutes
-            'most_common_emotion': common_emotion[0] if common_emotion else 'neutral',
+            'most_common_emotion': common_emotion or 'neutral',
             'emergency_events': emergency_count
         }
+    
+    @timed('db')
+    def get_data_version(self, user_id):
+        """A number that changes whenever the user's sessions, emotions, exercises or emergencies do"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        version = self._data_version(cursor, user_id)
+        
+        conn.close()
+        return version
+    
+    @timed('db')
+    def get_wellness(self, user_id):
+        """Get the user's maintained wellness score with the data version it reflects"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('BEGIN')
+        cursor.execute(f'''
+            SELECT {', '.join(WellnessCounters.__slots__)} FROM user_wellness WHERE user_id = ?
+        ''', (user_id,))
+        row = cursor.fetchone()
+        wellness = WellnessCounters(**dict(zip(WellnessCounters.__slots__, row))) if row else WellnessCounters()
+        version = self._data_version(cursor, user_id)
+        
+        conn.rollback()
+        conn.close()
+        return _wellness_result(wellness, version)
+    
+    def recompute_wellness(self, user_id):
+        """Compute the wellness score from the base tables, for checking the maintained one"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('BEGIN')
+        wellness = self._wellness_from_base(cursor, user_id).get(user_id, WellnessCounters())
+        version = self._data_version(cursor, user_id)
+        
+        conn.rollback()
+        conn.close()
+        return _wellness_result(wellness, version)
+    
+    def rebuild_wellness(self):
+        """Recompute every user's wellness counters from the base tables"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        self._rebuild_wellness(cursor)
+        
+        cursor.execute('SELECT COUNT(*) FROM user_wellness')
+        rebuilt = cursor.fetchone()[0]
+        conn.commit()
+        conn.close()
+        
+        return rebuilt
+    
+    def verify_wellness(self, tolerance=0.5):
+        """Compare maintained wellness scores against the base tables and report drifted users"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('BEGIN')
+        expected = self._wellness_from_base(cursor)
+        cursor.execute(f'SELECT user_id, {", ".join(WellnessCounters.__slots__)} FROM user_wellness')
+        stored = {
+            row[0]: WellnessCounters(**dict(zip(WellnessCounters.__slots__, row[1:])))
+            for row in cursor.fetchall()
+        }
+        conn.rollback()
+        conn.close()
+        
+        now = time.time()
+        drift = {}
+        for user_id in expected.keys() | stored.keys():
+            want = expected.get(user_id, WellnessCounters()).score(now)
+            have = stored.get(user_id, WellnessCounters()).score(now)
+            want_values = {'score': want[0], **want[1]}
+            have_values = {'score': have[0], **have[1]}
+            diffs = {
+                name: {'expected': want_values[name], 'stored': have_values[name]}
+                for name in want_values
+                if abs(want_values[name] - have_values[name]) > tolerance
+            }
+            if diffs:
+                drift[user_id] = diffs
+        
+        return drift
+    
+    def rebuild_user_stats(self):
+        """Recompute every user_stats row from the base tables"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        self._rebuild_user_stats(cursor)
+        
+        cursor.execute('SELECT COUNT(*) FROM user_stats')
+        rebuilt = cursor.fetchone()[0]
+        conn.commit()
+        conn.close()
+        
+        return rebuilt
+    
+    def verify_user_stats(self):
+        """Compare user_stats against the base tables and report drifted users"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        columns = ['total_sessions', 'completed_sessions', 'total_duration',
+                   'most_common_emotion_count', 'emergency_events']
+        
+        cursor.execute(f'''
+            WITH expected AS ({USER_STATS_FROM_BASE_SQL})
+            SELECT e.user_id, {', '.join(f'e.{c}' for c in columns)},
+                   {', '.join(f'COALESCE(s.{c}, 0)' for c in columns)}
+            FROM expected e
+            LEFT JOIN user_stats s ON s.user_id = e.user_id
+            UNION ALL
+            SELECT s.user_id, {', '.join('0' for c in columns)},
+                   {', '.join(f's.{c}' for c in columns)}
+            FROM user_stats s
+            WHERE s.user_id NOT IN (SELECT user_id FROM expected)
+        ''')
+        
+        drift = {}
+        for row in cursor.fetchall():
+            expected = row[1:len(columns) + 1]
+            stored = row[len(columns) + 1:]
+            diffs = {
+                column: {'expected': want, 'stored': have}
+                for column, want, have in zip(columns, expected, stored)
+                if want != have
+            }
+            if diffs:
+                drift[row[0]] = diffs
+        
+        # Emotion counters feed most_common_emotion, so check them too
+        cursor.execute(f'''
+            SELECT t.user_id, t.emotion_type
+            FROM ({EMOTION_COUNTS_FROM_BASE_SQL}) t
+            LEFT JOIN user_emotion_counts c
+                ON c.user_id = t.user_id AND c.emotion_type = t.emotion_type
+            WHERE c.count IS NOT t.count
+        ''')
+        for user_id, emotion_type in cursor.fetchall():
+            drift.setdefault(user_id, {})[f'emotion_count:{emotion_type}'] = 'mismatch'
+        
+        conn.close()
+        return drift
+    
+    def _bump_user_stats(self, cursor, user_id, sessions=0, completed=0, duration=0, emergencies=0):
+        """Apply deltas to a user's stats row, creating it if needed"""
+        cursor.execute('''
+            INSERT INTO user_stats
+            (user_id, total_sessions, completed_sessions, total_duration, emergency_events)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                total_sessions = total_sessions + excluded.total_sessions,
+                completed_sessions = completed_sessions + excluded.completed_sessions,
+                total_duration = total_duration + excluded.total_duration,
+                emergency_events = emergency_events + excluded.emergency_events
+        ''', (user_id, sessions, completed, duration, emergencies))
+    
+    def _bump_data_version(self, cursor, user_id):
+        """Mark a user's data as changed"""
+        cursor.execute('''
+            INSERT INTO user_data_versions (user_id, version) VALUES (?, 1)
+            ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+        ''', (user_id,))
+    
+    def _data_version(self, cursor, user_id):
+        cursor.execute('SELECT version FROM user_data_versions WHERE user_id = ?', (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    
+    def _update_wellness(self, cursor, user_id, update):
+        """Apply `update` to the user's wellness counters in one upsert; O(1) whatever the history length"""
+        # The new events on their own, merged into the stored row in SQL the way WellnessCounters.merge does
+        delta = WellnessCounters()
+        update(delta)
+        cursor.connection.create_function('wellness_merged', 4, wellness_merged, deterministic=True)
+        cursor.execute(WELLNESS_UPSERT_SQL, (user_id, *(getattr(delta, field) for field in WellnessCounters.__slots__)))
+    
+    def _store_wellness(self, cursor, counters):
+        cursor.executemany(f'''
+            INSERT OR REPLACE INTO user_wellness (user_id, {', '.join(WellnessCounters.__slots__)})
+            VALUES (?, {', '.join('?' for _ in WellnessCounters.__slots__)})
+        ''', [
+            (user_id, *(getattr(wellness, field) for field in WellnessCounters.__slots__))
+            for user_id, wellness in counters
+        ])
+    
+    def _wellness_from_base(self, cursor, user_id=None):
+        """Wellness counters for one or every user, streamed from the base tables"""
+        where, params = ('WHERE user_id = ?', (user_id,)) if user_id else ('', ())
+        counters = {}
+        for kind, query in WELLNESS_EVENT_QUERIES.items():
+            for row in cursor.execute(query.format(where=where), params):
+                wellness = counters.get(row[0])
+                if wellness is None:
+                    wellness = counters[row[0]] = WellnessCounters()
+                if kind == 'emotions':
+                    wellness.add_emotion(row[2], row[3], row[1])
+                elif kind == 'sessions':
+                    wellness.add_session(row[1], completed=row[2] is not None)
+                elif kind == 'exercises':
+                    wellness.add_exercise(row[1], row[2], row[3])
+                else:
+                    wellness.add_emergency(row[1])
+        return counters
+    
+    def _rebuild_wellness(self, cursor):
+        """Replace the wellness counters with values computed from the base tables"""
+        counters = self._wellness_from_base(cursor)
+        cursor.execute('DELETE FROM user_wellness')
+        self._store_wellness(cursor, counters.items())
+    
+    def _bump_emotion_count(self, cursor, user_id, emotion_type, count=1):
+        """Increment an emotion counter and promote it if it is now the most common"""
+        cursor.execute('''
+            INSERT INTO user_emotion_counts (user_id, emotion_type, count)
+            VALUES (?, ?, ?)
+            ON CONFLICT (user_id, emotion_type) DO UPDATE SET count = count + excluded.count
+            RETURNING count
+        ''', (user_id, emotion_type, count))
+        new_count = cursor.fetchone()[0]
+        
+        self._bump_user_stats(cursor, user_id)
+        cursor.execute('''
+            UPDATE user_stats
+            SET most_common_emotion = ?, most_common_emotion_count = ?
+            WHERE user_id = ? AND (most_common_emotion = ? OR most_common_emotion_count < ?)
+        ''', (emotion_type, new_count, user_id, emotion_type, new_count))
+    
+    def _rollup_emotions(self, cursor, first_id, last_id):
+        """Fold a contiguous range of emotion_tracking rows into the rollups"""
+        for rollup_table, bucket_format in EMOTION_ROLLUP_TABLES.items():
+            cursor.execute(f'''
+                INSERT INTO {rollup_table}
+                (user_id, bucket, emotion_type, source, count, total_intensity, max_intensity)
+                SELECT user_id, strftime(?, timestamp), emotion_type, source,
+                       COUNT(*), SUM(intensity), MAX(intensity)
+                FROM emotion_tracking
+                WHERE id BETWEEN ? AND ?
+                GROUP BY 1, 2, 3, 4
+                ON CONFLICT (user_id, bucket, emotion_type, source) DO UPDATE SET
+                    count = count + excluded.count,
+                    total_intensity = total_intensity + excluded.total_intensity,
+                    max_intensity = MAX(max_intensity, excluded.max_intensity)
+            ''', (bucket_format, first_id, last_id))
+    
+    def _rebuild_emotion_rollups(self, cursor):
+        """Replace the emotion rollups with values computed from emotion_tracking"""
+        # Buckets before the archive watermark only exist in the rollups now, so
+        # keep them; the watermark is day-aligned so no bucket straddles it
+        cursor.execute("SELECT value FROM retention_state WHERE name = 'archived_before'")
+        watermark = cursor.fetchone()
+        archived_before = watermark[0] if watermark else ''
+        
+        for rollup_table, bucket_format in EMOTION_ROLLUP_TABLES.items():
+            cursor.execute(f'DELETE FROM {rollup_table} WHERE bucket >= ?', (archived_before,))
+            cursor.execute(f'''
+                INSERT INTO {rollup_table}
+                (user_id, bucket, emotion_type, source, count, total_intensity, max_intensity)
+                SELECT user_id, strftime(?, timestamp), emotion_type, source,
+                       COUNT(*), SUM(intensity), MAX(intensity)
+                FROM emotion_tracking
+                WHERE timestamp >= ?
+                GROUP BY 1, 2, 3, 4
+            ''', (bucket_format, archived_before))
+    
+    def _rebuild_user_stats(self, cursor):
+        """Replace the stats summary with values computed from the base tables"""
+        cursor.execute('DELETE FROM user_emotion_counts')
+        cursor.execute(f'''
+            INSERT INTO user_emotion_counts (user_id, emotion_type, count)
+            {EMOTION_COUNTS_FROM_BASE_SQL}
+        ''')
+        
+        cursor.execute('DELETE FROM user_stats')
+        cursor.execute(f'''
+            INSERT INTO user_stats
+            (user_id, total_sessions, completed_sessions, total_duration,
+             most_common_emotion, most_common_emotion_count, emergency_events)
+            {USER_STATS_FROM_BASE_SQL}
+        ''')
+
+# Exportable history kinds and how to page through them
+HISTORY_TABLES = {
+    'sessions': {
+        'table': 'sessions',
+        'columns': ('id', 'user_id', 'session_type', 'start_time', 'end_time',
+                    'duration', 'emotion_data', 'crisis_level'),
+        'json_columns': ('emotion_data',),
+        'order_by': 'start_time'
+    },
+    'chat': {
+        'table': 'chat_messages',
+        'columns': ('id', 'user_id', 'session_id', 'message_text', 'sender',
+                    'emotion_detected', 'timestamp'),
+        'json_columns': ('emotion_detected',),
+        'order_by': 'timestamp',
+        'archived': True
+    },
+    'emotions': {
+        'table': 'emotion_tracking',
+        'columns': ('id', 'user_id', 'emotion_type', 'intensity', 'source',
+                    'timestamp', 'session_id'),
+        'json_columns': (),
+        'order_by': 'timestamp',
+        'archived': True
+    }
+}
+
+# Per-user event columns loaded by the analytics engine, bound to (user_id, since)
+ANALYTICS_EVENT_QUERIES = {
+    'emotions': '''
+        SELECT timestamp, emotion_type, intensity, source FROM emotion_tracking
+        WHERE user_id = ? AND timestamp >= ? ORDER BY timestamp
+    ''',
+    'sessions': '''
+        SELECT start_time, session_type, duration, crisis_level FROM sessions
+        WHERE user_id = ? AND start_time >= ? ORDER BY start_time
+    ''',
+    'exercises': '''
+        SELECT timestamp, exercise_type, duration, effectiveness FROM exercises
+        WHERE user_id = ? AND timestamp >= ? ORDER BY timestamp
+    ''',
+    'emergencies': '''
+        SELECT triggered_at, crisis_level, resolved_at FROM emergency_events
+        WHERE user_id = ? AND triggered_at >= ? ORDER BY triggered_at
+    '''
+}
+
+# Columns of an emergency event as returned by get_emergency and the crisis store
+EMERGENCY_COLUMNS = 'id, user_id, crisis_level, triggered_at, resolved_at, action_taken, counselor_contacted'
+
+# Unix seconds, fractions included, of a stored UTC timestamp
+EPOCH_SQL = "(julianday({column}) - 2440587.5) * 86400.0"
+
+# Merge one user's counters into their stored row; SET expressions see the row's old as_of
+WELLNESS_UPSERT_SQL = f'''
+    INSERT INTO user_wellness (user_id, {', '.join(WellnessCounters.__slots__)})
+    VALUES (?, {', '.join('?' for _ in WellnessCounters.__slots__)})
+    ON CONFLICT (user_id) DO UPDATE SET
+        {', '.join(
+            f'{field} = wellness_merged({field}, as_of, excluded.{field}, excluded.as_of)'
+            for field in WellnessCounters.FIELDS
+        )},
+        as_of = MAX(as_of, excluded.as_of)
+'''
+
+# (user_id, time, ...) rows the wellness counters are rebuilt from; {where} may narrow to one user
+WELLNESS_EVENT_QUERIES = {
+    'emotions': f'''
+        SELECT user_id, {EPOCH_SQL.format(column='timestamp')}, emotion_type, intensity
+        FROM emotion_tracking {{where}}
+    ''',
+    'sessions': f'''
+        SELECT user_id, {EPOCH_SQL.format(column='start_time')}, duration FROM sessions {{where}}
+    ''',
+    'exercises': f'''
+        SELECT user_id, {EPOCH_SQL.format(column='timestamp')}, duration, effectiveness
+        FROM exercises {{where}}
+    ''',
+    'emergencies': f'''
+        SELECT user_id, {EPOCH_SQL.format(column='triggered_at')} FROM emergency_events {{where}}
+    '''
+}
+
+# Rollup table -> strftime format of its bucket start
+EMOTION_ROLLUP_TABLES = {
+    'emotion_rollup_hourly': '%Y-%m-%d %H:00:00',
+    'emotion_rollup_daily': '%Y-%m-%d 00:00:00'
+}
+
+# Per-user emotion counts across hot rows and rows already moved to the archive
+EMOTION_COUNTS_FROM_BASE_SQL = '''
+    SELECT user_id, emotion_type, SUM(count) AS count FROM (
+        SELECT user_id, emotion_type, COUNT(*) AS count
+        FROM emotion_tracking GROUP BY user_id, emotion_type
+        UNION ALL
+        SELECT user_id, emotion_type, count FROM archived_emotion_counts
+    ) GROUP BY user_id, emotion_type
+'''
+
+# Recomputes the user_stats columns from scratch; shared by rebuild and verify
+USER_STATS_FROM_BASE_SQL = f'''
+    WITH ids AS (
+        SELECT user_id FROM sessions
+        UNION SELECT user_id FROM emotion_tracking
+        UNION SELECT user_id FROM archived_emotion_counts
+        UNION SELECT user_id FROM emergency_events
+    ),
+    session_totals AS (
+        SELECT user_id, COUNT(*) AS total, COUNT(duration) AS completed,
+               COALESCE(SUM(duration), 0) AS duration
+        FROM sessions GROUP BY user_id
+    ),
+    emergency_totals AS (
+        SELECT user_id, COUNT(*) AS total FROM emergency_events GROUP BY user_id
+    ),
+    top_emotions AS (
+        SELECT user_id, emotion_type, count FROM (
+            SELECT user_id, emotion_type, count,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY count DESC) AS rank
+            FROM ({EMOTION_COUNTS_FROM_BASE_SQL})
+        ) WHERE rank = 1
+    )
+    SELECT ids.user_id,
+           COALESCE(s.total, 0) AS total_sessions,
+           COALESCE(s.completed, 0) AS completed_sessions,
+           COALESCE(s.duration, 0) AS total_duration,
+           t.emotion_type AS most_common_emotion,
+           COALESCE(t.count, 0) AS most_common_emotion_count,
+           COALESCE(e.total, 0) AS emergency_events
+    FROM ids
+    LEFT JOIN session_totals s ON s.user_id = ids.user_id
+    LEFT JOIN emergency_totals e ON e.user_id = ids.user_id
+    LEFT JOIN top_emotions t ON t.user_id = ids.user_id
+'''
+
+def _epoch(timestamp):
+    """Unix seconds of a naive UTC datetime or a stored timestamp string"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return timestamp.replace(tzinfo=timezone.utc).timestamp()
+
+def _emergency_dict(row):
+    event = dict(zip(EMERGENCY_COLUMNS.split(', '), row))
+    event['counselor_contacted'] = bool(event['counselor_contacted'])
+    return event
+
+def _wellness_result(wellness, version):
+    score, components = wellness.score(time.time())
+    return {'score': score, 'components': components, 'version': version}
 
 # Global database instance
-db = MentalHealthDB()
\ No newline at end of file
+db = MentalHealthDB()
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Mental health database maintenance')
+    parser.add_argument('command', choices=['rebuild-stats', 'verify-stats', 'rebuild-rollups',
+                                            'rebuild-wellness', 'verify-wellness'])
+    parser.add_argument('--db', default='mental_health.db', help='Path to the SQLite database')
+    args = parser.parse_args()
+    
+    target = db if args.db == db.db_path else MentalHealthDB(args.db)
+    
+    if args.command == 'rebuild-stats':
+        print(f"✅ Rebuilt stats for {target.rebuild_user_stats()} users")
+    elif args.command == 'rebuild-rollups':
+        print(f"✅ Rebuilt {target.rebuild_emotion_rollups()} hourly emotion buckets")
+    elif args.command == 'rebuild-wellness':
+        print(f"✅ Rebuilt wellness counters for {target.rebuild_wellness()} users")
+    else:
+        wellness = args.command == 'verify-wellness'
+        drift = target.verify_wellness() if wellness else target.verify_user_stats()
+        if not drift:
+            print(f"✅ {'user_wellness' if wellness else 'user_stats'} matches the base tables")
+        else:
+            for user_id, diffs in drift.items():
+                print(f"❌ {user_id}: {diffs}")
+            raise SystemExit(1)
@@ -0,0 +1,181 @@
+# backend/emotion_fusion.py
+import math
+import threading
+import time
+from collections import OrderedDict
+from database import db
+from wellness import EMOTION_VALENCE
+
+FUSION_MODALITIES = ('text', 'facial', 'voice')
+
+# How much each modality is trusted, before its own confidence is applied
+MODALITY_WEIGHTS = {'facial': 0.4, 'voice': 0.3, 'text': 0.3}
+
+# A reading this many seconds older than another counts half as much in the fused vector
+FUSION_HALF_LIFE = 120
+
+# Labels the detectors use for the emotions in EMOTION_VALENCE
+EMOTION_ALIASES = {'fear': 'fearful', 'anger': 'angry', 'happiness': 'happy', 'sadness': 'sad',
+                   'surprise': 'surprised'}
+
+def modality_reading(modality, analysis):
+    """({emotion: share}, confidence) from one detector's analysis, or None if it has nothing usable"""
+    if not analysis or analysis.get('success') is False:
+        return None
+
+    if modality == 'text':
+        sentiment = analysis.get('sentiment') or {}
+        score = float(sentiment.get('score', 0.0))
+        emotion = 'happy' if sentiment.get('label', '').upper() == 'POSITIVE' else 'sad'
+        emotions, confidence = {emotion: score, 'neutral': 1.0 - score}, score
+    elif modality == 'facial':
+        scores = {EMOTION_ALIASES.get(name, name): max(float(value), 0.0)
+                  for name, value in (analysis.get('emotions') or {}).items()}
+        total = sum(scores.values())
+        if total <= 0:
+            return None
+        emotions = {emotion: value / total for emotion, value in scores.items()}
+        confidence = max(emotions.values())
+    elif modality == 'voice':
+        emotion = analysis.get('emotion')
+        if not emotion:
+            return None
+        emotions, confidence = {EMOTION_ALIASES.get(emotion, emotion): 1.0}, float(analysis.get('confidence', 1.0))
+    else:
+        raise ValueError(f'Unknown modality: {modality}')
+
+    return emotions, min(max(confidence, 0.0), 1.0)
+
+class _UserFusion:
+    __slots__ = ('readings', 'fused', 'reliability', 'anchor')
+
+    def __init__(self):
+        self.readings = {}    # modality -> (emotions, confidence, Unix seconds)
+        self.fused = {}
+        self.reliability = 0.0
+        self.anchor = 0.0
+
+class EmotionFusion:
+    """Latest reading per modality for each user, fused as readings arrive.
+
+    The fused vector is
+
+        sum(a_m * w_m * v_m) / sum(a_m * w_m),   w_m = 0.5 ** ((t_newest - t_m) / half-life)
+
+    over the user's latest text, facial and voice readings, where a_m is
+    the modality's weight times the reading's confidence. Decaying against
+    the newest reading rather than the current time gives the same vector
+    at any moment, since a common factor cancels, so it only changes when a
+    reading does and is rebuilt then, in constant time. Reading it back
+    touches neither the database nor a model; only the overall confidence
+    is decayed to now.
+
+    `on_change(user_id, combined)` is called when the dominant fused
+    emotion changes. Users who have not been updated or read recently are
+    dropped past `max_users`, and a user not in memory is seeded from their
+    newest stored reading per modality.
+    """
+
+    def __init__(self, database=db, half_life=FUSION_HALF_LIFE, max_users=100000, on_change=None,
+                 clock=time.time):
+        self.database = database
+        self.decay = math.log(2) / half_life
+        self.max_users = max_users
+        self.on_change = on_change
+        self.clock = clock
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, user_id, modality, emotions, confidence, at=None):
+        """Replace a user's latest reading for one modality; returns the new combined analysis"""
+        if modality not in MODALITY_WEIGHTS:
+            raise ValueError(f'Unknown modality: {modality}')
+        at = self.clock() if at is None else at
+
+        fusion = self._fusion(user_id)
+        with self._lock:
+            previous = fusion.readings.get(modality)
+            if previous is not None and previous[2] > at:
+                return self._combined(fusion)
+
+            dominant = _dominant(fusion.fused)
+            fusion.readings[modality] = (dict(emotions), confidence, at)
+            self._fuse(fusion)
+            combined = self._combined(fusion)
+
+        if self.on_change is not None and combined['dominant_emotion'] != dominant:
+            self.on_change(user_id, combined)
+        return combined
+
+    def combined(self, user_id):
+        fusion = self._fusion(user_id)
+        with self._lock:
+            return self._combined(fusion)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._users)
+
+    def _fusion(self, user_id):
+        """The user's state, seeded from their stored readings if it is not in memory"""
+        seeded = None
+        while True:
+            with self._lock:
+                fusion = self._users.get(user_id)
+                if fusion is None and seeded is not None:
+                    # Nobody else seeded them while we read the database
+                    fusion = self._users[user_id] = seeded
+                    self._evict()
+                if fusion is not None:
+                    self._users.move_to_end(user_id)
+                    return fusion
+            seeded = self._seed(user_id)
+
+    def _seed(self, user_id):
+        fusion = _UserFusion()
+        latest = self.database.get_latest_emotions(user_id, FUSION_MODALITIES)
+        for modality, (emotion, intensity, at) in latest.items():
+            fusion.readings[modality] = ({emotion: 1.0}, min(max(intensity, 0.0), 1.0), at)
+        self._fuse(fusion)
+        return fusion
+
+    def _fuse(self, fusion):
+        fusion.anchor = max((at for _, _, at in fusion.readings.values()), default=0.0)
+        fused, total = {}, 0.0
+        for modality, (emotions, confidence, at) in fusion.readings.items():
+            weight = MODALITY_WEIGHTS[modality] * confidence * math.exp(-self.decay * (fusion.anchor - at))
+            total += weight
+            for emotion, share in emotions.items():
+                fused[emotion] = fused.get(emotion, 0.0) + weight * share
+        fusion.fused = {emotion: value / total for emotion, value in fused.items()} if total > 0 else {}
+        # Total weight as of the newest reading; decayed to now it is the overall confidence, up to 1
+        fusion.reliability = total
+
+    def _combined(self, fusion):
+        now = self.clock()
+        fused = fusion.fused
+        valence = sum((EMOTION_VALENCE.get(emotion, 0.0) * share for emotion, share in fused.items()), 0.0)
+        return {
+            'emotions': {emotion: round(share, 3) for emotion, share in sorted(fused.items())},
+            'dominant_emotion': _dominant(fused),
+            'valence': round(valence, 3),
+            'confidence': round(fusion.reliability * math.exp(-self.decay * max(now - fusion.anchor, 0.0)), 3),
+            'modalities': {
+                modality: {
+                    'dominant_emotion': _dominant(emotions),
+                    'confidence': round(confidence, 3),
+                    'age_seconds': round(max(now - at, 0.0), 1)
+                }
+                for modality, (emotions, confidence, at) in fusion.readings.items()
+            }
+        }
+
+    def _evict(self):
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+def _dominant(emotions):
+    return max(emotions, key=emotions.get) if emotions else None
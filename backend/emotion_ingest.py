@@ -0,0 +1,128 @@
+# backend/emotion_ingest.py
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from database import db
+
+EMOTION_SOURCES = ('text', 'facial', 'voice', 'multimodal')
+
+class EmotionIngestor:
+    """Validates, coalesces and batch-writes streamed emotion readings.
+
+    Clients send arrays of {emotion, intensity, confidence, timestamp}. A
+    user keeps at most one reading per source per `resolution` seconds.
+    Readings that land in the same slot are merged into the most frequent
+    emotion there. The newest slot stored for each user and source is
+    remembered, so a client sending one reading at a time faster than the
+    resolution is downsampled too. The survivors go to the database in one
+    insert.
+    """
+
+    def __init__(self, database=db, resolution=3.0, max_batch=500, max_age=86400, max_skew=300,
+                 max_tracked_users=100000):
+        self.database = database
+        self.resolution = resolution
+        self.max_batch = max_batch
+        self.max_age = timedelta(seconds=max_age)
+        self.max_skew = timedelta(seconds=max_skew)
+        self.max_tracked_users = max_tracked_users
+        self._last_slots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ingest(self, user_id, readings, source='facial', session_id=None):
+        """Store a batch for one user; returns counts plus the index and reason of each rejected reading"""
+        if not user_id:
+            raise ValueError('user_id is required')
+        if not isinstance(readings, list):
+            raise ValueError('readings must be a list')
+        if len(readings) > self.max_batch:
+            raise ValueError(f'At most {self.max_batch} readings per batch')
+
+        valid, rejected = self._validate(readings, source)
+        rows, slots = self._coalesce(user_id, valid)
+        self.database.track_emotions(user_id, rows, session_id)
+        with self._lock:
+            for source_slot in slots:
+                self._remember(user_id, *source_slot)
+
+        return {
+            'received': len(readings),
+            'stored': len(rows),
+            'coalesced': len(valid) - len(rows),
+            'rejected': rejected
+        }
+
+    def _validate(self, readings, default_source):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        oldest, newest = now - self.max_age, now + self.max_skew
+        valid, rejected = [], []
+
+        for index, reading in enumerate(readings):
+            try:
+                if not isinstance(reading, dict):
+                    raise ValueError('reading must be an object')
+                emotion = reading.get('emotion') or reading.get('emotion_type')
+                if not isinstance(emotion, str) or not 0 < len(emotion) <= 32:
+                    raise ValueError('emotion must be a non-empty string')
+                intensity = float(reading.get('intensity', 0.5))
+                confidence = float(reading.get('confidence', 1.0))
+                if not (0.0 <= intensity <= 1.0 and 0.0 <= confidence <= 1.0):
+                    raise ValueError('intensity and confidence must be between 0 and 1')
+                source = reading.get('source', default_source)
+                if source not in EMOTION_SOURCES:
+                    raise ValueError(f"source must be one of {', '.join(EMOTION_SOURCES)}")
+                timestamp = parse_timestamp(reading['timestamp']) if 'timestamp' in reading else now
+                if not oldest <= timestamp <= newest:
+                    raise ValueError('timestamp is too far from the server clock')
+            except (TypeError, ValueError) as e:
+                rejected.append({'index': index, 'error': str(e)})
+                continue
+            valid.append((emotion.lower(), intensity, confidence, source, timestamp))
+
+        return valid, rejected
+
+    def _coalesce(self, user_id, readings):
+        slots = {}
+        for reading in readings:
+            source, timestamp = reading[3], reading[4]
+            slot = int(timestamp.replace(tzinfo=timezone.utc).timestamp() // self.resolution)
+            slots.setdefault((source, slot), []).append(reading)
+
+        rows, written = [], []
+        with self._lock:
+            for (source, slot), members in sorted(slots.items(), key=lambda item: item[0][1]):
+                if self._last_slots.get((user_id, source)) == slot:
+                    # The previous batch already stored a reading for this instant
+                    continue
+                rows.append(merge_slot(members))
+                written.append((source, slot))
+        return rows, written
+
+    def _remember(self, user_id, source, slot):
+        key = (user_id, source)
+        self._last_slots[key] = max(slot, self._last_slots.get(key, slot))
+        self._last_slots.move_to_end(key)
+        while len(self._last_slots) > self.max_tracked_users:
+            self._last_slots.popitem(last=False)
+
+def merge_slot(readings):
+    """The most frequent emotion in one slot (ties go to the higher total confidence) as one row"""
+    by_emotion = {}
+    for reading in readings:
+        by_emotion.setdefault(reading[0], []).append(reading)
+    emotion, members = max(
+        by_emotion.items(),
+        key=lambda item: (len(item[1]), sum(reading[2] for reading in item[1]))
+    )
+    intensity = sum(reading[1] for reading in members) / len(members)
+    latest = max(reading[4] for reading in members)
+    return emotion, intensity, members[0][3], latest.strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_timestamp(value):
+    """ISO 8601 (as sent by Date.toISOString) or epoch seconds, as naive UTC"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
@@ -0,0 +1,85 @@
+# backend/forecasting.py
+from datetime import timedelta
+from statistics import NormalDist
+import numpy as np
+
+# Smoothing parameters tried when fitting; beta = 0 is plain EWMA (no trend)
+ALPHAS = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
+BETAS = np.array([0.0, 0.05, 0.1, 0.2, 0.3])
+
+class HoltForecast:
+    """A fitted Holt linear-trend model with additive day-of-week offsets.
+
+    Fitting is closed-form apart from the level/trend recursion. That runs
+    once for every (alpha, beta) pair on the grid at the same time, as
+    NumPy arrays, and the pair with the smallest one-step-ahead squared
+    error is kept. With beta = 0 the model is plain exponential smoothing.
+    Weekday offsets are shrunk towards zero when a weekday has been seen
+    only a few times.
+    """
+
+    __slots__ = ('level', 'trend', 'alpha', 'beta', 'sigma', 'seasonal', 'last_date', 'bounds')
+
+    def __init__(self, level, trend, alpha, beta, sigma, seasonal, last_date, bounds):
+        self.level = level
+        self.trend = trend
+        self.alpha = alpha
+        self.beta = beta
+        self.sigma = sigma
+        self.seasonal = seasonal
+        self.last_date = last_date
+        self.bounds = bounds
+
+    def forecast(self, days, level=0.95):
+        """Point forecasts with `level` prediction intervals for the next `days` days"""
+        steps = np.arange(1, days + 1)
+        dates = [self.last_date + timedelta(days=int(step)) for step in steps]
+        weekdays = np.array([date.weekday() for date in dates])
+        point = self.level + steps * self.trend + self.seasonal[weekdays]
+
+        # Holt's h-step variance: sigma^2 * (1 + sum_{j<h} (alpha * (1 + j * beta))^2)
+        weights = (self.alpha * (1 + np.arange(days) * self.beta)) ** 2
+        weights[0] = 0.0
+        spread = NormalDist().inv_cdf(0.5 + level / 2) * self.sigma * np.sqrt(1 + np.cumsum(weights))
+
+        low, high = self.bounds
+        columns = (np.clip(np.round(values, 3), low, high).tolist()
+                   for values in (point, point - spread, point + spread))
+        return [
+            {'date': date.strftime('%Y-%m-%d'), 'predicted_mood': value, 'lower': lower, 'upper': upper}
+            for date, value, lower, upper in zip(dates, *columns)
+        ]
+
+def fit_holt(dates, values, bounds=(-1.0, 1.0), shrinkage=2.0):
+    """Fit on daily `values` observed on `dates` (oldest first; days without data may be missing)"""
+    y = np.asarray(values, dtype=float)
+    if len(y) < 2:
+        raise ValueError('At least two observations are needed')
+    weekdays = np.array([date.weekday() for date in dates])
+    # Calendar days since the previous observation; missing days advance the trend without an update
+    gaps = np.maximum(np.diff([date.toordinal() for date in dates]), 1)
+
+    # Day-of-week offsets from the mean, shrunk by count / (count + shrinkage)
+    counts = np.bincount(weekdays, minlength=7)
+    sums = np.bincount(weekdays, weights=y - y.mean(), minlength=7)
+    seasonal = np.where(counts > 0, sums / np.maximum(counts, 1), 0.0) * counts / (counts + shrinkage)
+    deseasonalized = y - seasonal[weekdays]
+
+    # Every (alpha, beta) pair at once: arrays of shape (len(ALPHAS) * len(BETAS),)
+    alpha = np.repeat(ALPHAS, len(BETAS))
+    beta = np.tile(BETAS, len(ALPHAS))
+    level = np.full(alpha.shape, deseasonalized[0])
+    trend = np.where(beta > 0, (deseasonalized[1] - deseasonalized[0]) / gaps[0], 0.0)
+    squared_error = np.zeros(alpha.shape)
+    for observation, gap in zip(deseasonalized[1:], gaps):
+        predicted = level + gap * trend
+        error = observation - predicted
+        squared_error += error * error
+        level = predicted + alpha * error
+        trend = trend + alpha * beta * error
+
+    best = int(np.argmin(squared_error))
+    # One-step errors, less a degree of freedom for each of alpha, beta and the start level
+    sigma = float(np.sqrt(squared_error[best] / max(len(y) - 4, 1)))
+    return HoltForecast(float(level[best]), float(trend[best]), float(alpha[best]), float(beta[best]),
+                        sigma, seasonal, dates[-1], bounds)
@@ -0,0 +1,204 @@
+# backend/metrics.py
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# Seconds; finer at the low end where most API calls and DB writes land
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Counter:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+class Gauge(Counter):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self.value = value
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket', labels + (('le', repr(bound)),), cumulative
+        yield f'{name}_bucket', labels + (('le', '+Inf'),), self.count
+        yield f'{name}_sum', labels, self.sum
+        yield f'{name}_count', labels, self.count
+
+class MetricsRegistry:
+    """Named metric families with labels, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, **labels):
+        return self._get(name, help_text, 'counter', Counter, labels)
+
+    def gauge(self, name, help_text, **labels):
+        return self._get(name, help_text, 'gauge', Gauge, labels)
+
+    def histogram(self, name, help_text, **labels):
+        return self._get(name, help_text, 'histogram', Histogram, labels)
+
+    def _get(self, name, help_text, kind, factory, labels):
+        key = tuple(sorted(labels.items()))
+        family = self._families.get(name)
+        metric = family[2].get(key) if family else None
+        if metric is None:
+            # Only the first observation of a label set takes the lock
+            with self._lock:
+                family = self._families.setdefault(name, (help_text, kind, {}))
+                metric = family[2].setdefault(key, factory())
+        return metric
+
+    def render(self):
+        lines = []
+        for name, (help_text, kind, metrics) in sorted(self._families.items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, metric in list(metrics.items()):
+                for sample_name, sample_labels, value in metric.samples(name, labels):
+                    lines.append(f'{sample_name}{_format_labels(sample_labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Global registry
+registry = MetricsRegistry()
+
+def stage_histogram(component, stage):
+    return registry.histogram('stage_duration_seconds', 'Time spent in model and database stages',
+                              component=component, stage=stage)
+
+class stage_timer:
+    """Context manager timing one stage of a model or database operation"""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, component, stage):
+        self.histogram = stage_histogram(component, stage)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+def timed(component, stage=None):
+    """Decorator timing every call of a function as a stage"""
+    def decorator(func):
+        histogram = stage_histogram(component, stage or func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def track_socket_event(event):
+    """Decorator recording latency, in-flight count and errors for a Socket.IO handler"""
+    def decorator(handler):
+        duration = registry.histogram('socketio_event_duration_seconds', 'Socket.IO handler latency', event=event)
+        in_flight = registry.gauge('socketio_events_in_flight', 'Socket.IO handlers currently running', event=event)
+        handled = registry.counter('socketio_events_total', 'Socket.IO events handled', event=event, outcome='ok')
+        failed = registry.counter('socketio_events_total', 'Socket.IO events handled', event=event, outcome='error')
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            in_flight.inc()
+            start = time.perf_counter()
+            try:
+                result = handler(*args, **kwargs)
+            except Exception:
+                failed.inc()
+                raise
+            else:
+                handled.inc()
+                return result
+            finally:
+                duration.observe(time.perf_counter() - start)
+                in_flight.dec()
+        return wrapper
+    return decorator
+
+def init_app(app, endpoint='/metrics'):
+    """Record per-route latency, in-flight requests and status codes, and serve /metrics"""
+    from flask import Response, g, request
+
+    def route_label():
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = route_label()
+        registry.gauge('http_requests_in_flight', 'HTTP requests currently being handled',
+                       route=g.metrics_route).inc()
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        route = g.pop('metrics_route')
+        status = g.pop('metrics_status', 500)
+        registry.gauge('http_requests_in_flight', 'HTTP requests currently being handled', route=route).dec()
+        registry.histogram('http_request_duration_seconds', 'HTTP request latency',
+                           route=route, method=request.method).observe(time.perf_counter() - start)
+        registry.counter('http_requests_total', 'HTTP requests by status code',
+                         route=route, method=request.method, status=str(status)).inc()
+        if status >= 500 or exc is not None:
+            registry.counter('http_request_errors_total', 'HTTP requests that failed',
+                             route=route, method=request.method).inc()
+
+    @app.route(endpoint)
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
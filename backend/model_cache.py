@@ -0,0 +1,155 @@
+# backend/model_cache.py
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from metrics import registry
+
+class CachedModel:
+    __slots__ = ('model', 'version', 'size', 'trained_at')
+
+    def __init__(self, model, version, size, trained_at=None):
+        self.model = model
+        self.version = version
+        self.size = size
+        self.trained_at = trained_at or time.time()
+
+class ModelCache:
+    """Per-user trained models, bounded by count and bytes with LRU eviction.
+
+    `version` is a counter that only grows as the data a model would be
+    trained on changes, e.g. the user's data version. Once a cached model is
+    `stale_after` behind, it keeps serving while a replacement trains on
+    the worker pool. A user with no model trains once; concurrent requests
+    for that user share that one training. With
+    `persist_dir`, models are pickled to disk and reloaded after a restart
+    or an eviction. Only point it at a directory this service alone writes to.
+    """
+
+    def __init__(self, train, name='model', max_entries=1000, max_bytes=256 * 1024 * 1024,
+                 stale_after=20, max_workers=2, persist_dir=None):
+        self.train = train
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_after = stale_after
+        self.persist_dir = persist_dir
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix=f'{name}-train')
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+
+    def get(self, key, data, version):
+        """Return a model for `key`, training or scheduling a retrain as needed"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._load(key)
+
+        if entry is None:
+            self._count('miss')
+            return self._schedule(key, data, version).result().model
+
+        self._count('hit')
+        if version - entry.version >= self.stale_after:
+            self._schedule(key, data, version)
+        return entry.model
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry.size
+        if self.persist_dir:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'training': len(self._pending)
+            }
+
+    def _schedule(self, key, data, version):
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = self._pool.submit(self._train, key, data, version)
+        return future
+
+    def _train(self, key, data, version):
+        try:
+            start = time.perf_counter()
+            model = self.train(data)
+            registry.histogram('model_cache_train_seconds', 'Time spent training cached models',
+                               cache=self.name).observe(time.perf_counter() - start)
+            payload = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+            entry = CachedModel(model, version, len(payload))
+            self._store(key, entry)
+            if self.persist_dir:
+                self._save(key, entry, payload)
+            self._count('trained')
+            return entry
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _store(self, key, entry):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self._entries[key] = entry
+            self.bytes += entry.size
+
+            # The newest entry always stays, even if it alone is over the byte budget
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self._count('evicted')
+            registry.gauge('model_cache_bytes', 'Estimated size of cached models', cache=self.name).set(self.bytes)
+
+    def _path(self, key):
+        return os.path.join(self.persist_dir, hashlib.sha1(str(key).encode()).hexdigest() + '.pkl')
+
+    def _save(self, key, entry, payload):
+        path = self._path(key)
+        with open(path + '.partial', 'wb') as model_file:
+            pickle.dump({'key': key, 'version': entry.version, 'trained_at': entry.trained_at,
+                         'model': payload}, model_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.partial', path)
+
+    def _load(self, key):
+        if not self.persist_dir:
+            return None
+        try:
+            with open(self._path(key), 'rb') as model_file:
+                saved = pickle.load(model_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Could not load cached {self.name} for {key}: {e}")
+            return None
+        if saved.get('key') != key:
+            return None
+        entry = CachedModel(pickle.loads(saved['model']), saved['version'], len(saved['model']),
+                            saved['trained_at'])
+        self._store(key, entry)
+        self._count('loaded')
+        return entry
+
+    def _count(self, outcome):
+        registry.counter('model_cache_requests_total', 'Model cache lookups and maintenance by outcome',
+                         cache=self.name, outcome=outcome).inc()
@@ -0,0 +1,230 @@
+# backend/notifications.py
+import asyncio
+import functools
+import json
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from database import db
+from metrics import registry
+
+# Claimed deliveries that have not reported back after this long are retried
+CLAIM_LEASE = 120
+
+class Channel:
+    """How one kind of side effect is delivered: handler, time limit and retry policy"""
+
+    __slots__ = ('name', 'handler', 'timeout', 'max_attempts', 'base_delay', 'max_delay')
+
+    def __init__(self, name, handler, timeout=5.0, max_attempts=5, base_delay=1.0, max_delay=60.0):
+        self.name = name
+        self.handler = handler
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt):
+        """Delay before retry number `attempt`, exponential with jitter"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+class NotificationDispatcher:
+    """Runs a crisis's side effects concurrently, through a durable outbox.
+
+    `dispatch` writes one notification_outbox row per channel and returns.
+    The deliveries then run on an asyncio loop in a background thread, all
+    at once. Each attempt is limited to its channel's timeout, and failures
+    are retried with exponential backoff up to the channel's attempt limit.
+    Every attempt is recorded on its row. Rows still pending at startup are
+    picked up again, and a row is claimed before each attempt so several
+    workers sharing the database do not deliver it twice. Handlers may be
+    plain functions, which run on a small thread pool, or coroutines. They
+    take the row's payload dict and return something JSON-serializable.
+    """
+
+    def __init__(self, channels=(), database=db, max_workers=8):
+        self.db_path = database.db_path
+        self.channels = {channel.name: channel for channel in channels}
+        # Handlers that overrun their timeout keep their thread, so the outbox writes get their own
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='notify')
+        self._db_executor = ThreadPoolExecutor(2, thread_name_prefix='notify-outbox')
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def register(self, channel):
+        self.channels[channel.name] = channel
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='notify-loop', daemon=True)
+                self._thread.start()
+        self._recover()
+        return self
+
+    def stop(self):
+        with self._lock:
+            if self._thread is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._thread = self._loop = None
+
+    def dispatch(self, crisis_id, user_id, payloads):
+        """Record one delivery per channel in `payloads` and start them; returns {channel: outbox id}
+
+        Dispatching the same crisis and channel again keeps the first row.
+        """
+        unknown = set(payloads) - set(self.channels)
+        if unknown:
+            raise ValueError(f"Unknown notification channels: {', '.join(sorted(unknown))}")
+
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany('''
+            INSERT OR IGNORE INTO notification_outbox (crisis_id, user_id, channel, payload, next_attempt_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(crisis_id, user_id, channel, json.dumps(payload), now) for channel, payload in payloads.items()])
+        conn.commit()
+        rows = conn.execute(f'''
+            SELECT channel, id, status, next_attempt_at FROM notification_outbox
+            WHERE crisis_id = ? AND channel IN ({', '.join('?' for _ in payloads)})
+        ''', (crisis_id, *payloads)).fetchall()
+        conn.close()
+
+        for channel, outbox_id, status, next_attempt_at in rows:
+            if status == 'pending':
+                self._submit(outbox_id, next_attempt_at)
+        return {channel: outbox_id for channel, outbox_id, _, _ in rows}
+
+    def status(self, crisis_id):
+        """Delivery state of every channel dispatched for a crisis"""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('''
+            SELECT channel, status, attempts, last_error, result, sent_at FROM notification_outbox
+            WHERE crisis_id = ? ORDER BY id
+        ''', (crisis_id,)).fetchall()
+        conn.close()
+        return {
+            channel: {
+                'status': status,
+                'attempts': attempts,
+                'last_error': last_error,
+                'result': json.loads(result) if result else None,
+                'sent_at': sent_at
+            }
+            for channel, status, attempts, last_error, result, sent_at in rows
+        }
+
+    def _recover(self):
+        """Resume every delivery left pending, e.g. by a restart"""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT id, next_attempt_at FROM notification_outbox WHERE status = 'pending'").fetchall()
+        conn.close()
+        for outbox_id, next_attempt_at in rows:
+            self._submit(outbox_id, next_attempt_at)
+
+    def _submit(self, outbox_id, not_before):
+        if self._loop is None:
+            self.start()
+        asyncio.run_coroutine_threadsafe(self._deliver(outbox_id, not_before), self._loop)
+
+    async def _deliver(self, outbox_id, not_before):
+        while True:
+            delay = not_before - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            claimed = await self._db(self._claim, outbox_id, not_before)
+            if claimed is None:
+                return
+            channel_name, payload, attempt = claimed
+            channel = self.channels.get(channel_name)
+            if channel is None:
+                await self._db(self._finish, outbox_id, 'failed', attempt, f'No handler for {channel_name}')
+                return
+
+            start = time.perf_counter()
+            try:
+                result = await self._attempt(channel, payload)
+            except Exception as e:
+                error = 'timed out' if isinstance(e, asyncio.TimeoutError) else f'{type(e).__name__}: {e}'
+                self._observe(channel_name, start, 'error')
+                if attempt >= channel.max_attempts:
+                    await self._db(self._finish, outbox_id, 'failed', attempt, error)
+                    print(f"❌ {channel_name} notification {outbox_id} failed after {attempt} attempts: {error}")
+                    return
+                not_before = time.time() + channel.backoff(attempt)
+                await self._db(self._retry_later, outbox_id, attempt, error, not_before)
+                continue
+
+            self._observe(channel_name, start, 'sent')
+            await self._db(self._finish, outbox_id, 'sent', attempt, None, result)
+            return
+
+    async def _attempt(self, channel, payload):
+        if asyncio.iscoroutinefunction(channel.handler):
+            # Cancelled on timeout, so a retry cannot overlap it
+            return await asyncio.wait_for(channel.handler(payload), channel.timeout)
+
+        call = self._loop.run_in_executor(self._executor, channel.handler, payload)
+        try:
+            return await asyncio.wait_for(asyncio.shield(call), channel.timeout)
+        except asyncio.TimeoutError:
+            # A thread cannot be cancelled and a retry now could do the work twice (reserve two
+            # counselors, say), so let the call finish while this worker's claim still holds
+            print(f"⏳ {channel.name} handler overran {channel.timeout}s, waiting for it to finish")
+            return await asyncio.wait_for(call, max(CLAIM_LEASE - channel.timeout, 0.0))
+
+    async def _db(self, func, *args):
+        return await self._loop.run_in_executor(self._db_executor, functools.partial(func, *args))
+
+    def _claim(self, outbox_id, not_before):
+        """Take the next attempt for this worker; None if it is done or another worker holds it"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            now = time.time()
+            claimed = conn.execute('''
+                UPDATE notification_outbox SET attempts = attempts + 1, next_attempt_at = ?
+                WHERE id = ? AND status = 'pending' AND next_attempt_at <= ?
+            ''', (now + CLAIM_LEASE, outbox_id, max(now, not_before))).rowcount
+            conn.commit()
+            if not claimed:
+                return None
+            channel, payload, attempts = conn.execute(
+                'SELECT channel, payload, attempts FROM notification_outbox WHERE id = ?', (outbox_id,)
+            ).fetchone()
+            return channel, json.loads(payload), attempts
+        finally:
+            conn.close()
+
+    def _retry_later(self, outbox_id, attempt, error, not_before):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            UPDATE notification_outbox SET next_attempt_at = ?, last_error = ?
+            WHERE id = ? AND status = 'pending' AND attempts = ?
+        ''', (not_before, error, outbox_id, attempt))
+        conn.commit()
+        conn.close()
+
+    def _finish(self, outbox_id, status, attempt, error, result=None):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            UPDATE notification_outbox
+            SET status = ?, last_error = ?, result = ?,
+                sent_at = CASE WHEN ? = 'sent' THEN CURRENT_TIMESTAMP END
+            WHERE id = ? AND attempts = ?
+        ''', (status, error, json.dumps(result) if result is not None else None, status, outbox_id, attempt))
+        conn.commit()
+        conn.close()
+
+    def _observe(self, channel, start, outcome):
+        registry.histogram('notification_attempt_seconds', 'Time spent on each notification attempt',
+                           channel=channel).observe(time.perf_counter() - start)
+        registry.counter('notification_attempts_total', 'Notification attempts by channel and outcome',
+                         channel=channel, outcome=outcome).inc()
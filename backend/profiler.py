@@ -0,0 +1,197 @@
+# backend/profiler.py
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+class SamplingProfiler:
+    """On-demand sampling profiler for request and Socket.IO worker threads.
+
+    Worker threads tag themselves with the route or event they are handling;
+    while a capture runs, a background thread snapshots the stacks of the
+    tagged threads every `interval` seconds. Idle threads are never sampled,
+    and outside a capture the only cost per request is one attribute check.
+    Under eventlet/gevent all greenlets share a thread, so only the one
+    running at sample time is seen.
+    """
+
+    def __init__(self, output_dir='profiles'):
+        self.output_dir = output_dir
+        self.active = False
+        self.percent = 100
+        self.capture = None
+        self._tags = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._labels = {}
+        self.last_capture = None
+
+    def start(self, seconds=30, percent=100, interval=0.005, output_format='collapsed'):
+        """Begin a capture of `seconds`, sampling `percent` of requests started meanwhile"""
+        if output_format not in ('collapsed', 'speedscope'):
+            raise ValueError(f"Unknown profile format: {output_format}")
+        with self._lock:
+            if self.active:
+                raise RuntimeError('A profile capture is already running')
+            self.percent = percent
+            self.capture = {
+                'started_at': datetime.now().isoformat(),
+                'seconds': seconds,
+                'percent': percent,
+                'interval': interval,
+                'format': output_format
+            }
+            self._stop.clear()
+            self.active = True
+            self._thread = threading.Thread(
+                target=self._run, args=(self.capture, seconds, interval, output_format),
+                name='sampling-profiler', daemon=True
+            )
+            self._thread.start()
+        return self.capture
+
+    def stop(self):
+        """End the running capture early; its samples are still written"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        return self.last_capture
+
+    def status(self):
+        return {
+            'active': self.active,
+            'capture': self.capture if self.active else None,
+            'last_capture': self.last_capture,
+            'tagged_threads': len(self._tags)
+        }
+
+    def tag(self, label):
+        """Mark the current thread as handling `label`; returns whether it was selected"""
+        if not self.active or (self.percent < 100 and random.random() * 100 >= self.percent):
+            return False
+        self._tags[threading.get_ident()] = label
+        return True
+
+    def untag(self):
+        self._tags.pop(threading.get_ident(), None)
+
+    def tag_socket_event(self, event):
+        """Decorator tagging a Socket.IO handler's thread with its event name"""
+        def decorator(handler):
+            @functools.wraps(handler)
+            def wrapper(*args, **kwargs):
+                if not self.tag(f'socketio:{event}'):
+                    return handler(*args, **kwargs)
+                try:
+                    return handler(*args, **kwargs)
+                finally:
+                    self.untag()
+            return wrapper
+        return decorator
+
+    def init_app(self, app):
+        """Tag request threads with their method and route while a capture runs"""
+        from flask import request
+
+        @app.before_request
+        def tag_request():
+            if self.active:
+                rule = request.url_rule.rule if request.url_rule else 'unmatched'
+                self.tag(f'{request.method} {rule}')
+
+        @app.teardown_request
+        def untag_request(exc):
+            if self._tags:
+                self.untag()
+
+    def _run(self, capture, seconds, interval, output_format):
+        samples = Counter()
+        deadline = time.monotonic() + seconds
+        sampler_ident = threading.get_ident()
+        started = time.monotonic()
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                frames = sys._current_frames()
+                for ident, label in list(self._tags.items()):
+                    frame = frames.get(ident)
+                    if frame is not None and ident != sampler_ident:
+                        samples[(label, self._stack(frame))] += 1
+                del frames
+                self._stop.wait(interval)
+        finally:
+            # Still active until the capture is stored, so no new one can start and take its place
+            try:
+                path = self._write(samples, interval, output_format, time.monotonic() - started)
+                self.last_capture = dict(capture, path=path, samples=sum(samples.values()))
+                print(f"🔬 Profile written to {path} ({self.last_capture['samples']} samples)")
+            finally:
+                with self._lock:
+                    self._tags.clear()
+                    self.active = False
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = (
+                    f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+                )
+            stack.append(label)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _write(self, samples, interval, output_format, elapsed):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+
+        if output_format == 'collapsed':
+            # Brendan Gregg's folded format, with the route/event as the root frame
+            path = os.path.join(self.output_dir, f'profile-{stamp}.collapsed')
+            with open(path, 'w') as out:
+                for (label, stack), count in samples.most_common():
+                    out.write(';'.join((label,) + stack).replace(' ', '_') + f' {count}\n')
+            return path
+
+        path = os.path.join(self.output_dir, f'profile-{stamp}.speedscope.json')
+        frames, frame_index, profiles = [], {}, {}
+        for (label, stack), count in samples.items():
+            indexes = []
+            for name in stack:
+                if name not in frame_index:
+                    frame_index[name] = len(frames)
+                    frames.append({'name': name})
+                indexes.append(frame_index[name])
+            profile = profiles.setdefault(label, {'samples': [], 'weights': []})
+            profile['samples'].append(indexes)
+            profile['weights'].append(count * interval)
+
+        with open(path, 'w') as out:
+            json.dump({
+                '$schema': 'https://www.speedscope.app/file-format-schema.json',
+                'name': f'profile-{stamp}',
+                'exporter': 'ai-mental-health-companion',
+                'shared': {'frames': frames},
+                'profiles': [{
+                    'type': 'sampled',
+                    'name': label,
+                    'unit': 'seconds',
+                    'startValue': 0,
+                    'endValue': elapsed,
+                    'samples': profile['samples'],
+                    'weights': profile['weights']
+                } for label, profile in profiles.items()]
+            }, out)
+        return path
+
+# Global profiler instance
+profiler = SamplingProfiler(os.environ.get('PROFILE_OUTPUT_DIR', 'profiles'))
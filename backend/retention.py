@@ -0,0 +1,207 @@
+# backend/retention.py
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from database import db, HISTORY_TABLES, LazyJSONRecord
+
+# History kinds that are moved out of the hot database once they age out
+ARCHIVED_KINDS = [kind for kind, history in HISTORY_TABLES.items() if history.get('archived')]
+
+class ArchiveStore:
+    """Per-month, gzip-compressed SQLite files holding archived history rows"""
+
+    def __init__(self, archive_dir='archive'):
+        self.archive_dir = archive_dir
+
+    def months(self):
+        """List archived months, oldest first"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(
+            name[:-len('.sqlite.gz')]
+            for name in os.listdir(self.archive_dir)
+            if name.endswith('.sqlite.gz')
+        )
+
+    def append(self, month, kind, rows):
+        """Add rows to a month's archive, rewriting the compressed file atomically"""
+        history = HISTORY_TABLES[kind]
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        with self._open_month(month) as conn:
+            cursor = conn.cursor()
+            columns = ', '.join(history['columns'])
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {history['table']} (
+                    {columns},
+                    PRIMARY KEY (id)
+                )
+            ''')
+            cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_{history['table']}_user_time
+                ON {history['table']} (user_id, {history['order_by']})
+            ''')
+
+            # Ignoring duplicates makes re-running an interrupted compaction safe
+            placeholders = ', '.join('?' for _ in history['columns'])
+            cursor.executemany(
+                f"INSERT OR IGNORE INTO {history['table']} ({columns}) VALUES ({placeholders})",
+                rows
+            )
+            archived = cursor.rowcount
+            conn.commit()
+
+        return archived
+
+    def query(self, kind, user_id, since=None, batch_size=500):
+        """Stream a user's archived rows oldest-first, optionally only those after `since`"""
+        history = HISTORY_TABLES[kind]
+        order_column = history['order_by']
+
+        for month in self.months():
+            if since and month < since[:7]:
+                continue
+
+            with self._open_month(month, readonly=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                    (history['table'],)
+                )
+                if not cursor.fetchone():
+                    continue
+
+                cursor.execute(f'''
+                    SELECT {', '.join(history['columns'])}
+                    FROM {history['table']}
+                    WHERE user_id = ? AND {order_column} >= ?
+                    ORDER BY {order_column}, id
+                ''', (user_id, since or ''))
+
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield LazyJSONRecord(history['columns'], row, history['json_columns'])
+
+    def _path(self, month):
+        return os.path.join(self.archive_dir, f'{month}.sqlite.gz')
+
+    def _open_month(self, month, readonly=False):
+        return _MonthArchive(self._path(month), readonly)
+
+class _MonthArchive:
+    """Decompresses a month archive to a scratch file and recompresses it on exit"""
+
+    def __init__(self, path, readonly):
+        self.path = path
+        self.readonly = readonly
+
+    def __enter__(self):
+        fd, self.scratch_path = tempfile.mkstemp(suffix='.sqlite')
+        with os.fdopen(fd, 'wb') as scratch:
+            if os.path.exists(self.path):
+                with gzip.open(self.path, 'rb') as archive:
+                    shutil.copyfileobj(archive, scratch)
+        self.conn = sqlite3.connect(self.scratch_path)
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.close()
+        try:
+            if exc_type is None and not self.readonly:
+                partial_path = self.path + '.partial'
+                with open(self.scratch_path, 'rb') as scratch, gzip.open(partial_path, 'wb') as archive:
+                    shutil.copyfileobj(scratch, archive)
+                os.replace(partial_path, self.path)
+        finally:
+            os.remove(self.scratch_path)
+
+def compact(database=db, max_age_days=180, vacuum=False, batch_size=5000):
+    """Move chat and emotion rows older than max_age_days into the per-month archive"""
+    # Align to a day boundary so no hourly/daily rollup bucket straddles the cutoff
+    cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    cutoff = cutoff.strftime('%Y-%m-%d %H:%M:%S')
+    archive = ArchiveStore(database.archive_dir)
+    moved = {}
+
+    conn = sqlite3.connect(database.db_path)
+    cursor = conn.cursor()
+
+    for kind in ARCHIVED_KINDS:
+        history = HISTORY_TABLES[kind]
+        table, order_column = history['table'], history['order_by']
+        moved[kind] = 0
+
+        cursor.execute(f'''
+            SELECT DISTINCT strftime('%Y-%m', {order_column})
+            FROM {table}
+            WHERE {order_column} < ?
+        ''', (cutoff,))
+        months = [row[0] for row in cursor.fetchall()]
+
+        for month in months:
+            month_start = f'{month}-01 00:00:00'
+            month_end = min(_next_month(month), cutoff)
+            window = f'{order_column} >= ? AND {order_column} < ?'
+
+            # Copy to the archive first; rows only leave the hot table once the
+            # compressed file has been written. The cursor is consumed lazily,
+            # so a month is never held in memory at once
+            rows = conn.execute(f'''
+                SELECT {', '.join(history['columns'])} FROM {table} WHERE {window}
+            ''', (month_start, month_end))
+            rows.arraysize = batch_size
+            archive.append(month, kind, rows)
+
+            if kind == 'emotions':
+                cursor.execute(f'''
+                    INSERT INTO archived_emotion_counts (user_id, emotion_type, count)
+                    SELECT user_id, emotion_type, COUNT(*) FROM {table} WHERE {window}
+                    GROUP BY user_id, emotion_type
+                    ON CONFLICT (user_id, emotion_type) DO UPDATE SET count = count + excluded.count
+                ''', (month_start, month_end))
+
+            cursor.execute(f'DELETE FROM {table} WHERE {window}', (month_start, month_end))
+            moved[kind] += cursor.rowcount
+            conn.commit()
+
+    cursor.execute('''
+        INSERT INTO retention_state (name, value) VALUES ('archived_before', ?)
+        ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)
+    ''', (cutoff,))
+    conn.commit()
+
+    if vacuum:
+        cursor.execute('VACUUM')
+    conn.close()
+
+    return moved
+
+def _next_month(month):
+    year, month = map(int, month.split('-'))
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f'{year:04d}-{month:02d}-01 00:00:00'
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Archive old chat and emotion history')
+    parser.add_argument('--max-age-days', type=int, default=180, help='Keep this many days in the hot database')
+    parser.add_argument('--db', default='mental_health.db', help='Path to the SQLite database')
+    parser.add_argument('--archive-dir', default='archive', help='Directory for the per-month archives')
+    parser.add_argument('--vacuum', action='store_true', help='Reclaim freed pages afterwards')
+    args = parser.parse_args()
+
+    from database import MentalHealthDB
+    target = MentalHealthDB(args.db, archive_dir=args.archive_dir)
+
+    moved = compact(target, max_age_days=args.max_age_days, vacuum=args.vacuum)
+    for kind, count in moved.items():
+        print(f"📦 Archived {count} {kind} rows")
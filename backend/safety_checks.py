@@ -0,0 +1,251 @@
+# backend/safety_checks.py
+import heapq
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from database import db
+from metrics import registry
+
+# Follow-up checks after a crisis: every five minutes for half an hour
+SAFETY_CHECK_INTERVAL = 300
+SAFETY_CHECK_COUNT = 6
+
+# A claimed check that has not finished after this long is assumed lost and runs again
+CLAIM_LEASE = 60
+
+class SystemClock:
+    def time(self):
+        return time.time()
+
+    def timeout(self, delay):
+        return max(delay, 0.0)
+
+class ManualClock:
+    """Simulated time for tests and benchmarks; only moves when advanced"""
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self._listeners = []
+
+    def time(self):
+        return self._now
+
+    def timeout(self, delay):
+        # Nothing becomes due until the clock is advanced, which wakes the waiter
+        return None
+
+    def advance(self, seconds):
+        self._now += seconds
+        for listener in list(self._listeners):
+            listener()
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+class SafetyCheckScheduler:
+    """Every pending crisis safety check on one timer thread.
+
+    Checks are rows in the safety_checks table, so they survive a restart.
+    A heap of (due time, id) decides what runs next, and due checks run on
+    a small worker pool. Before it runs, a check is claimed by moving its
+    due time forward one lease with a conditional UPDATE. That way a check
+    runs once even with several schedulers on the same database, and runs
+    again if its worker dies mid-check. Escalation is recorded on the row
+    before `escalate` is called, so a crisis is escalated at most once.
+    If `escalate` raises, the mark is cleared and the next check retries.
+
+    `check(user_id, crisis_id)` returns True when the user is confirmed
+    safe; an exception counts as unconfirmed. Pass a ManualClock and call
+    `run_due()` to step through simulated time without the thread.
+    """
+
+    def __init__(self, check, escalate, database=db, clock=None, max_workers=4):
+        self.check = check
+        self.escalate = escalate
+        self.db_path = database.db_path
+        self.clock = clock or SystemClock()
+        self.max_workers = max_workers
+        self._heap = []
+        self._wake = threading.Condition()
+        self._thread = None
+        self._pool = None
+        self._stopping = False
+        if hasattr(self.clock, 'subscribe'):
+            self.clock.subscribe(self._notify)
+        self._load()
+
+    def schedule(self, user_id, crisis_id, interval=SAFETY_CHECK_INTERVAL, count=SAFETY_CHECK_COUNT):
+        """Start checks for a crisis; scheduling the same crisis again changes nothing"""
+        due_at = self.clock.time() + interval
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.execute('''
+            INSERT OR IGNORE INTO safety_checks (crisis_id, user_id, due_at, interval, remaining)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (crisis_id, user_id, due_at, interval, count))
+        check_id = cursor.lastrowid if cursor.rowcount else None
+        conn.commit()
+        conn.close()
+
+        if check_id is not None:
+            self._push(due_at, check_id)
+        return check_id
+
+    def cancel(self, crisis_id):
+        """Stop further checks for a crisis, e.g. once it is resolved"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.execute('''
+            UPDATE safety_checks SET status = 'cancelled' WHERE crisis_id = ? AND status = 'pending'
+        ''', (crisis_id,))
+        cancelled = cursor.rowcount
+        conn.commit()
+        conn.close()
+        # The heap entry stays; its claim fails once it comes due
+        return bool(cancelled)
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix='safety-check')
+            self._thread = threading.Thread(target=self._run, name='safety-scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._wake:
+            self._stopping = True
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._pool.shutdown(wait=True)
+            self._thread = self._pool = None
+
+    def run_due(self):
+        """Run every check that is due now on the calling thread; returns how many ran"""
+        ran = 0
+        for due_at, check_id in self._pop_due():
+            self._fire(check_id, due_at)
+            ran += 1
+        return ran
+
+    def pending(self):
+        with self._wake:
+            return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while not self._stopping and (not self._heap or self._heap[0][0] > self.clock.time()):
+                    delay = self._heap[0][0] - self.clock.time() if self._heap else None
+                    self._wake.wait(self.clock.timeout(delay) if delay is not None else None)
+                if self._stopping:
+                    return
+            for due_at, check_id in self._pop_due():
+                self._pool.submit(self._fire, check_id, due_at)
+
+    def _pop_due(self):
+        now = self.clock.time()
+        due = []
+        with self._wake:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+            self._gauge()
+        return due
+
+    def _push(self, due_at, check_id):
+        with self._wake:
+            heapq.heappush(self._heap, (due_at, check_id))
+            self._gauge()
+            self._wake.notify()
+
+    def _notify(self):
+        with self._wake:
+            self._wake.notify()
+
+    def _load(self):
+        """Queue every pending check from the database, e.g. after a restart"""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT due_at, id FROM safety_checks WHERE status = 'pending'").fetchall()
+        conn.close()
+        with self._wake:
+            self._heap = rows
+            heapq.heapify(self._heap)
+            self._gauge()
+
+    def _fire(self, check_id, due_at):
+        conn = sqlite3.connect(self.db_path)
+        claimed = finished = False
+        try:
+            now = self.clock.time()
+            claimed = conn.execute('''
+                UPDATE safety_checks SET due_at = ?
+                WHERE id = ? AND status = 'pending' AND due_at = ?
+            ''', (now + CLAIM_LEASE, check_id, due_at)).rowcount
+            conn.commit()
+            if not claimed:
+                # Cancelled, finished, or claimed by another scheduler; follow it if it is still live
+                row = conn.execute("SELECT due_at FROM safety_checks WHERE id = ? AND status = 'pending'",
+                                   (check_id,)).fetchone()
+                if row and row[0] > due_at:
+                    self._push(row[0], check_id)
+                self._count('skipped')
+                return
+
+            user_id, crisis_id, interval, remaining, escalated_at = conn.execute('''
+                SELECT user_id, crisis_id, interval, remaining, escalated_at FROM safety_checks WHERE id = ?
+            ''', (check_id,)).fetchone()
+
+            try:
+                safe = bool(self.check(user_id, crisis_id))
+            except Exception as e:
+                print(f"Safety check for crisis {crisis_id} failed: {e}")
+                safe = False
+
+            if safe:
+                self._count('safe')
+            elif escalated_at is not None:
+                self._count('unconfirmed')
+            else:
+                self._escalate(conn, check_id, user_id, crisis_id, now)
+
+            # Next check keeps to the original cadence unless it has fallen behind
+            if remaining > 1:
+                next_due = max(due_at + interval, now)
+                conn.execute('''
+                    UPDATE safety_checks SET due_at = ?, remaining = remaining - 1
+                    WHERE id = ? AND status = 'pending'
+                ''', (next_due, check_id))
+                conn.commit()
+                self._push(next_due, check_id)
+            else:
+                conn.execute("UPDATE safety_checks SET status = 'done', remaining = 0 WHERE id = ?", (check_id,))
+                conn.commit()
+            finished = True
+        finally:
+            conn.close()
+            if claimed and not finished:
+                # The row still holds the lease; try again once it runs out
+                self._push(now + CLAIM_LEASE, check_id)
+
+    def _escalate(self, conn, check_id, user_id, crisis_id, now):
+        marked = conn.execute('''
+            UPDATE safety_checks SET escalated_at = ? WHERE id = ? AND escalated_at IS NULL
+        ''', (now, check_id)).rowcount
+        conn.commit()
+        if not marked:
+            self._count('unconfirmed')
+            return
+        try:
+            self.escalate(user_id, crisis_id)
+            self._count('escalated')
+        except Exception as e:
+            print(f"Escalating crisis {crisis_id} failed, will retry on the next check: {e}")
+            conn.execute('UPDATE safety_checks SET escalated_at = NULL WHERE id = ?', (check_id,))
+            conn.commit()
+            self._count('error')
+
+    def _gauge(self):
+        registry.gauge('safety_checks_pending', 'Crisis safety checks waiting to run').set(len(self._heap))
+
+    def _count(self, outcome):
+        registry.counter('safety_checks_total', 'Crisis safety checks run by outcome', outcome=outcome).inc()
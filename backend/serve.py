@@ -0,0 +1,31 @@
+# backend/serve.py
+"""Production entry point for the API and Socket.IO server.
+
+With SOCKETIO_ASYNC_MODE=eventlet or gevent each connection is a green
+thread instead of an OS thread, so one process holds far more sockets. To
+run several workers behind a load balancer, give them all the same
+SOCKETIO_MESSAGE_QUEUE (e.g. redis://localhost:6379/0) and enable sticky
+sessions so a client's polling requests reach the same worker:
+
+    SOCKETIO_ASYNC_MODE=eventlet SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/0 PORT=5001 python serve.py
+    SOCKETIO_ASYNC_MODE=eventlet SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/0 PORT=5002 python serve.py
+"""
+import os
+
+async_mode = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+
+# Green-thread servers must patch the standard library before anything imports it
+if async_mode == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif async_mode == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from app import app, socketio
+
+if __name__ == '__main__':
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', 5000))
+    print(f"🚀 Serving on http://{host}:{port} ({async_mode} workers)")
+    socketio.run(app, host=host, port=port, allow_unsafe_werkzeug=async_mode == 'threading')
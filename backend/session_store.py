@@ -0,0 +1,241 @@
+# backend/session_store.py
+import abc
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+class SessionStore(abc.ABC):
+    """Recent per-user emotion history for the live chat session"""
+
+    @abc.abstractmethod
+    def append(self, user_id, entry):
+        """Record an entry for the user, refreshing their session"""
+
+    @abc.abstractmethod
+    def recent(self, user_id, limit=10):
+        """Get the user's most recent entries, oldest first"""
+
+    @abc.abstractmethod
+    def count(self, user_id):
+        """Get how many entries the user's current session has recorded"""
+
+    @abc.abstractmethod
+    def clear(self, user_id):
+        """Forget the user's session"""
+
+class _UserSession:
+    __slots__ = ('entries', 'count', 'last_seen')
+
+    def __init__(self, max_entries):
+        self.entries = deque(maxlen=max_entries)
+        self.count = 0
+        self.last_seen = 0.0
+
+class MemorySessionStore(SessionStore):
+    """In-process store: a ring buffer per user, idle TTL and a global entry cap.
+
+    Sessions are kept in least-recently-written order, so expiry and cap
+    eviction only ever look at the oldest session.
+    """
+
+    def __init__(self, max_entries_per_user=50, ttl_seconds=3600, max_total_entries=100000,
+                 clock=time.monotonic):
+        self.max_entries_per_user = max_entries_per_user
+        self.ttl_seconds = ttl_seconds
+        self.max_total_entries = max_total_entries
+        self.clock = clock
+        self._sessions = OrderedDict()
+        self._total_entries = 0
+        self._lock = threading.Lock()
+
+    def append(self, user_id, entry):
+        with self._lock:
+            now = self.clock()
+            session = self._live_session(user_id, now)
+            if session is None:
+                session = self._sessions[user_id] = _UserSession(self.max_entries_per_user)
+            else:
+                self._sessions.move_to_end(user_id)
+
+            # A full ring buffer drops its oldest entry on append
+            if len(session.entries) < self.max_entries_per_user:
+                self._total_entries += 1
+            session.entries.append(entry)
+            session.count += 1
+            session.last_seen = now
+
+            self._evict(now)
+
+    def recent(self, user_id, limit=10):
+        with self._lock:
+            session = self._live_session(user_id, self.clock())
+            if session is None:
+                return []
+            entries = session.entries
+            return [entries[i] for i in range(max(len(entries) - limit, 0), len(entries))]
+
+    def count(self, user_id):
+        with self._lock:
+            session = self._live_session(user_id, self.clock())
+            return session.count if session else 0
+
+    def clear(self, user_id):
+        with self._lock:
+            self._drop(user_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _live_session(self, user_id, now):
+        session = self._sessions.get(user_id)
+        if session is not None and now - session.last_seen > self.ttl_seconds:
+            self._drop(user_id)
+            return None
+        return session
+
+    def _drop(self, user_id):
+        session = self._sessions.pop(user_id, None)
+        if session is not None:
+            self._total_entries -= len(session.entries)
+
+    def _evict(self, now):
+        while self._sessions:
+            user_id, oldest = next(iter(self._sessions.items()))
+            expired = now - oldest.last_seen > self.ttl_seconds
+            if not expired and self._total_entries <= self.max_total_entries:
+                break
+            self._drop(user_id)
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite-backed store that several worker processes can share"""
+
+    def __init__(self, db_path='sessions.db', max_entries_per_user=50, ttl_seconds=3600,
+                 purge_every=500, clock=time.time):
+        self.db_path = db_path
+        self.max_entries_per_user = max_entries_per_user
+        self.ttl_seconds = ttl_seconds
+        self.purge_every = purge_every
+        self.clock = clock
+        self._appends = 0
+        self._local = threading.local()
+        self.init_db()
+
+    def init_db(self):
+        """Create the session tables"""
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS session_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                payload TEXT NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_session_entries_user
+            ON session_entries (user_id, id)
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS session_counters (
+                user_id TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                last_seen REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+
+    def append(self, user_id, entry):
+        now = self.clock()
+        conn = self._connection()
+        with conn:
+            # An expired session starts again from scratch
+            conn.execute('''
+                DELETE FROM session_entries WHERE user_id = ? AND EXISTS (
+                    SELECT 1 FROM session_counters WHERE user_id = ? AND last_seen < ?
+                )
+            ''', (user_id, user_id, now - self.ttl_seconds))
+            conn.execute('''
+                INSERT INTO session_counters (user_id, count, last_seen) VALUES (?, 1, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    count = CASE WHEN last_seen < ? THEN 1 ELSE count + 1 END,
+                    last_seen = excluded.last_seen
+            ''', (user_id, now, now - self.ttl_seconds))
+            entry_id = conn.execute(
+                'INSERT INTO session_entries (user_id, payload) VALUES (?, ?)',
+                (user_id, json.dumps(entry))
+            ).lastrowid
+            # Trim the user's buffer back to its fixed size
+            conn.execute('''
+                DELETE FROM session_entries WHERE user_id = ? AND id <= (
+                    SELECT id FROM session_entries WHERE user_id = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+            ''', (user_id, user_id, self.max_entries_per_user))
+
+        self._appends += 1
+        if self._appends % self.purge_every == 0:
+            self.purge_expired()
+        return entry_id
+
+    def recent(self, user_id, limit=10):
+        rows = self._connection().execute('''
+            SELECT e.payload FROM session_entries e
+            JOIN session_counters c ON c.user_id = e.user_id
+            WHERE e.user_id = ? AND c.last_seen >= ?
+            ORDER BY e.id DESC LIMIT ?
+        ''', (user_id, self.clock() - self.ttl_seconds, limit)).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def count(self, user_id):
+        row = self._connection().execute(
+            'SELECT count FROM session_counters WHERE user_id = ? AND last_seen >= ?',
+            (user_id, self.clock() - self.ttl_seconds)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def clear(self, user_id):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM session_entries WHERE user_id = ?', (user_id,))
+            conn.execute('DELETE FROM session_counters WHERE user_id = ?', (user_id,))
+
+    def purge_expired(self):
+        """Delete every session idle for longer than the TTL"""
+        cutoff = self.clock() - self.ttl_seconds
+        conn = self._connection()
+        with conn:
+            conn.execute('''
+                DELETE FROM session_entries WHERE user_id IN (
+                    SELECT user_id FROM session_counters WHERE last_seen < ?
+                )
+            ''', (cutoff,))
+            conn.execute('DELETE FROM session_counters WHERE last_seen < ?', (cutoff,))
+
+    def _connection(self):
+        # One connection per thread; SQLite handles locking between processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=10)
+        return conn
+
+def create_session_store(config):
+    """Build the session store selected by SESSION_STORE ('memory' or 'sqlite')"""
+    backend = config.get('SESSION_STORE', 'memory')
+    max_entries = int(config.get('SESSION_MAX_ENTRIES_PER_USER', 50))
+    ttl_seconds = int(config.get('SESSION_TTL_SECONDS', 3600))
+
+    if backend == 'memory':
+        return MemorySessionStore(
+            max_entries_per_user=max_entries,
+            ttl_seconds=ttl_seconds,
+            max_total_entries=int(config.get('SESSION_MAX_TOTAL_ENTRIES', 100000))
+        )
+    if backend == 'sqlite':
+        return SQLiteSessionStore(
+            db_path=config.get('SESSION_STORE_PATH', 'sessions.db'),
+            max_entries_per_user=max_entries,
+            ttl_seconds=ttl_seconds
+        )
+    raise ValueError(f"Unknown session store backend: {backend}")
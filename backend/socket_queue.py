@@ -0,0 +1,53 @@
+# backend/socket_queue.py
+import queue
+import threading
+import socketio
+
+class InProcessManager(socketio.PubSubManager):
+    """Socket.IO pub/sub over in-process queues.
+
+    Stands in for Redis when several SocketIO servers live in one process,
+    e.g. in tests or local multi-server experiments.
+    """
+
+    name = 'inprocess'
+    _subscribers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, url='memory://', channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._queue = queue.Queue()
+        # Write-only managers never listen, so they must not collect messages
+        if not write_only:
+            with self._lock:
+                self._subscribers.setdefault(channel, []).append(self._queue)
+
+    def _publish(self, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(self.channel, []))
+        for subscriber in subscribers:
+            subscriber.put(data)
+
+    def _listen(self):
+        while True:
+            yield self._queue.get()
+
+def socketio_options(config):
+    """SocketIO keyword arguments for the configured worker model and message queue.
+
+    SOCKETIO_ASYNC_MODE is 'threading', 'eventlet' or 'gevent'.
+    SOCKETIO_MESSAGE_QUEUE is unset for a single process, 'memory://' for
+    the in-process queue, or any URL Flask-SocketIO understands
+    (redis://, rediss://, kafka://, zmq+tcp://, amqp:// via kombu).
+    """
+    options = {'async_mode': config.get('SOCKETIO_ASYNC_MODE', 'threading')}
+    url = config.get('SOCKETIO_MESSAGE_QUEUE')
+    channel = config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+
+    if url == 'memory://':
+        options['client_manager'] = InProcessManager(url, channel=channel)
+    elif url:
+        options['message_queue'] = url
+        options['channel'] = channel
+
+    return options
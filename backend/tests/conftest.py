@@ -0,0 +1,19 @@
+# backend/tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# database.py opens mental_health.db in the working directory on import; keep the tracked one untouched
+os.chdir(tempfile.mkdtemp(prefix='mental-health-tests-'))
+
+from database import MentalHealthDB
+
+@pytest.fixture
+def database(tmp_path):
+    """A fresh database per test"""
+    return MentalHealthDB(str(tmp_path / 'test.db'), archive_dir=str(tmp_path / 'archive'))
@@ -0,0 +1,27 @@
+# backend/tests/test_analytics_engine.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import retention
+from analytics_engine import AnalyticsEngine
+
+def ago(days, hour=9):
+    moment = (datetime.utcnow() - timedelta(days=days)).replace(hour=hour, minute=15, second=0)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+def test_mood_trends_keep_archived_months(database):
+    database.track_emotions('user-1', [
+        ('sad', 0.8, 'text', ago(60)),
+        ('sad', 0.4, 'voice', ago(60)),
+        ('happy', 0.6, 'text', ago(2))
+    ])
+    retention.compact(database, max_age_days=30)
+
+    analytics = AnalyticsEngine(database).user_analytics('user-1', 90)
+    daily = {bucket['bucket']: bucket['emotions'] for bucket in analytics['mood_trends']['daily']}
+
+    assert daily[ago(60)[:10]] == {'sad': {'count': 2, 'mean_intensity': pytest.approx(0.6), 'max_intensity': 0.8}}
+    assert daily[ago(2)[:10]]['happy']['count'] == 1
+    hourly = [bucket['bucket'] for bucket in analytics['mood_trends']['hourly']]
+    assert hourly == [ago(60)[:13] + ':00', ago(2)[:13] + ':00']
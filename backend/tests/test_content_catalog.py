@@ -0,0 +1,63 @@
+# backend/tests/test_content_catalog.py
+import json
+import os
+
+import pytest
+from flask import Flask, request
+
+from content_catalog import ContentCatalog, DEFAULT_CATALOG_PATH
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps({
+        'meditation': {'body_scan': {'name': 'Body Scan Meditation'}},
+        'journaling': {'anger': ['What triggered your anger?']}
+    }))
+    return ContentCatalog(str(path), check_interval=0)
+
+def serve(app, catalog, key, extra=None, etag=None):
+    headers = {'If-None-Match': f'"{etag}"'} if etag else {}
+    with app.test_request_context(headers=headers):
+        return catalog.respond(request, catalog.get('meditation', key), 'meditation', extra)
+
+def test_entry_is_served_with_an_etag_and_304_when_current(app, catalog):
+    response = serve(app, catalog, 'body_scan')
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == {'success': True, 'meditation': {'name': 'Body Scan Meditation'}}
+
+    etag = response.get_etag()[0]
+    assert serve(app, catalog, 'body_scan', etag=etag).status_code == 304
+
+def test_extra_fields_are_spliced_in_and_change_the_etag(app, catalog):
+    plain = serve(app, catalog, 'body_scan')
+    response = serve(app, catalog, 'body_scan', {'duration': 10, 'audio_url': '/a/10'})
+
+    assert json.loads(response.get_data()) == {
+        'success': True, 'meditation': {'name': 'Body Scan Meditation'}, 'duration': 10, 'audio_url': '/a/10'
+    }
+    etag = response.get_etag()[0]
+    assert etag != plain.get_etag()[0]
+    assert serve(app, catalog, 'body_scan', {'duration': 10, 'audio_url': '/a/10'}, etag=etag).status_code == 304
+    assert serve(app, catalog, 'body_scan', {'duration': 20, 'audio_url': '/a/20'}, etag=etag).status_code == 200
+
+def test_catalog_reloads_when_the_file_changes(catalog):
+    before = catalog.version
+    with open(catalog.path, 'w') as catalog_file:
+        json.dump({'meditation': {'body_scan': {'name': 'Body Scan'}}}, catalog_file)
+    os.utime(catalog.path, (0, 0))
+
+    assert catalog.reload_if_changed()
+    assert catalog.version != before
+    assert catalog.get('journaling', 'anger') is None
+    assert catalog.get('meditation', 'missing', default_key='body_scan').payload == b'{"name": "Body Scan"}'
+
+def test_shipped_catalog_has_every_therapy_section():
+    catalog = ContentCatalog(DEFAULT_CATALOG_PATH)
+    for section, key in (('therapy_breathing', 'beginner'), ('meditation', 'mindfulness'),
+                         ('journaling', 'anxiety'), ('breathing', '478'), ('emergency', 'moderate')):
+        assert catalog.get(section, key) is not None, (section, key)
@@ -0,0 +1,62 @@
+# backend/tests/test_cors.py
+from flask import Flask
+
+import metrics
+from cors import PreflightCORS
+
+ORIGIN = 'http://localhost:3000'
+
+def make_app(**options):
+    app = Flask(__name__)
+    metrics.init_app(app)
+    PreflightCORS(app, origins=[ORIGIN], **options)
+
+    @app.route('/api/cors-test', methods=['POST'])
+    def cors_test():
+        return {'success': True}
+
+    return app.test_client()
+
+def preflight(client, origin=ORIGIN, headers='Content-Type, X-Admin-Token'):
+    return client.options('/api/cors-test', headers={
+        'Origin': origin,
+        'Access-Control-Request-Method': 'POST',
+        'Access-Control-Request-Headers': headers
+    })
+
+def options_count():
+    return metrics.registry.counter('http_requests_total', 'HTTP requests by status code',
+                                    route='/api/cors-test', method='OPTIONS', status='204').value
+
+def test_preflight_allows_the_headers_it_asks_for():
+    response = preflight(make_app(), headers='Content-Type, X-Admin-Token, X-Requested-With')
+
+    assert response.status_code == 204
+    assert response.headers['Access-Control-Allow-Origin'] == ORIGIN
+    assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+    assert response.headers['Access-Control-Allow-Headers'] == 'Content-Type, X-Admin-Token, X-Requested-With'
+    assert 'Access-Control-Request-Headers' in response.headers['Vary']
+
+def test_fixed_header_list_is_sent_as_configured():
+    response = preflight(make_app(allow_headers=('Content-Type',)))
+    assert response.headers['Access-Control-Allow-Headers'] == 'Content-Type'
+
+def test_disallowed_origin_gets_no_cors_headers():
+    response = preflight(make_app(), origin='http://evil.example')
+
+    assert response.status_code == 204
+    assert 'Access-Control-Allow-Origin' not in response.headers
+    assert 'Access-Control-Allow-Headers' not in response.headers
+
+def test_actual_response_carries_the_allowed_origin():
+    response = make_app().post('/api/cors-test', headers={'Origin': ORIGIN})
+
+    assert response.headers['Access-Control-Allow-Origin'] == ORIGIN
+    assert 'Origin' in response.headers['Vary']
+
+def test_preflights_are_counted_in_metrics():
+    client = make_app()
+    before = options_count()
+    preflight(client)
+    preflight(client)
+    assert options_count() == before + 2
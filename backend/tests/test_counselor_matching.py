@@ -0,0 +1,128 @@
+# backend/tests/test_counselor_matching.py
+from counselor_matching import CounselorMatcher, LEVEL_OFFSETS
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def matcher_with(*counselors, available=False):
+    clock, matches = Clock(), []
+    matcher = CounselorMatcher(on_match=lambda ticket, counselor: matches.append((ticket, counselor['id'])),
+                               clock=clock)
+    for counselor in counselors:
+        matcher.add_counselor(counselor, available=available)
+    return matcher, clock, matches
+
+def counselor(counselor_id, gender='female', skills=()):
+    return {'id': counselor_id, 'gender': gender, 'skills': skills}
+
+def test_free_counselor_is_matched_immediately_by_preference():
+    matcher, _, _ = matcher_with(counselor('c1', 'male'), counselor('c2', 'female', ('grief',)), available=True)
+
+    assert matcher.request('u1', 'grief')['id'] == 'c2'
+    assert matcher.request('u2', 'female') is None
+    assert matcher.request('u3', 'any')['id'] == 'c1'
+    assert matcher.waiting() == 1
+    assert matcher.available() == 0
+
+def test_longest_idle_counselor_goes_first():
+    matcher, clock, _ = matcher_with(counselor('c1'), counselor('c2'))
+    matcher.release('c2')
+    clock.now += 10
+    matcher.release('c1')
+
+    assert matcher.request('u1')['id'] == 'c2'
+
+def test_more_severe_crises_go_ahead_within_their_offset():
+    matcher, clock, matches = matcher_with(counselor('c1'))
+    matcher.request('low', crisis_level='low')
+    clock.now += LEVEL_OFFSETS['LOW'] - 1
+    matcher.request('severe', crisis_level='severe')
+
+    matcher.release('c1')
+    assert [ticket.user_id for ticket, _ in matches] == ['severe']
+    assert matches[0][0].waited == 0
+
+def test_nobody_waits_forever_behind_more_severe_crises():
+    matcher, clock, matches = matcher_with(counselor('c1'))
+    matcher.request('low', crisis_level='low')
+    clock.now += LEVEL_OFFSETS['LOW'] + 1
+    matcher.request('severe', crisis_level='severe')
+
+    matcher.release('c1')
+    assert [ticket.user_id for ticket, _ in matches] == ['low']
+    assert matches[0][0].waited == LEVEL_OFFSETS['LOW'] + 1
+
+def test_released_counselor_only_takes_users_they_can_serve():
+    matcher, _, matches = matcher_with(counselor('c1', 'male'), counselor('c2', 'female', ('trauma',)))
+    matcher.request('u1', 'trauma')
+    matcher.request('u2', 'any')
+
+    assert matcher.release('c1') == 'u2'
+    assert matcher.release('c2') == 'u1'
+    assert [(ticket.user_id, counselor_id) for ticket, counselor_id in matches] == [('u2', 'c1'), ('u1', 'c2')]
+
+def test_cancelled_and_repeated_requests_leave_one_place_in_line():
+    matcher, _, matches = matcher_with(counselor('c1'))
+    matcher.request('u1')
+    matcher.request('u1')
+    matcher.request('u2')
+    assert matcher.waiting() == 2
+
+    assert matcher.cancel('u2')
+    assert not matcher.cancel('u2')
+    matcher.release('c1')
+    assert matcher.release('c1') is None
+
+    assert [ticket.user_id for ticket, _ in matches] == ['u1']
+    assert matcher.waiting() == 0
+    assert matcher.available() == 1
+
+def test_requeued_user_keeps_their_place():
+    matcher, clock, matches = matcher_with(counselor('c1'))
+    matcher.request('u1')
+    clock.now += 5
+    matcher.request('u2')
+    matcher.release('c1')
+    ticket, _ = matches.pop()
+    assert ticket.user_id == 'u1'
+
+    # Connecting u1 failed; they go back ahead of u2
+    assert matcher.requeue(ticket)
+    clock.now += 5
+    matcher.release('c1')
+    assert [(ticket.user_id, ticket.waited) for ticket, _ in matches] == [('u1', 10)]
+    assert matcher.waiting() == 1
+
+def test_requeue_hands_over_a_free_counselor():
+    matcher, _, matches = matcher_with(counselor('c1'), counselor('c2'))
+    matcher.request('u1')
+    matcher.release('c1')
+    ticket, _ = matches.pop()
+
+    matcher.release('c2')
+    assert not matcher.requeue(ticket)
+    assert [(ticket.user_id, counselor_id) for ticket, counselor_id in matches] == [('u1', 'c2')]
+    assert matcher.waiting() == 0
+
+def test_requeue_after_asking_again_keeps_the_newer_request():
+    matcher, clock, matches = matcher_with(counselor('c1'))
+    matcher.request('u1')
+    matcher.release('c1')
+    ticket, _ = matches.pop()
+
+    clock.now += 30
+    matcher.request('u1', 'grief')
+    assert matcher.requeue(ticket)
+    assert matcher.waiting() == 1
+
+def test_removed_counselor_is_never_matched():
+    matcher, _, matches = matcher_with(counselor('c1'), available=True)
+    matcher.remove_counselor('c1')
+
+    assert matcher.request('u1') is None
+    assert matcher.release('c1') is None
+    assert matches == []
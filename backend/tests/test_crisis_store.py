@@ -0,0 +1,93 @@
+# backend/tests/test_crisis_store.py
+import time
+
+import crisis_store
+from crisis_store import CrisisStore
+
+def test_crisis_moves_from_open_to_attended_to_resolved(database):
+    store = CrisisStore(database)
+    crisis = store.open('user-1', 'HIGH', 'crisis detected')
+    assert crisis['status'] == 'open'
+    assert store.active('HIGH', 'open') == [crisis]
+
+    crisis = store.record_action(crisis['id'], 'counselor connected: c1', counselor_contacted=True)
+    assert crisis['status'] == 'attended'
+    assert crisis['action_taken'] == 'crisis detected; counselor connected: c1'
+    assert store.active('HIGH', 'open') == []
+    assert store.counts() == {'HIGH': {'attended': 1}}
+
+    assert store.resolve(crisis['id'], 'user safe')
+    assert not store.resolve(crisis['id'])
+    assert store.active() == []
+    assert store.counts() == {}
+    # Resolved crises are read back from the table
+    resolved = store.get(crisis['id'])
+    assert resolved['status'] == 'resolved' and resolved['resolved_at']
+    assert store.get(12345) is None
+
+def test_active_filters_by_level_and_status_oldest_first(database):
+    store = CrisisStore(database)
+    high = store.open('user-1', 'HIGH')
+    severe = store.open('user-2', 'SEVERE')
+    attended = store.open('user-3', 'HIGH')
+    store.record_action(attended['id'], 'called', counselor_contacted=True)
+
+    assert [crisis['id'] for crisis in store.active()] == [high['id'], severe['id'], attended['id']]
+    assert [crisis['id'] for crisis in store.active('HIGH')] == [high['id'], attended['id']]
+    assert [crisis['id'] for crisis in store.active(status='open')] == [high['id'], severe['id']]
+    assert store.counts() == {'HIGH': {'open': 1, 'attended': 1}, 'SEVERE': {'open': 1}}
+
+def test_stores_on_one_database_converge(database):
+    first, second = CrisisStore(database), CrisisStore(database)
+    crisis = first.open('user-1', 'HIGH')
+    second.record_action(crisis['id'], 'called', counselor_contacted=True)
+    other = second.open('user-2', 'MODERATE')
+    first.resolve(other['id'])
+
+    assert first.active() == second.active()
+    assert [crisis['status'] for crisis in second.active()] == ['attended']
+
+def test_unresolved_crises_are_loaded_after_a_restart(database):
+    store = CrisisStore(database)
+    kept = store.open('user-1', 'HIGH')
+    gone = store.open('user-2', 'HIGH')
+    store.resolve(gone['id'])
+
+    restarted = CrisisStore(database)
+    assert restarted.active() == [kept]
+    assert restarted.refresh() == 0
+
+def test_changes_are_applied_in_batches(database, monkeypatch):
+    monkeypatch.setattr(crisis_store, 'CHANGE_BATCH', 2)
+    store, writer = CrisisStore(database), CrisisStore(database)
+    for n in range(5):
+        writer.open(f'user-{n}', 'LOW')
+
+    assert store.refresh() == 5
+    assert len(store.active('LOW')) == 5
+
+def test_listeners_see_every_change_in_order(database):
+    store = CrisisStore(database)
+    seen = []
+    store.subscribe(lambda change, crisis: 1 / 0)
+    unsubscribe = store.subscribe(lambda change, crisis: seen.append((change['change'], crisis['status'])))
+
+    crisis = store.open('user-1', 'HIGH')
+    store.record_action(crisis['id'], 'called', counselor_contacted=True)
+    store.resolve(crisis['id'])
+    unsubscribe()
+    store.open('user-2', 'HIGH')
+
+    assert seen == [('opened', 'open'), ('updated', 'attended'), ('resolved', 'resolved')]
+    assert [change['change'] for change in store.changes()] == ['opened', 'updated', 'resolved', 'opened']
+
+def test_started_store_polls_for_other_workers_changes(database):
+    store, writer = CrisisStore(database).start(poll_interval=0.01), CrisisStore(database)
+    try:
+        crisis = writer.open('user-1', 'SEVERE')
+        deadline = time.time() + 5
+        while not store.counts() and time.time() < deadline:
+            time.sleep(0.01)
+        assert store.get(crisis['id'])['status'] == 'open'
+    finally:
+        store.stop()
@@ -0,0 +1,144 @@
+# backend/tests/test_notifications.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from notifications import NotificationDispatcher, Channel
+
+@pytest.fixture
+def dispatchers(database):
+    """Make dispatchers on the test database and stop them afterwards"""
+    started = []
+
+    def make(*channels):
+        dispatcher = NotificationDispatcher(channels, database=database)
+        started.append(dispatcher)
+        return dispatcher
+
+    yield make
+    for dispatcher in started:
+        dispatcher.stop()
+
+def wait_for(dispatcher, crisis_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while True:
+        status = dispatcher.status(crisis_id)
+        if status and all(channel['status'] != 'pending' for channel in status.values()):
+            return status
+        assert time.time() < deadline, status
+        time.sleep(0.01)
+
+def test_every_channel_is_delivered_once(dispatchers):
+    calls = []
+    dispatcher = dispatchers(
+        Channel('sms', lambda payload: calls.append(('sms', payload)) or {'sid': 1}),
+        Channel('email', lambda payload: calls.append(('email', payload)) or 'queued')
+    )
+    ids = dispatcher.dispatch(7, 'user-1', {'sms': {'to': '555'}, 'email': {'to': 'a@b'}})
+
+    status = wait_for(dispatcher, 7)
+    assert set(ids) == {'sms', 'email'}
+    assert sorted(calls) == [('email', {'to': 'a@b'}), ('sms', {'to': '555'})]
+    assert status['sms']['status'] == 'sent' and status['sms']['result'] == {'sid': 1}
+    assert status['email']['attempts'] == 1 and status['email']['sent_at']
+
+def test_dispatching_a_crisis_again_keeps_the_first_delivery(dispatchers):
+    calls = []
+    dispatcher = dispatchers(Channel('sms', calls.append))
+    first = dispatcher.dispatch(7, 'user-1', {'sms': {'n': 1}})
+    wait_for(dispatcher, 7)
+
+    assert dispatcher.dispatch(7, 'user-1', {'sms': {'n': 2}}) == first
+    time.sleep(0.1)
+    assert calls == [{'n': 1}]
+
+def test_unknown_channels_are_rejected(dispatchers):
+    dispatcher = dispatchers(Channel('sms', print))
+    with pytest.raises(ValueError):
+        dispatcher.dispatch(7, 'user-1', {'pager': {}})
+    assert dispatcher.status(7) == {}
+
+def test_failures_are_retried_with_backoff(dispatchers):
+    attempts = []
+
+    def flaky(payload):
+        attempts.append(time.time())
+        if len(attempts) < 3:
+            raise ConnectionError('gateway down')
+        return 'ok'
+
+    dispatcher = dispatchers(Channel('sms', flaky, base_delay=0.05))
+    dispatcher.dispatch(7, 'user-1', {'sms': {}})
+
+    status = wait_for(dispatcher, 7)['sms']
+    assert status['status'] == 'sent' and status['attempts'] == 3
+    assert status['last_error'] is None
+    # Jittered between half and all of 0.05 s, then 0.1 s
+    assert attempts[1] - attempts[0] >= 0.025
+    assert attempts[2] - attempts[1] >= 0.05
+
+def test_delivery_gives_up_after_its_attempt_limit(dispatchers):
+    def down(payload):
+        raise ConnectionError('gateway down')
+
+    dispatcher = dispatchers(Channel('sms', down, max_attempts=3, base_delay=0.01))
+    dispatcher.dispatch(7, 'user-1', {'sms': {}})
+
+    status = wait_for(dispatcher, 7)['sms']
+    assert status['status'] == 'failed' and status['attempts'] == 3
+    assert status['last_error'] == 'ConnectionError: gateway down'
+
+def test_overrunning_sync_handler_is_not_run_twice(dispatchers):
+    running, calls = threading.Lock(), []
+
+    def reserve_counselor(payload):
+        assert running.acquire(blocking=False), 'two calls at once'
+        calls.append(payload)
+        time.sleep(0.3)
+        running.release()
+        return 'reserved'
+
+    dispatcher = dispatchers(Channel('counselor', reserve_counselor, timeout=0.05, base_delay=0.01))
+    dispatcher.dispatch(7, 'user-1', {'counselor': {}})
+
+    status = wait_for(dispatcher, 7)['counselor']
+    assert status['status'] == 'sent' and status['attempts'] == 1
+    assert status['result'] == 'reserved'
+    assert len(calls) == 1
+
+def test_timed_out_coroutine_handler_is_cancelled_and_retried(dispatchers):
+    attempts, finished = [], []
+
+    async def call(payload):
+        attempts.append(payload)
+        if len(attempts) == 1:
+            await asyncio.sleep(1)
+            finished.append(payload)
+        return 'answered'
+
+    dispatcher = dispatchers(Channel('call', call, timeout=0.05, base_delay=0.01))
+    dispatcher.dispatch(7, 'user-1', {'call': {}})
+
+    status = wait_for(dispatcher, 7)['call']
+    assert status['status'] == 'sent' and status['attempts'] == 2
+    assert finished == []
+
+def test_pending_deliveries_resume_after_a_restart(dispatchers):
+    def down(payload):
+        raise ConnectionError('gateway down')
+
+    first = dispatchers(Channel('sms', down, base_delay=0.3))
+    first.dispatch(7, 'user-1', {'sms': {'to': '555'}})
+    while first.status(7)['sms']['last_error'] is None:
+        time.sleep(0.01)
+    # The process dies while the retry is waiting
+    first.stop()
+
+    calls = []
+    restarted = dispatchers(Channel('sms', lambda payload: calls.append(payload) or 'ok')).start()
+
+    status = wait_for(restarted, 7)['sms']
+    assert status['status'] == 'sent' and status['attempts'] == 2
+    assert calls == [{'to': '555'}]
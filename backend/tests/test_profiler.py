@@ -0,0 +1,54 @@
+# backend/tests/test_profiler.py
+import threading
+import time
+
+import pytest
+
+from profiler import SamplingProfiler
+
+def busy(profiler, label, stop):
+    profiler.tag(label)
+    try:
+        while not stop.is_set():
+            sum(range(1000))
+    finally:
+        profiler.untag()
+
+def test_capture_samples_tagged_threads(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path))
+    profiler.start(seconds=5, interval=0.001)
+    stop = threading.Event()
+    worker = threading.Thread(target=busy, args=(profiler, 'GET /api/test', stop))
+    worker.start()
+    time.sleep(0.1)
+    capture = profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert capture['samples'] > 0
+    with open(capture['path']) as profile:
+        assert all(line.startswith('GET_/api/test;') for line in profile)
+    assert not profiler.status()['active']
+
+def test_new_capture_cannot_start_until_the_last_one_is_stored(tmp_path, monkeypatch):
+    profiler = SamplingProfiler(str(tmp_path))
+    writing, release = threading.Event(), threading.Event()
+    write = profiler._write
+
+    def slow_write(*args):
+        writing.set()
+        release.wait(5)
+        return write(*args)
+
+    monkeypatch.setattr(profiler, '_write', slow_write)
+    first = profiler.start(seconds=0.01, interval=0.001)
+    assert writing.wait(5)
+
+    with pytest.raises(RuntimeError):
+        profiler.start(seconds=0.01, percent=50)
+    release.set()
+    stored = profiler.stop()
+
+    assert stored['started_at'] == first['started_at'] and stored['percent'] == 100
+    second = profiler.start(seconds=0.01, percent=50)
+    assert profiler.stop()['started_at'] == second['started_at']
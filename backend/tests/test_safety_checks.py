@@ -0,0 +1,192 @@
+# backend/tests/test_safety_checks.py
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from safety_checks import SafetyCheckScheduler, ManualClock, SAFETY_CHECK_INTERVAL, SAFETY_CHECK_COUNT
+
+class Responder:
+    """Answers safety checks and records every check and escalation"""
+
+    def __init__(self, safe=False):
+        self.safe = safe
+        self.checks = []
+        self.escalations = []
+        self.fail_escalations = 0
+
+    def check(self, user_id, crisis_id):
+        self.checks.append(crisis_id)
+        return self.safe
+
+    def escalate(self, user_id, crisis_id):
+        if self.fail_escalations:
+            self.fail_escalations -= 1
+            raise RuntimeError('no counselor reachable')
+        self.escalations.append(crisis_id)
+
+@pytest.fixture
+def clock():
+    return ManualClock(start=1_000_000.0)
+
+def scheduler_for(responder, database, clock):
+    return SafetyCheckScheduler(responder.check, responder.escalate, database=database, clock=clock)
+
+def run_for(scheduler, clock, seconds, step=SAFETY_CHECK_INTERVAL):
+    for _ in range(int(seconds // step)):
+        clock.advance(step)
+        scheduler.run_due()
+
+def status(database, crisis_id):
+    conn = sqlite3.connect(database.db_path)
+    row = conn.execute('SELECT status, remaining FROM safety_checks WHERE crisis_id = ?', (crisis_id,)).fetchone()
+    conn.close()
+    return row
+
+def test_checks_run_on_schedule_until_done(database, clock):
+    responder = Responder(safe=True)
+    scheduler = scheduler_for(responder, database, clock)
+    scheduler.schedule('user-1', 1)
+
+    clock.advance(SAFETY_CHECK_INTERVAL - 1)
+    assert scheduler.run_due() == 0
+
+    clock.advance(1)
+    assert scheduler.run_due() == 1
+    run_for(scheduler, clock, SAFETY_CHECK_INTERVAL * (SAFETY_CHECK_COUNT + 2))
+
+    assert responder.checks == [1] * SAFETY_CHECK_COUNT
+    assert responder.escalations == []
+    assert status(database, 1) == ('done', 0)
+    assert scheduler.pending() == 0
+
+def test_unanswered_checks_escalate_once(database, clock):
+    responder = Responder(safe=False)
+    scheduler = scheduler_for(responder, database, clock)
+    scheduler.schedule('user-1', 1)
+
+    run_for(scheduler, clock, SAFETY_CHECK_INTERVAL * (SAFETY_CHECK_COUNT + 2))
+
+    assert len(responder.checks) == SAFETY_CHECK_COUNT
+    assert responder.escalations == [1]
+
+def test_a_message_from_the_user_stops_escalation(database, clock):
+    # The same signal EmergencyController._confirm_safety checks
+    def wrote_recently(user_id, crisis_id):
+        since = datetime.utcnow() - timedelta(seconds=SAFETY_CHECK_INTERVAL)
+        return database.user_wrote_since(user_id, since.strftime('%Y-%m-%d %H:%M:%S'))
+
+    responder = Responder()
+    scheduler = SafetyCheckScheduler(wrote_recently, responder.escalate, database=database, clock=clock)
+    scheduler.schedule('user-1', 1)
+    scheduler.schedule('user-2', 2)
+    database.add_chat_turn('user-1', None, "I'm okay, just tired", 'Thank you for letting me know.')
+    database.add_chat_message('user-2', None, 'Are you safe right now?', 'ai')
+
+    clock.advance(SAFETY_CHECK_INTERVAL)
+    assert scheduler.run_due() == 2
+    assert responder.escalations == [2]
+
+def test_failed_escalation_is_retried_on_the_next_check(database, clock):
+    responder = Responder(safe=False)
+    responder.fail_escalations = 1
+    scheduler = scheduler_for(responder, database, clock)
+    scheduler.schedule('user-1', 1)
+
+    run_for(scheduler, clock, SAFETY_CHECK_INTERVAL)
+    assert responder.escalations == []
+
+    run_for(scheduler, clock, SAFETY_CHECK_INTERVAL * (SAFETY_CHECK_COUNT + 1))
+    assert responder.escalations == [1]
+
+def test_scheduling_a_crisis_twice_changes_nothing(database, clock):
+    responder = Responder(safe=True)
+    scheduler = scheduler_for(responder, database, clock)
+
+    assert scheduler.schedule('user-1', 1) is not None
+    assert scheduler.schedule('user-1', 1) is None
+    run_for(scheduler, clock, SAFETY_CHECK_INTERVAL * (SAFETY_CHECK_COUNT + 2))
+
+    assert len(responder.checks) == SAFETY_CHECK_COUNT
+
+def test_pending_checks_resume_after_a_restart(database, clock):
+    responder = Responder(safe=False)
+    scheduler = scheduler_for(responder, database, clock)
+    scheduler.schedule('user-1', 1)
+    scheduler.schedule('user-2', 2)
+    run_for(scheduler, clock, SAFETY_CHECK_INTERVAL * 2)
+    assert sorted(responder.escalations) == [1, 2]
+
+    # A new process: nothing in memory, everything from the table
+    restarted = scheduler_for(responder, database, clock)
+    assert restarted.pending() == 2
+    run_for(restarted, clock, SAFETY_CHECK_INTERVAL * (SAFETY_CHECK_COUNT + 2))
+
+    assert responder.checks.count(1) == SAFETY_CHECK_COUNT
+    assert responder.checks.count(2) == SAFETY_CHECK_COUNT
+    assert sorted(responder.escalations) == [1, 2]
+    assert status(database, 1) == ('done', 0)
+
+def test_a_check_lost_mid_run_runs_again_after_its_lease(database, clock):
+    responder = Responder(safe=True)
+    scheduler = scheduler_for(responder, database, clock)
+    scheduler.schedule('user-1', 1)
+
+    def crash(user_id, crisis_id):
+        raise SystemExit('worker died')
+    dying = SafetyCheckScheduler(crash, responder.escalate, database=database, clock=clock)
+    clock.advance(SAFETY_CHECK_INTERVAL)
+    with pytest.raises(SystemExit):
+        dying.run_due()
+
+    # The dead worker's claim holds the check until its lease runs out
+    assert scheduler.run_due() == 1
+    assert responder.checks == []
+    run_for(scheduler, clock, SAFETY_CHECK_INTERVAL * (SAFETY_CHECK_COUNT + 2), step=30)
+
+    assert len(responder.checks) == SAFETY_CHECK_COUNT
+
+def test_cancelled_checks_stop(database, clock):
+    responder = Responder(safe=True)
+    scheduler = scheduler_for(responder, database, clock)
+    scheduler.schedule('user-1', 1)
+    scheduler.schedule('user-2', 2)
+    run_for(scheduler, clock, SAFETY_CHECK_INTERVAL)
+
+    assert scheduler.cancel(1)
+    assert not scheduler.cancel(1)
+    run_for(scheduler, clock, SAFETY_CHECK_INTERVAL * (SAFETY_CHECK_COUNT + 2))
+
+    assert responder.checks.count(1) == 1
+    assert responder.checks.count(2) == SAFETY_CHECK_COUNT
+    assert status(database, 1) == ('cancelled', SAFETY_CHECK_COUNT - 1)
+
+def test_cancelled_checks_stay_cancelled_after_a_restart(database, clock):
+    responder = Responder(safe=False)
+    scheduler = scheduler_for(responder, database, clock)
+    scheduler.schedule('user-1', 1)
+    scheduler.cancel(1)
+
+    restarted = scheduler_for(responder, database, clock)
+    assert restarted.pending() == 0
+    run_for(restarted, clock, SAFETY_CHECK_INTERVAL * (SAFETY_CHECK_COUNT + 2))
+
+    assert responder.checks == []
+    assert responder.escalations == []
+
+def test_timer_thread_runs_checks_as_the_clock_advances(database, clock):
+    responder = Responder(safe=True)
+    ran = threading.Event()
+    check = responder.check
+    responder.check = lambda user_id, crisis_id: ran.set() or check(user_id, crisis_id)
+    scheduler = scheduler_for(responder, database, clock).start()
+    try:
+        scheduler.schedule('user-1', 1)
+        assert not ran.wait(0.2)
+        clock.advance(SAFETY_CHECK_INTERVAL)
+        assert ran.wait(5)
+    finally:
+        scheduler.stop()
+
+    assert responder.checks == [1]
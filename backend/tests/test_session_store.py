@@ -0,0 +1,63 @@
+# backend/tests/test_session_store.py
+import pytest
+
+from session_store import SessionStore, MemorySessionStore, SQLiteSessionStore
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path, clock):
+    if request.param == 'memory':
+        store = MemorySessionStore(max_entries_per_user=3, ttl_seconds=60, clock=clock)
+    else:
+        store = SQLiteSessionStore(str(tmp_path / 'sessions.db'), max_entries_per_user=3, ttl_seconds=60,
+                                   clock=clock)
+    return store
+
+def test_base_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+    class Partial(SessionStore):
+        def append(self, user_id, entry):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_recent_entries_are_capped_per_user(store):
+    for n in range(5):
+        store.append('user-1', {'n': n})
+    store.append('user-2', {'n': 'other'})
+
+    assert store.recent('user-1') == [{'n': 2}, {'n': 3}, {'n': 4}]
+    assert store.recent('user-1', limit=2) == [{'n': 3}, {'n': 4}]
+    assert store.count('user-1') == 5
+
+def test_idle_sessions_expire(store, clock):
+    store.append('user-1', {'n': 1})
+    clock.now += 30
+    store.append('user-1', {'n': 2})
+    clock.now += 59
+    assert store.count('user-1') == 2
+
+    clock.now += 2
+    assert store.recent('user-1') == []
+    store.append('user-1', {'n': 3})
+    assert store.count('user-1') == 1
+
+def test_clear_forgets_the_session(store):
+    store.append('user-1', {'n': 1})
+    store.clear('user-1')
+
+    assert store.recent('user-1') == []
+    assert store.count('user-1') == 0
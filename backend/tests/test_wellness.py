@@ -0,0 +1,109 @@
+# backend/tests/test_wellness.py
+import random
+
+import pytest
+
+from wellness import WellnessCounters, HALF_LIFE_SECONDS, decay, merged
+
+DAY = 86400
+NOW = 1_800_000_000.0
+
+def events(seed, count=40):
+    """(kind, at, ...) events spread over the last 60 days, in random order"""
+    rng = random.Random(seed)
+    kinds = (
+        lambda at: ('emotion', at, rng.choice(('happy', 'sad', 'calm', 'anxious')), rng.random()),
+        lambda at: ('session', at),
+        lambda at: ('exercise', at, rng.randint(60, 1800), rng.choice((None, rng.random()))),
+        lambda at: ('emergency', at)
+    )
+    return [rng.choice(kinds)(NOW - rng.uniform(0, 60 * DAY)) for _ in range(count)]
+
+def counters_from(events):
+    counters = WellnessCounters()
+    for kind, at, *args in events:
+        if kind == 'emotion':
+            counters.add_emotion(*args, at)
+        else:
+            getattr(counters, f'add_{kind}')(at, *args)
+    return counters
+
+def assert_same(left, right):
+    for field in WellnessCounters.__slots__:
+        assert getattr(left, field) == pytest.approx(getattr(right, field), rel=1e-9), field
+
+def test_decay_halves_every_half_life():
+    assert decay(0) == 1.0
+    assert decay(-DAY) == 1.0
+    assert decay(HALF_LIFE_SECONDS) == pytest.approx(0.5)
+    assert decay(3 * HALF_LIFE_SECONDS) == pytest.approx(0.125)
+
+def test_counters_do_not_depend_on_event_order():
+    shuffled = events(1)
+    assert_same(counters_from(shuffled), counters_from(sorted(shuffled, key=lambda event: event[1])))
+
+def test_merging_disjoint_counters_equals_adding_every_event():
+    all_events = events(2)
+    left, right = counters_from(all_events[:15]), counters_from(all_events[15:])
+    left.merge(right)
+    assert_same(left, counters_from(all_events))
+
+def test_merged_matches_merge_field_by_field():
+    all_events = events(3)
+    left, right = counters_from(all_events[::2]), counters_from(all_events[1::2])
+    expected = counters_from(all_events)
+    for field in WellnessCounters.FIELDS:
+        value = merged(getattr(left, field), left.as_of, getattr(right, field), right.as_of)
+        assert value == pytest.approx(getattr(expected, field), rel=1e-9)
+
+def test_score_stays_within_bounds_and_recovers_as_emergencies_age():
+    counters = WellnessCounters()
+    counters.add_emergency(NOW)
+    counters.add_emergency(NOW)
+    score, components = counters.score(NOW)
+    later, _ = counters.score(NOW + 4 * HALF_LIFE_SECONDS)
+
+    assert all(0 <= value <= 100 for value in components.values())
+    assert later > score
+
+def test_maintained_scores_match_the_base_tables(database):
+    rng = random.Random(4)
+    for n in range(10):
+        user_id = f'user-{n}'
+        for _ in range(12):
+            kind = rng.random()
+            if kind < 0.3:
+                database.track_emotion(user_id, rng.choice(('happy', 'sad', 'calm')), rng.random(), 'facial')
+            elif kind < 0.5:
+                session_id = database.start_session(user_id)
+                if rng.random() < 0.5:
+                    database.end_session(session_id)
+            elif kind < 0.7:
+                database.log_exercise(user_id, 'breathing', rng.randint(60, 900), rng.choice((None, 0.8)))
+            elif kind < 0.8:
+                database.log_emergency(user_id, 'HIGH')
+            else:
+                # Batches may be older than what the user's row is already held as of
+                database.track_emotions(user_id, [('sad', 0.5, 'facial', '2020-01-10 10:00:00'),
+                                                  ('happy', 0.7, 'voice', '2020-01-18 10:00:00')])
+
+    assert database.verify_wellness() == {}
+    for n in range(10):
+        maintained, recomputed = database.get_wellness(f'user-{n}'), database.recompute_wellness(f'user-{n}')
+        assert maintained['score'] == pytest.approx(recomputed['score'], abs=0.2)
+        assert maintained['version'] == recomputed['version']
+
+def test_rebuild_keeps_the_maintained_scores(database):
+    database.log_exercise('user-1', 'yoga', 1200, 0.9)
+    database.track_emotion('user-1', 'happy', 0.8, 'text')
+    database.log_exercise('user-2', 'walk', 600)
+    before = database.get_wellness('user-1')
+
+    assert database.rebuild_wellness() == 2
+    assert database.get_wellness('user-1')['score'] == pytest.approx(before['score'], abs=0.2)
+    assert database.verify_wellness() == {}
+
+def test_users_without_activity_score_as_new(database):
+    wellness = database.get_wellness('nobody')
+    assert wellness['version'] == 0
+    assert wellness['score'] == WellnessCounters().score(NOW)[0]
@@ -0,0 +1,119 @@
+# backend/wellness.py
+# How pleasant each detected emotion is, from -1 (distressed) to 1 (positive)
+EMOTION_VALENCE = {
+    'happy': 1.0, 'calm': 0.6, 'surprised': 0.3, 'neutral': 0.0, 'disgust': -0.5,
+    'angry': -0.6, 'anxious': -0.7, 'sad': -0.8, 'fearful': -0.8
+}
+
+# Older activity counts for less; a reading this many days old counts half
+WELLNESS_HALF_LIFE_DAYS = 14
+HALF_LIFE_SECONDS = WELLNESS_HALF_LIFE_DAYS * 86400
+
+# How the components make up the overall score
+WELLNESS_WEIGHTS = {'emotional': 0.4, 'behavioral': 0.25, 'social': 0.2, 'physical': 0.15}
+
+# Recent (decayed) activity that earns full credit for a component
+TARGET_EXERCISES = 5
+TARGET_SESSIONS = 4
+TARGET_EXERCISE_MINUTES = 60
+EMERGENCY_PENALTY = 15
+
+def decay(seconds):
+    """How much an amount `seconds` old still counts; 1 for anything not in the past"""
+    return 0.5 ** (max(seconds, 0.0) / HALF_LIFE_SECONDS)
+
+def merged(value, as_of, other, other_as_of):
+    """One field of two counters added together as of the later of their times"""
+    return value * decay(other_as_of - as_of) + other * decay(as_of - other_as_of)
+
+class WellnessCounters:
+    """Exponentially decayed activity totals that a wellness score is read from.
+
+    Every field is a sum of per-event amounts weighted by
+    0.5 ** (age / half-life), held as of `as_of` (Unix seconds). Adding an
+    event is O(1) whatever its time, and counters for disjoint sets of
+    events can be merged by adding them, so a score built up event by event
+    equals one computed from all rows at once.
+    """
+
+    FIELDS = ('readings', 'mood', 'sessions', 'completed_sessions', 'exercises',
+              'effectiveness', 'rated_exercises', 'exercise_minutes', 'emergencies')
+
+    __slots__ = FIELDS + ('as_of',)
+
+    def __init__(self, as_of=0.0, **values):
+        self.as_of = as_of
+        for field in self.FIELDS:
+            setattr(self, field, values.get(field, 0.0))
+
+    def add_emotion(self, emotion_type, intensity, at):
+        weight = self._weight(at)
+        self.readings += weight
+        self.mood += weight * EMOTION_VALENCE.get(emotion_type, 0.0) * intensity
+
+    def add_session(self, at, completed=False):
+        weight = self._weight(at)
+        self.sessions += weight
+        if completed:
+            self.completed_sessions += weight
+
+    def complete_session(self, at):
+        """Count an already-added session, started at `at`, as completed"""
+        self.completed_sessions += self._weight(at)
+
+    def add_exercise(self, at, duration, effectiveness=None):
+        weight = self._weight(at)
+        self.exercises += weight
+        self.exercise_minutes += weight * duration / 60
+        if effectiveness is not None:
+            self.rated_exercises += weight
+            self.effectiveness += weight * min(max(effectiveness, 0.0), 1.0)
+
+    def add_emergency(self, at):
+        # Weigh first: moving the counters forward rescales the field being added to
+        weight = self._weight(at)
+        self.emergencies += weight
+
+    def merge(self, other):
+        self._advance(other.as_of)
+        scale = decay(self.as_of - other.as_of)
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field) * scale)
+
+    def components(self, now):
+        """Each component from 0 to 100 as of `now`; ratios do not decay, counts do"""
+        remaining = decay(now - self.as_of)
+        mood = self.mood / self.readings if self.readings > 1e-9 else 0.0
+        effectiveness = self.effectiveness / self.rated_exercises if self.rated_exercises > 1e-9 else 0.5
+        completion = self.completed_sessions / self.sessions if self.sessions > 1e-9 else 0.0
+
+        return {
+            'emotional': _clip(50 * (1 + mood) - EMERGENCY_PENALTY * self.emergencies * remaining),
+            'behavioral': _clip(60 * min(self.exercises * remaining / TARGET_EXERCISES, 1.0) + 40 * effectiveness),
+            'social': _clip(60 * min(self.sessions * remaining / TARGET_SESSIONS, 1.0) + 40 * completion),
+            'physical': _clip(100 * min(self.exercise_minutes * remaining / TARGET_EXERCISE_MINUTES, 1.0))
+        }
+
+    def score(self, now):
+        components = self.components(now)
+        return round(sum(WELLNESS_WEIGHTS[name] * value for name, value in components.items()), 1), components
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def _weight(self, at):
+        """Weight of an event at `at`, first moving the counters forward if it is newer"""
+        if at > self.as_of:
+            self._advance(at)
+            return 1.0
+        return decay(self.as_of - at)
+
+    def _advance(self, at):
+        if at > self.as_of:
+            factor = decay(at - self.as_of)
+            for field in self.FIELDS:
+                setattr(self, field, getattr(self, field) * factor)
+            self.as_of = at
+
+def _clip(value):
+    return round(min(max(value, 0.0), 100.0), 1)